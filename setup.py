@@ -1,9 +1,15 @@
-from setuptools import setup, find_packages
+from setuptools import setup, find_namespace_packages
 
 setup(
     name="fee_scheduleb_scraper",
     version="1.0.0",
-    packages=find_packages(),
+    # Everything installed lives in the fee_scraper namespace package under
+    # src/; src/bench and the src/main.py launcher stay in the checkout
+    package_dir={'': 'src'},
+    packages=find_namespace_packages(where='src', include=['fee_scraper', 'fee_scraper.*']),
+    entry_points={
+        'console_scripts': ['fee-scraper = fee_scraper.cli:main'],
+    },
     install_requires=[
         'psycopg2-binary==2.9.9',
         'python-dotenv==1.0.0',
@@ -14,4 +20,4 @@ setup(
         'soupsieve==2.5',
     ],
     setup_requires=['setuptools'],
-) 
\ No newline at end of file
+) 
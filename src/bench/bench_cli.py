@@ -0,0 +1,74 @@
+"""Benchmark: cold start of the fee-scraper CLI's light commands.
+
+Run from src/:  python -m bench.bench_cli [--runs 10] [--target-ms 120]
+
+Each command is started --runs times in a fresh interpreter, as
+`python -m fee_scraper.cli ...` from src/, and its best and median wall times are
+reported next to a bare interpreter's. One more run under -X importtime
+lists the heavy libraries it loaded. Exits 1 when a light command's
+best time is more than --target-ms over the bare interpreter, or it
+loaded a heavy library.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = ['-m', 'fee_scraper.cli']
+
+HEAVY_MODULES = ('pdfplumber', 'pdfminer', 'bs4', 'requests', 'psycopg2')
+
+# (arguments, light): light commands are held to the target
+COMMANDS = [
+    (['--help'], True),
+    (['fetch-urls', '--help'], True),
+    (['extract', '--help'], True),
+    (['bench'], True),
+    (['load', '--help'], False),
+    (['run', '--help'], False),
+]
+
+def wall_times(command, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=SRC_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+def heavy_imports(command):
+    """Heavy top-level packages the command imported, from -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:], cwd=SRC_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imported = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            imported.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return sorted(imported.intersection(HEAVY_MODULES))
+
+def run(runs, target_ms):
+    bare = min(wall_times([sys.executable, '-c', 'pass'], runs))
+    print(f"bare interpreter: {bare * 1000:.0f} ms (best of {runs})")
+    print(f"{'command':<22} {'best ms':>8} {'median ms':>10} {'over bare':>10}  heavy imports")
+    ok = True
+    for args, light in COMMANDS:
+        command = [sys.executable] + CLI + args
+        times = wall_times(command, runs)
+        over = (min(times) - bare) * 1000
+        heavy = heavy_imports(command)
+        failed = light and (over > target_ms or heavy)
+        ok = ok and not failed
+        print(f"{' '.join(args):<22} {min(times) * 1000:>8.0f} {statistics.median(times) * 1000:>10.0f} "
+              f"{over:>10.0f}  {', '.join(heavy) or '-'}{'  OVER TARGET' if failed else ''}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=120,
+                        help="Most a light command may take over the bare interpreter")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.runs, args.target_ms) else 1)
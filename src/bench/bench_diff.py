@@ -0,0 +1,105 @@
+"""Benchmark: the sorted merge-join diff of pipeline/diff.py.
+
+Run from src/:  python -m bench.bench_diff [--rows 1000000] [--chunk-rows 50000 200000]
+
+The old dataset streams in key order, like the fee table read by
+DB_SORTED_SELECT. The new one has 1% of rows changed, 0.5% removed and
+0.5% added, and arrives in a scrambled order so it has to be sorted.
+Both are generated lazily, so the memory measured is the diff's own.
+Each --chunk-rows value is run once for time and once under tracemalloc
+for peak memory, next to a chunk size that holds everything in memory
+and the dict-of-keys diff the merge-join replaces.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from collections import Counter
+
+from fee_scraper.database.fee_row import FeeRow
+from fee_scraper.pipeline.diff import sorted_rows, merge_diff
+from fee_scraper.pipeline.reconcile import row_key
+
+# A prime, so coprime with any smaller row count: a scrambled order
+SCRAMBLE = 2654435761
+
+def make_row(i, changed=False):
+    return FeeRow(
+        f"{i // 20:05d}", (None, '26', '26', 'TC')[i % 20 // 5], f"{i % 20:03d}",
+        ('000', '010', '090', 'XXX')[i % 4], ('0', '2', '9')[i % 3],
+        100 + i % 50000, 200 + (i * 7) % 50000 + (1 if changed else 0),
+        None if i % 3 == 0 else 300 + (i * 13) % 50000,
+    )
+
+def old_rows(n):
+    # make_row keys sort in i order
+    return (make_row(i) for i in range(n))
+
+def new_batches(n, batch_rows=5000):
+    """The new release in scrambled order, as one source of batches"""
+    total = n + n // 200
+    batch = []
+    for k in range(total):
+        i = (k * SCRAMBLE) % total
+        if i >= n:
+            batch.append(make_row(i))
+        elif i % 200 != 1:
+            batch.append(make_row(i, changed=i % 100 == 0))
+        if len(batch) >= batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def dict_diff(n):
+    """Load both sides into dicts by key, then compare"""
+    old = {row_key(row): row for row in old_rows(n)}
+    new = {row_key(row): row for batch in new_batches(n) for row in batch}
+    counts = {'added': 0, 'removed': 0, 'changed': 0, 'unchanged': 0}
+    for key, row in new.items():
+        previous = old.pop(key, None)
+        if previous is None:
+            counts['added'] += 1
+        elif previous[3:] != row[3:]:
+            counts['changed'] += 1
+        else:
+            counts['unchanged'] += 1
+    counts['removed'] = len(old)
+    return counts
+
+def merge(n, chunk_rows):
+    counts = Counter()
+    for _ in merge_diff(old_rows(n), sorted_rows([new_batches(n)], chunk_rows), counts):
+        pass
+    return dict(counts)
+
+def measure(fn):
+    gc.collect()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def run(n, chunk_sizes):
+    print(f"{'method':<28} {'seconds':>8} {'rows/s':>10} {'peak MiB':>9}  counts")
+    expected = None
+    for label, fn in [(f"merge, chunk {size}", lambda size=size: merge(n, size)) for size in chunk_sizes] + [
+            ("merge, in memory", lambda: merge(n, 2 * n)),
+            ("dict diff", lambda: dict_diff(n))]:
+        counts, elapsed, peak = measure(fn)
+        counts = {key: counts.get(key, 0) for key in ('added', 'removed', 'changed', 'unchanged')}
+        expected = expected or counts
+        print(f"{label:<28} {elapsed:>8.2f} {n / elapsed:>10,.0f} {peak / 2**20:>9.1f}  {counts}"
+              + ("" if counts == expected else "  MISMATCH"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--chunk-rows", type=int, nargs="+", default=[50000, 200000])
+    args = parser.parse_args()
+    run(args.rows, args.chunk_rows)
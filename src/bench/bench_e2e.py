@@ -0,0 +1,231 @@
+"""End-to-end benchmark: synthetic PDFs served locally, loaded by main.main().
+
+Needs a disposable local Postgres in DATABASE_URL (or the PG* variables).
+The fee table lives in a scratch schema (selected through PGOPTIONS) that
+is dropped afterwards.
+
+Run from src/:  python -m bench.bench_e2e [--pdfs 4] [--pages 25] [--rows-per-page 40]
+                    [--runs 2] [--output report.json] [-- MAIN OPTIONS ...]
+
+Synthetic Part B PDFs and an index page are served by bench.local_site,
+and main.main() runs in a child process pointed at them via
+PART_B_INDEX_URL. Anything after "--" is passed to main (e.g. --workers 4
+--write-path copy). Run 1 is cold; later runs hit the download cache.
+The report is JSON: per-stage wall time, pages/s, rows/s and peak RSS,
+plus the commit it was measured on. Each run's stage breakdown comes from
+the run_report.json main writes (see utils/metrics.py).
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.bench_write_paths import FEE_TABLE_DDL
+from bench.local_site import LocalSite
+from bench.synthetic_pdf import fee_schedule_pdf
+from fee_scraper.database.db_connector import init_db, close_db, get_db_connection
+from fee_scraper.database.migrations import run_migrations
+from fee_scraper.scraper.extract_pdfs import iter_pdf_rows, get_extractor
+from fee_scraper.scraper.fetch_pdfs import fetch_part_b_pdf_urls
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def generate_site(root, pdfs, pages, rows_per_page):
+    """Write the PDFs and an index page linking them like the pa.gov page"""
+    pdf_dir = os.path.join(root, "documents", "part-b")
+    os.makedirs(pdf_dir)
+    links = []
+    for number in range(pdfs):
+        name = f"part-b-{number:03d}.pdf"
+        with open(os.path.join(pdf_dir, name), "wb") as f:
+            f.write(fee_schedule_pdf(pages, rows_per_page, start=number * pages * rows_per_page, seed=number))
+        links.append(f'<a id="button-{number}" href="/documents/part-b/{name}">{name}</a>')
+    with open(os.path.join(root, "index.html"), "w") as f:
+        f.write("<html><body>\n" + "\n".join(links) + "\n</body></html>\n")
+    return [os.path.join(pdf_dir, name) for name in sorted(os.listdir(pdf_dir))]
+
+def create_schema(schema):
+    init_db()
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE SCHEMA {schema}")
+                cur.execute(f"SET search_path TO {schema}")
+                cur.execute(FEE_TABLE_DDL)
+            conn.commit()
+            run_migrations(conn)
+            with conn.cursor() as cur:
+                cur.execute("RESET search_path")
+            conn.commit()
+    finally:
+        close_db()
+
+def query_schema(schema, sql):
+    init_db()
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SET search_path TO {schema}")
+                cur.execute(sql)
+                result = cur.fetchone() if cur.description else None
+            conn.commit()
+            return result
+    finally:
+        close_db()
+
+def time_extract(paths, extractor):
+    """Parse every PDF from disk with no network or database"""
+    pages = rows = 0
+    start = time.perf_counter()
+    for path in paths:
+        backend = get_extractor(extractor)
+        with open(path, "rb") as f:
+            rows += sum(len(batch) for batch in iter_pdf_rows(f, extractor=backend))
+        pages += backend.stats['learned'] + backend.stats['fallback']
+    return time.perf_counter() - start, pages, rows
+
+def run_main(main_args, env, log_path):
+    """Run main.main() in a child process; returns (seconds, exit code, peak RSS KiB)"""
+    command = [
+        sys.executable, "-c",
+        "import sys; sys.path.insert(0, 'src'); from fee_scraper.main import main; main(sys.argv[1:])",
+    ] + main_args
+    start = time.perf_counter()
+    with open(log_path, "ab") as log:
+        process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return elapsed, process.returncode, usage.ru_maxrss
+
+def read_stages(metrics_dir):
+    """Total seconds per stage from main's run report"""
+    try:
+        with open(os.path.join(metrics_dir, "run_report.json")) as f:
+            stages = json.load(f)["stages"]
+    except (OSError, ValueError, KeyError):
+        return None
+    return {stage: totals["seconds"] for stage, totals in stages.items()}
+
+def run(args, main_args):
+    schema = f"bench_e2e_{os.getpid()}"
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    site_dir = os.path.join(workdir, "site")
+    report = {
+        "commit": git_commit(),
+        "config": {
+            "pdfs": args.pdfs, "pages_per_pdf": args.pages,
+            "rows_per_page": args.rows_per_page, "latency_s": args.latency,
+            "main_args": main_args,
+        },
+        "stages_s": {},
+        "runs": [],
+    }
+    extractor = "tables"
+    if "--extractor" in main_args:
+        extractor = main_args[main_args.index("--extractor") + 1]
+
+    try:
+        start = time.perf_counter()
+        paths = generate_site(site_dir, args.pdfs, args.pages, args.rows_per_page)
+        report["stages_s"]["generate"] = time.perf_counter() - start
+        report["pdf_bytes"] = sum(os.path.getsize(path) for path in paths)
+
+        start = time.perf_counter()
+        create_schema(schema)
+        report["stages_s"]["schema"] = time.perf_counter() - start
+
+        elapsed, pages, rows = time_extract(paths, extractor)
+        report["stages_s"]["extract_only"] = elapsed
+        report["pages"] = pages
+        report["rows"] = rows
+        report["extract_pages_per_s"] = pages / elapsed
+
+        with LocalSite(site_dir, latency=args.latency) as site:
+            index_url = site.base_url + "index.html"
+            start = time.perf_counter()
+            urls = fetch_part_b_pdf_urls(url=index_url)
+            report["stages_s"]["index_fetch"] = time.perf_counter() - start
+            if len(urls) != args.pdfs:
+                raise RuntimeError(f"Index lists {len(urls)} PDFs, expected {args.pdfs}")
+
+            env = dict(os.environ)
+            env["PART_B_INDEX_URL"] = index_url
+            env["PGOPTIONS"] = (env.get("PGOPTIONS", "") + f" -c search_path={schema}").strip()
+            # Console logging only; the log file would land in src/logs
+            env["RAILWAY_ENVIRONMENT"] = "bench"
+            cache_args = ["--cache-dir", os.path.join(workdir, "cache")]
+            for number in range(1, args.runs + 1):
+                site.requests.clear()
+                metrics_dir = os.path.join(workdir, f"metrics_{number}")
+                elapsed, code, peak_kib = run_main(
+                    main_args + cache_args + ["--metrics-dir", metrics_dir],
+                    env, os.path.join(workdir, "main.log")
+                )
+                loaded = query_schema(schema, "SELECT count(*) FROM pa_wc_scheduleb_fees")[0]
+                report["runs"].append({
+                    "run": number,
+                    "wall_s": elapsed,
+                    "exit_code": code,
+                    "pages_per_s": pages / elapsed,
+                    "rows_per_s": rows / elapsed,
+                    "peak_rss_kib": peak_kib,
+                    "rows_in_table": loaded,
+                    "server_requests": sum(site.requests.values()),
+                    "stages_s": read_stages(metrics_dir),
+                })
+                if code != 0 or loaded != rows:
+                    with open(os.path.join(workdir, "main.log"), errors="replace") as log:
+                        sys.stderr.write(log.read()[-4000:])
+                    report["error"] = f"run {number}: exit {code}, {loaded}/{rows} rows loaded"
+                    break
+
+        report["harness_peak_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    finally:
+        try:
+            query_schema(schema, f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        finally:
+            if not args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+            else:
+                report["workdir"] = workdir
+    return report
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    main_args = []
+    if "--" in argv:
+        main_args = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdfs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=25)
+    parser.add_argument("--rows-per-page", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every HTTP response")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated site, cache and main.log")
+    args = parser.parse_args(argv)
+
+    report = run(args, main_args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    sys.exit(1 if "error" in report else 0)
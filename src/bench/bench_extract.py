@@ -0,0 +1,67 @@
+"""Benchmark and parity check for the PDF extraction backends.
+
+Run from src/:  python -m bench.bench_extract PDF [PDF ...]
+
+Each PDF is a local path or URL (URLs are downloaded once up front). Every
+backend is timed in pages/s and its rows are compared with plain
+pdfplumber table detection on every page ('tables', the default). 'layout'
+is the same backend reusing the first page's column layout. The exit
+status is non-zero if any backend disagrees.
+"""
+import argparse
+import sys
+import time
+
+import requests
+
+from fee_scraper.scraper.extract_pdfs import iter_pdf_rows, TableExtractor, WordExtractor
+
+BACKENDS = {
+    'tables': TableExtractor,
+    'layout': lambda: TableExtractor(use_layout=True),
+    'words': WordExtractor,
+}
+
+def load(source):
+    if source.startswith(("http://", "https://")):
+        response = requests.get(source)
+        response.raise_for_status()
+        return response.content
+    with open(source, "rb") as f:
+        return f.read()
+
+def extract(content, extractor):
+    start = time.perf_counter()
+    rows = [row for batch in iter_pdf_rows(content, extractor=extractor) for row in batch]
+    return rows, time.perf_counter() - start
+
+def first_difference(expected, actual):
+    for index, (left, right) in enumerate(zip(expected, actual)):
+        if left != right:
+            return f"row {index}: {left} != {right}"
+    return f"row count {len(expected)} != {len(actual)}"
+
+def run(sources, backends):
+    failures = 0
+    print(f"{'pdf':<32} {'backend':>8} {'pages':>6} {'pages/s':>9} {'fallback':>9} {'parity':>7}")
+    for source in sources:
+        content = load(source)
+        baseline, _ = extract(content, BACKENDS['tables']())
+        for name in backends:
+            extractor = BACKENDS[name]()
+            rows, elapsed = extract(content, extractor)
+            pages = extractor.stats['learned'] + extractor.stats['fallback']
+            parity = "ok" if rows == baseline else "DIFF"
+            print(f"{source[-32:]:<32} {name:>8} {pages:>6} {pages / elapsed:>9.2f} "
+                  f"{extractor.stats['fallback']:>9} {parity:>7}")
+            if rows != baseline:
+                failures += 1
+                print(f"    {first_difference(baseline, rows)}")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    args = parser.parse_args()
+    sys.exit(1 if run(args.pdfs, args.backends) else 0)
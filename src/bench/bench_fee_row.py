@@ -0,0 +1,97 @@
+"""Micro-benchmark: FeeRow tuples vs the string-keyed row dicts they replace.
+
+Run from src/:  python -m bench.bench_fee_row [--sizes 100000 500000]
+
+Rows are built from the same normalized cell text the extractor sees.
+For each representation it reports the memory held by the rows
+(tracemalloc, after the cell text is freed), build time, json.dumps
+(the JSON write format), row_hash (client-side diff) and the pickled
+size (what a pool worker sends back to the writer).
+"""
+import argparse
+import gc
+import hashlib
+import json
+import pickle
+import random
+import time
+import tracemalloc
+
+from fee_scraper.database.fee_row import FeeRow, FEE_COLUMNS
+from fee_scraper.database.row_hash import row_hash, CONTENT_COLUMNS
+
+def make_cells(n, seed=0):
+    rng = random.Random(seed)
+    cells = []
+    for i in range(n):
+        cells.append([
+            f"{i // 20:05d}",
+            rng.choice([None, '26', 'TC']) if i % 20 >= 10 else None,
+            f"{i % 20:03d}",
+            rng.choice(['000', '010', '090', 'XXX']),
+            rng.choice(['0', '2', '9']),
+            f"{rng.uniform(1, 500):.2f}",
+            f"{rng.uniform(1, 500):.2f}",
+            rng.choice([None, f"{rng.uniform(1, 500):.2f}"]),
+        ])
+    return cells
+
+def _fresh(value):
+    # pdfplumber returns a new string for every cell
+    return value if value is None else ''.join(value)
+
+def build_dicts(cells):
+    # What the extractor produced before FeeRow: one dict per row
+    return [{col: _fresh(value) for col, value in zip(FEE_COLUMNS, row)} for row in cells]
+
+def build_fee_rows(cells):
+    return [FeeRow.from_text(*map(_fresh, row)) for row in cells]
+
+def dict_row_hash(row):
+    payload = '\x1f'.join(row.get(col) or '' for col in CONTENT_COLUMNS)
+    return hashlib.md5(payload.encode('utf-8')).digest()
+
+def measure(build, cells):
+    """(rows, build seconds, bytes held); timed without tracemalloc running"""
+    gc.collect()
+    start = time.perf_counter()
+    rows = build(cells)
+    elapsed = time.perf_counter() - start
+    del rows
+    gc.collect()
+    tracemalloc.start()
+    rows = build(cells)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rows, elapsed, size
+
+def timed(fn, rows):
+    gc.collect()
+    start = time.perf_counter()
+    fn(rows)
+    return time.perf_counter() - start
+
+def run(sizes):
+    print(f"{'rows':>8} {'type':>7} {'MiB':>7} {'B/row':>6} {'build s':>8} {'json s':>7} "
+          f"{'hash s':>7} {'pickle MiB':>11}")
+    for n in sizes:
+        cells = make_cells(n)
+        results = []
+        for name, build, hasher in (('dict', build_dicts, dict_row_hash), ('FeeRow', build_fee_rows, row_hash)):
+            rows, build_s, size = measure(build, cells)
+            json_s = timed(json.dumps, rows)
+            hash_s = timed(lambda rs: [hasher(r) for r in rs], rows)
+            pickled = len(pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL))
+            results.append((size, build_s, json_s, hash_s))
+            print(f"{n:>8} {name:>7} {size / 2**20:>7.1f} {size / n:>6.0f} {build_s:>8.3f} "
+                  f"{json_s:>7.3f} {hash_s:>7.3f} {pickled / 2**20:>11.1f}")
+            del rows
+        (dict_size, *dict_times), (row_size, *row_times) = results
+        ratios = ' '.join(f"{a / b:.2f}x" for a, b in zip(dict_times, row_times))
+        print(f"{'':>8} {'ratio':>7} {dict_size / row_size:>7.2f}x  build/json/hash {ratios}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 500000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,161 @@
+"""Benchmark: fee history upkeep on each release, and as-of lookups as history grows.
+
+Needs a disposable local Postgres in DATABASE_URL (or the PG* variables).
+Everything runs in a scratch schema that is dropped afterwards.
+
+Run from src/:  python -m bench.bench_history [--rows 100000] [--releases 10] [--change-ratio 0.05]
+
+The fee table is loaded with the upsert path, then --releases reloads
+each change --change-ratio of the rows. This runs once with the history
+triggers disabled and once with them on, so the difference is the cost
+of keeping history; "overhead" is that difference as a share of the
+upsert without history, and the totals over all releases are printed last. After each release with history, random keys are
+looked up with fee_as_of() at random earlier release times.
+
+Churn is read from pg_stat_user_tables after each release: rows updated
+and dead tuples left in the history (its partitions summed), and dead
+tuples in the live table with and without history. History is insert
+only, so its updated and dead counts should stay at zero.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+from fee_scraper.database.db_connector import init_db, close_db, get_db_connection
+from fee_scraper.database.fee_history import HISTORY_TABLE, fee_as_of
+from fee_scraper.database.migrations import add_row_hash, add_natural_key_unique_index, add_fee_history
+from bench.bench_reconcile import make_rows
+from bench.bench_write_paths import FEE_TABLE_DDL, change_rows, load_upsert, timed
+
+HISTORY_TRIGGERS = (
+    'pa_wc_scheduleb_fees_history_insert',
+    'pa_wc_scheduleb_fees_history_update',
+    'pa_wc_scheduleb_fees_history_delete',
+)
+
+def set_history_triggers(conn, enabled):
+    with conn.cursor() as cur:
+        for trigger in HISTORY_TRIGGERS:
+            cur.execute(f"ALTER TABLE pa_wc_scheduleb_fees {'ENABLE' if enabled else 'DISABLE'} TRIGGER {trigger}")
+    conn.commit()
+
+def reset(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"TRUNCATE pa_wc_scheduleb_fees, {HISTORY_TABLE}")
+    conn.commit()
+
+def lookups_per_second(conn, rows, times, count, rng):
+    start = time.perf_counter()
+    found = 0
+    for _ in range(count):
+        row = rows[rng.randrange(len(rows))]
+        if fee_as_of(conn, rng.choice(times), row[0], row[1], row[2]) is not None:
+            found += 1
+    return count / (time.perf_counter() - start), found
+
+def table_stats(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_stat_force_next_flush()")
+        cur.execute(f"""
+            SELECT
+                (SELECT count(*) FROM {HISTORY_TABLE}),
+                (SELECT sum(pg_total_relation_size(inhrelid)) FROM pg_inherits
+                 WHERE inhparent = '{HISTORY_TABLE}'::regclass),
+                pg_total_relation_size('pa_wc_scheduleb_fees')
+        """)
+        versions, history_bytes, live_bytes = cur.fetchone()
+    conn.commit()
+    return versions, history_bytes or 0, live_bytes
+
+def churn(conn):
+    """(history rows updated, history dead tuples, live dead tuples) so far"""
+    with conn.cursor() as cur:
+        # This backend's counts are flushed when the transaction ends
+        cur.execute("SELECT pg_stat_force_next_flush()")
+        conn.commit()
+        cur.execute(f"""
+            SELECT
+                (SELECT COALESCE(sum(n_tup_upd), 0) FROM pg_stat_user_tables s
+                 JOIN pg_inherits i ON i.inhrelid = s.relid
+                 WHERE i.inhparent = '{HISTORY_TABLE}'::regclass),
+                (SELECT COALESCE(sum(n_dead_tup), 0) FROM pg_stat_user_tables s
+                 JOIN pg_inherits i ON i.inhrelid = s.relid
+                 WHERE i.inhparent = '{HISTORY_TABLE}'::regclass),
+                (SELECT n_dead_tup FROM pg_stat_user_tables
+                 WHERE relid = 'pa_wc_scheduleb_fees'::regclass)
+        """)
+        counts = cur.fetchone()
+    conn.commit()
+    return counts
+
+def run(n, releases, change_ratio, chunk_rows, lookups):
+    init_db()
+    schema = f"bench_history_{os.getpid()}"
+    rng = random.Random(7)
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE SCHEMA {schema}")
+                cur.execute(f"SET search_path TO {schema}")
+                cur.execute(FEE_TABLE_DDL)
+            conn.commit()
+            add_row_hash(conn)
+            add_natural_key_unique_index(conn)
+            add_fee_history(conn)
+
+            rows = make_rows(n)
+            release_rows = [rows]
+            for release in range(1, releases + 1):
+                release_rows.append(change_rows(release_rows[-1], change_ratio, seed=release))
+
+            baseline = []
+            set_history_triggers(conn, False)
+            reset(conn)
+            for batch in release_rows:
+                elapsed = timed(load_upsert, conn, conn.cursor(), batch, chunk_rows)
+                baseline.append((elapsed, churn(conn)[2]))
+
+            set_history_triggers(conn, True)
+            reset(conn)
+            # n_tup_upd is cumulative; TRUNCATE only resets the dead tuples
+            start_updates = churn(conn)[0]
+            times = []
+            with_history = []
+            print(f"{'release':>7} {'no history (s)':>15} {'history (s)':>12} {'overhead':>9} {'versions':>10} "
+                  f"{'history MiB':>12} {'live MiB':>9} {'as-of/s':>9} "
+                  f"{'hist upd':>9} {'hist dead':>10} {'live dead':>10} {'no-hist dead':>13}")
+            for release, batch in enumerate(release_rows):
+                elapsed = timed(load_upsert, conn, conn.cursor(), batch, chunk_rows)
+                with_history.append(elapsed)
+                times.append(datetime.now(timezone.utc))
+                rate, found = lookups_per_second(conn, rows, times, lookups, rng)
+                if found != lookups:
+                    raise RuntimeError(f"Release {release}: {lookups - found} as-of lookups found nothing")
+                versions, history_bytes, live_bytes = table_stats(conn)
+                history_updates, history_dead, live_dead = churn(conn)
+                overhead = elapsed / baseline[release][0] - 1
+                print(f"{release:>7} {baseline[release][0]:>15.2f} {elapsed:>12.2f} {overhead:>9.0%} {versions:>10} "
+                      f"{history_bytes / 2**20:>12.1f} {live_bytes / 2**20:>9.1f} {rate:>9.0f} "
+                      f"{history_updates - start_updates:>9} {history_dead:>10} {live_dead:>10} "
+                      f"{baseline[release][1]:>13}")
+            without = sum(elapsed for elapsed, _ in baseline)
+            print(f"Upsert path over {len(release_rows)} loads: {without:.2f} s without history, "
+                  f"{sum(with_history):.2f} s with it ({sum(with_history) / without - 1:+.0%})")
+
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA {schema} CASCADE")
+            conn.commit()
+    finally:
+        close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--releases", type=int, default=10)
+    parser.add_argument("--change-ratio", type=float, default=0.05)
+    parser.add_argument("--chunk-rows", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.rows, args.releases, args.change_ratio, args.chunk_rows, args.lookups)
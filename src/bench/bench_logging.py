@@ -0,0 +1,84 @@
+"""Benchmark: per-row logging cost, synchronous vs queued vs progress mode.
+
+Run from src/:  python -m bench.bench_logging [--rows 100000]
+
+Replays the json write path's logging of classified rows (pipeline.writer.
+log_classified_records plus a Progress line per 5000-row batch) with the
+console and log-file handlers writing to temporary files. "hot" is time
+spent in the writer thread; "total" also waits for the queue listener to
+drain, i.e. the I/O moved off the hot path. --write-latency makes every
+console write block for that many seconds, like stdout piped to a slow
+log collector.
+"""
+import argparse
+import gc
+import logging
+import tempfile
+import time
+
+from bench.bench_reconcile import make_rows
+from fee_scraper.pipeline.writer import log_classified_records
+from fee_scraper.utils import logger as log_setup
+from fee_scraper.utils.logger import Progress, build_handlers, attach_handlers, stop_logging
+
+MODES = [
+    # (name, verbosity, queued)
+    ("sync records", "records", False),
+    ("queued records", "records", True),
+    ("queued progress", "progress", True),
+]
+
+class SlowStream:
+    """File wrapper whose writes block, standing in for a congested pipe"""
+
+    def __init__(self, stream, latency):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text):
+        time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def replay(logger, records, batch_rows):
+    progress = Progress(logger, "PDF 1/1")
+    for start in range(0, len(records), batch_rows):
+        batch = records[start:start + batch_rows]
+        log_classified_records(batch, len(batch))
+        progress.update(start + len(batch))
+
+def run(rows, batch_rows, write_latency):
+    statuses = ['new', 'changed', 'duplicate']
+    records = [(statuses[i % 3], row) for i, row in enumerate(make_rows(rows))]
+    logger = logging.getLogger('fee_schedule_scraper')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    print(f"{'mode':<16} {'hot (s)':>8} {'total (s)':>10} {'lines':>9}")
+    for name, verbosity, queued in MODES:
+        with tempfile.TemporaryDirectory() as log_dir, tempfile.TemporaryFile('w+') as console:
+            log_setup.verbosity = verbosity
+            stream = SlowStream(console, write_latency) if write_latency else console
+            attach_handlers(logger, build_handlers(log_dir, stream), use_queue=queued)
+            gc.collect()
+            start = time.perf_counter()
+            replay(logger, records, batch_rows)
+            hot = time.perf_counter() - start
+            stop_logging()
+            for handler in logger.handlers:
+                handler.flush()
+            total = time.perf_counter() - start
+            console.seek(0)
+            lines = sum(1 for _ in console)
+            attach_handlers(logger, [], use_queue=False)
+        print(f"{name:<16} {hot:>8.2f} {total:>10.2f} {lines:>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch-rows", type=int, default=5000)
+    parser.add_argument("--write-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    run(args.rows, args.batch_rows, args.write_latency)
@@ -0,0 +1,122 @@
+"""Benchmark: fee lookups per second from lookup.fee_lookup.
+
+Run from src/:  python -m bench.bench_lookup [--rows 500000] [--db]
+
+The in-memory FeeIndex is always measured: get(), lookup_many() in
+batches, prefix() and code_range(). With --db the rows are also loaded
+into a scratch schema of the database in DATABASE_URL (dropped
+afterwards) to compare a row-by-row SELECT per key, as billing services
+query today, with DbFeeLookup (cold, then served by its LRU cache) and
+FeeLookup.from_db.
+"""
+import argparse
+import functools
+import gc
+import os
+import random
+import time
+
+from bench.bench_reconcile import make_rows
+from fee_scraper.lookup.fee_lookup import FeeIndex, FeeLookup, DbFeeLookup, FEE_SELECT
+
+def sample_keys(rows, count, miss_ratio=0.1, seed=0):
+    rng = random.Random(seed)
+    keys = []
+    for _ in range(count):
+        if rng.random() < miss_ratio:
+            keys.append(("99999", None, "999"))
+        else:
+            row = rng.choice(rows)
+            keys.append((row.cpt_hcpc_code, row.modifier, row.medicare_location))
+    return keys
+
+def rate(label, count, fn):
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {count / elapsed:>14,.0f} /s")
+    return elapsed
+
+def lookup_batches(lookup, keys, batch):
+    return [lookup.lookup_many(keys[i:i + batch]) for i in range(0, len(keys), batch)]
+
+def bench_index(index, keys, batch):
+    get = index.get
+    rate("get()", len(keys), lambda: [get(*key) for key in keys])
+    rate(f"lookup_many() keys, batches of {batch}", len(keys),
+         lambda: lookup_batches(index, keys, batch))
+    codes = [key[0] for key in keys[:10000]]
+    rate("prefix() queries, 4-char prefix", len(codes), lambda: [index.prefix(code[:4]) for code in codes])
+    rate("code_range() queries, 10 codes", len(codes),
+         lambda: [index.code_range(code, f"{int(code) + 10:05d}") for code in codes])
+
+def bench_db(rows, keys, batch, cache_size):
+    from fee_scraper.database.db_connector import init_db, close_db, get_db_connection, upsert_fee_rows
+    from fee_scraper.database.migrations import run_migrations
+    from bench.bench_write_paths import FEE_TABLE_DDL
+
+    init_db()
+    schema = f"bench_lookup_{os.getpid()}"
+    try:
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"CREATE SCHEMA {schema}")
+            cur.execute(f"SET search_path TO {schema}")
+            cur.execute(FEE_TABLE_DDL)
+            conn.commit()
+            run_migrations(conn)
+            for start in range(0, len(rows), 5000):
+                upsert_fee_rows(cur, rows[start:start + 5000])
+            conn.commit()
+
+            single = keys[:5000]
+            def row_by_row():
+                for code, modifier, location in single:
+                    cur.execute(FEE_SELECT + """
+                        WHERE "cpt/hcpc_code" = %s AND COALESCE(modifier, '') = %s
+                        AND COALESCE(medicare_location, '') = %s
+                    """, (code, modifier or '', location or ''))
+                    cur.fetchone()
+                conn.rollback()
+            rate("row-by-row SELECT", len(single), row_by_row)
+
+            lookup = DbFeeLookup(conn, cache_size=cache_size)
+            # The lookup is bound explicitly so the del below frees it
+            rate(f"DbFeeLookup cold, batches of {batch}", len(keys),
+                 functools.partial(lookup_batches, lookup, keys, batch))
+            rate(f"DbFeeLookup warm (LRU), batches of {batch}", len(keys),
+                 functools.partial(lookup_batches, lookup, keys, batch))
+            print(f"{'DbFeeLookup hits / misses':<40} {lookup.hits:>10} / {lookup.misses}")
+            del lookup
+            gc.collect()
+
+            start = time.perf_counter()
+            memory = FeeLookup.from_db(conn)
+            print(f"{'FeeLookup.from_db load':<40} {time.perf_counter() - start:>13.2f} s")
+            rate("FeeLookup.from_db get()", len(keys), lambda: [memory.get(*key) for key in keys])
+
+            cur.execute(f"DROP SCHEMA {schema} CASCADE")
+            conn.commit()
+    finally:
+        close_db()
+
+def run(n, lookups, batch, db, cache_size):
+    rows = make_rows(n)
+    keys = sample_keys(rows, lookups)
+    start = time.perf_counter()
+    index = FeeIndex(rows)
+    print(f"{n} rows, {len(index.codes)} codes; FeeIndex built in {time.perf_counter() - start:.2f} s")
+    bench_index(index, keys, batch)
+    if db:
+        bench_db(rows, keys, batch, cache_size)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--cache-size", type=int, default=250000)
+    parser.add_argument("--db", action="store_true", help="Also benchmark the database-backed lookups")
+    args = parser.parse_args()
+    run(args.rows, args.lookups, args.batch, args.db, args.cache_size)
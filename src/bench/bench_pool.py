@@ -0,0 +1,177 @@
+"""Benchmark: prepared statements and concurrent writers on the connection pool.
+
+Needs a disposable local Postgres in DATABASE_URL (or the PG* variables).
+Everything runs in a scratch schema that is dropped afterwards.
+
+Run from src/:  python -m bench.bench_pool [--batches 2000] [--batch-rows 50] [--threads 1 2 4 8]
+
+1. The same small batches go through upsert_fee_rows() and the
+   classify statement with DB_PREPARED_STATEMENTS on and off, so the
+   difference is the parse and plan time that prepared statements save.
+2. Each --threads count upserts disjoint keys on its own pooled
+   connection, one commit per batch, through a pool of that size.
+3. Every idle connection's backend is terminated, and the next checkout
+   must replace it with a working one.
+"""
+import argparse
+import contextlib
+import os
+import threading
+import time
+
+import psycopg2
+
+import fee_scraper.database.db_connector as db
+from fee_scraper.database.fee_row import FeeRow
+from fee_scraper.database.migrations import add_row_hash, add_natural_key_unique_index
+from bench.bench_write_paths import FEE_TABLE_DDL
+from fee_scraper.pipeline.writer import CLASSIFY_STATEMENT
+
+def make_batch(start, rows):
+    return [
+        FeeRow(f"{i // 20:05d}", None, f"{i % 20:03d}", 'XXX', '9', 100 + i % 5000, 200 + i % 7000, None)
+        for i in range(start, start + rows)
+    ]
+
+def open_pool(schema, size, prepare):
+    os.environ['DB_PREPARED_STATEMENTS'] = '1' if prepare else '0'
+    os.environ['PGOPTIONS'] = f"-c search_path={schema}"
+    db.init_db(maxconn=size)
+
+def repeated_statements(schema, batches, batch_rows):
+    print(f"{'prepared':>8} {'statement':>9} {'batches':>8} {'seconds':>8} {'ms/batch':>9}")
+    for prepare in (False, True):
+        open_pool(schema, 1, prepare)
+        try:
+            with db.get_db_connection() as conn:
+                cur = conn.cursor()
+                data = [make_batch((b % 50) * batch_rows, batch_rows) for b in range(batches)]
+                for label, run in (
+                    ("upsert", lambda batch: db.upsert_fee_rows(cur, batch)),
+                    ("classify", lambda batch: (CLASSIFY_STATEMENT.execute(cur, (db.fee_rows_json(batch),)),
+                                                cur.fetchall())),
+                ):
+                    # Warm up, and load the rows so later upserts are unchanged
+                    for batch in data[:50]:
+                        run(batch)
+                    cur.execute("ANALYZE pa_wc_scheduleb_fees")
+                    conn.commit()
+                    start = time.perf_counter()
+                    for batch in data:
+                        run(batch)
+                    conn.commit()
+                    elapsed = time.perf_counter() - start
+                    print(f"{str(prepare):>8} {label:>9} {batches:>8} {elapsed:>8.2f} {elapsed / batches * 1000:>9.2f}")
+        finally:
+            db.close_db()
+
+def concurrent_writers(schema, thread_counts, batches, batch_rows):
+    print(f"\n{'threads':>7} {'batches':>8} {'seconds':>8} {'rows/s':>9} {'errors':>7}")
+    for threads in thread_counts:
+        open_pool(schema, threads, True)
+        with db.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE pa_wc_scheduleb_fees")
+            conn.commit()
+        errors = []
+        per_thread = batches // threads
+
+        def writer(number):
+            try:
+                with db.get_db_connection() as conn:
+                    cur = conn.cursor()
+                    for b in range(per_thread):
+                        db.upsert_fee_rows(cur, make_batch((number * per_thread + b) * batch_rows, batch_rows))
+                        conn.commit()
+            except Exception as e:
+                errors.append(e)
+
+        try:
+            workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            with db.get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT count(*) FROM pa_wc_scheduleb_fees")
+                    rows = cur.fetchone()[0]
+                conn.commit()
+        finally:
+            db.close_db()
+        expected = per_thread * threads * batch_rows
+        print(f"{threads:>7} {per_thread * threads:>8} {elapsed:>8.2f} {rows / elapsed:>9.0f} {len(errors):>7}"
+              + ("" if rows == expected and not errors else f"  {rows}/{expected} rows: {errors[:1]}"))
+
+def broken_connections(schema, size):
+    open_pool(schema, size, True)
+    try:
+        db.pool.validate_after = 0
+        with contextlib.ExitStack() as stack:
+            conns = [stack.enter_context(db.get_db_connection()) for _ in range(size)]
+            pids = [conn.info.backend_pid for conn in conns]
+        # Kill the idle connections' backends from outside the pool
+        killer = psycopg2.connect(**conns[0].info.dsn_parameters, password=conns[0].info.password)
+        try:
+            with killer.cursor() as cur:
+                cur.execute("SELECT pg_terminate_backend(pid) FROM unnest(%s) AS pid", (pids,))
+            killer.commit()
+        finally:
+            killer.close()
+        time.sleep(0.2)
+        recycled_before = db.METRICS.total('db_connections_recycled_total')
+        working = 0
+        with contextlib.ExitStack() as stack:
+            for _ in range(size):
+                conn = stack.enter_context(db.get_db_connection())
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                    working += cur.fetchone()[0]
+                conn.commit()
+        recycled = db.METRICS.total('db_connections_recycled_total') - recycled_before
+        print(f"\nterminated {len(pids)} idle backends: {recycled:.0f} replaced on checkout, "
+              f"{working}/{size} checkouts working")
+    finally:
+        db.close_db()
+
+def run(args):
+    schema = f"bench_pool_{os.getpid()}"
+    db.init_db(maxconn=1)
+    try:
+        with db.get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE SCHEMA {schema}")
+                cur.execute(f"SET search_path TO {schema}")
+                cur.execute(FEE_TABLE_DDL)
+            conn.commit()
+            add_row_hash(conn)
+            add_natural_key_unique_index(conn)
+            with conn.cursor() as cur:
+                cur.execute("RESET search_path")
+            conn.commit()
+    finally:
+        db.close_db()
+    try:
+        repeated_statements(schema, args.batches, args.batch_rows)
+        concurrent_writers(schema, args.threads, args.batches, args.batch_rows)
+        broken_connections(schema, max(args.threads))
+    finally:
+        os.environ.pop('PGOPTIONS', None)
+        db.init_db(maxconn=1)
+        try:
+            with db.get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+                conn.commit()
+        finally:
+            db.close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batches", type=int, default=2000)
+    parser.add_argument("--batch-rows", type=int, default=50)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    run(args)
@@ -0,0 +1,164 @@
+"""Scaling benchmark: N scraper processes sharing one run through the work queue.
+
+Needs a disposable local Postgres in DATABASE_URL (or the PG* variables).
+
+Run from src/:  python -m bench.bench_queue [--workers 1 2 4] [--pdfs 16] [--pages 10]
+                    [--latency 0.2] [--kill-after 3] [-- MAIN OPTIONS ...]
+
+Synthetic PDFs are served by bench.local_site, as in bench_e2e. For each
+worker count a fresh scratch schema is created and that many
+main.main(['--work-queue']) processes are started together, each with
+its own download cache like separate replicas. The report gives wall
+time, PDFs/s, rows/s, speedup and efficiency over the first worker
+count, and how many PDFs each worker committed. --kill-after SIGKILLs
+one worker that many seconds in, to show its claim going stale and
+being taken over (use a short --claim-timeout after "--").
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.bench_e2e import REPO_ROOT, git_commit, generate_site, create_schema, query_schema
+from bench.local_site import LocalSite
+
+def start_worker(main_args, env, log_path):
+    command = [
+        sys.executable, "-c",
+        "import sys; sys.path.insert(0, 'src'); from fee_scraper.main import main; main(sys.argv[1:])",
+    ] + main_args
+    log = open(log_path, "ab")
+    try:
+        return subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    finally:
+        log.close()
+
+def run_workers(count, schema, index_url, workdir, main_args, kill_after=None):
+    """Start count queue workers on a fresh schema and wait for all of them"""
+    create_schema(schema)
+    env = dict(os.environ)
+    env["PART_B_INDEX_URL"] = index_url
+    env["PGOPTIONS"] = (env.get("PGOPTIONS", "") + f" -c search_path={schema}").strip()
+    env["RAILWAY_ENVIRONMENT"] = "bench"
+    log_path = os.path.join(workdir, f"workers_{count}.log")
+    start = time.perf_counter()
+    processes = []
+    for number in range(count):
+        cache_dir = os.path.join(workdir, f"cache_{count}_{number}")
+        metrics_dir = os.path.join(workdir, f"metrics_{count}_{number}")
+        processes.append(start_worker(
+            ["--work-queue", "--cache-dir", cache_dir, "--metrics-dir", metrics_dir] + main_args,
+            env, log_path
+        ))
+    killed = None
+    if kill_after is not None and count > 1:
+        time.sleep(kill_after)
+        killed = processes[0].pid
+        processes[0].send_signal(signal.SIGKILL)
+    codes = [process.wait() for process in processes]
+    elapsed = time.perf_counter() - start
+    return elapsed, codes, killed, log_path
+
+def queue_state(schema):
+    rows = query_schema(schema, """
+        SELECT json_build_object(
+            'rows', (SELECT count(*) FROM pa_wc_scheduleb_fees),
+            'run_status', (SELECT string_agg(DISTINCT status, ',') FROM scrape_runs),
+            'by_worker', (
+                SELECT json_object_agg(worker, pdfs) FROM (
+                    SELECT worker, count(*) AS pdfs FROM scrape_run_pdfs
+                    WHERE status = 'committed' GROUP BY worker
+                ) w
+            ),
+            'by_status', (
+                SELECT json_object_agg(status, pdfs) FROM (
+                    SELECT status, count(*) AS pdfs FROM scrape_run_pdfs GROUP BY status
+                ) s
+            ),
+            'retried', (SELECT count(*) FROM scrape_run_pdfs WHERE attempts > 1)
+        )
+    """)
+    return rows[0]
+
+def run(args, main_args):
+    workdir = tempfile.mkdtemp(prefix="bench_queue_")
+    report = {
+        "commit": git_commit(),
+        "config": {
+            "pdfs": args.pdfs, "pages_per_pdf": args.pages, "rows_per_page": args.rows_per_page,
+            "latency_s": args.latency, "kill_after_s": args.kill_after, "main_args": main_args,
+        },
+        "runs": [],
+    }
+    rows = args.pdfs * args.pages * args.rows_per_page
+    try:
+        generate_site(os.path.join(workdir, "site"), args.pdfs, args.pages, args.rows_per_page)
+        with LocalSite(os.path.join(workdir, "site"), latency=args.latency) as site:
+            index_url = site.base_url + "index.html"
+            for count in args.workers:
+                schema = f"bench_queue_{os.getpid()}_{count}"
+                try:
+                    elapsed, codes, killed, log_path = run_workers(
+                        count, schema, index_url, workdir, main_args, args.kill_after
+                    )
+                    state = queue_state(schema)
+                finally:
+                    query_schema(schema, f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+                result = {
+                    "workers": count,
+                    "wall_s": round(elapsed, 3),
+                    "pdfs_per_s": round(args.pdfs / elapsed, 3),
+                    "rows_per_s": round(rows / elapsed),
+                    "exit_codes": codes,
+                    "killed_pid": killed,
+                    **state,
+                }
+                report["runs"].append(result)
+                if state["rows"] != rows or state["run_status"] != "completed":
+                    with open(log_path, errors="replace") as log:
+                        sys.stderr.write(log.read()[-4000:])
+                    report["error"] = f"{count} workers: {state['rows']}/{rows} rows, run {state['run_status']}"
+                    break
+        base = report["runs"][0]
+        for result in report["runs"]:
+            speedup = base["wall_s"] / result["wall_s"]
+            result["speedup"] = round(speedup, 2)
+            result["efficiency"] = round(speedup * base["workers"] / result["workers"], 2)
+    finally:
+        if args.keep:
+            report["workdir"] = workdir
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    main_args = []
+    if "--" in argv:
+        main_args = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--pdfs", type=int, default=16)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--rows-per-page", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds added to every HTTP response")
+    parser.add_argument("--kill-after", type=float, default=None,
+                        help="SIGKILL the first worker after this many seconds (worker counts above 1)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated site, caches and logs")
+    args = parser.parse_args(argv)
+
+    report = run(args, main_args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    sys.exit(1 if "error" in report else 0)
@@ -0,0 +1,82 @@
+"""Micro-benchmark: hash-indexed reconciliation vs the old linear scan.
+
+Run from src/:  python -m bench.bench_reconcile [--sizes 1000 10000 100000]
+
+The linear scan is O(n^2), so above --legacy-limit rows it is timed on a
+sample of results and extrapolated (marked "est").
+"""
+import argparse
+import gc
+import random
+import time
+
+from fee_scraper.database.fee_row import FeeRow
+from fee_scraper.pipeline.reconcile import reconcile
+
+STATUSES = ['new', 'changed', 'duplicate']
+
+def make_rows(n, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        rows.append(FeeRow.from_text(
+            f"{i // 20:05d}",
+            rng.choice([None, '26', 'TC']) if i % 20 >= 10 else None,
+            f"{i % 20:03d}",
+            'XXX',
+            '9',
+            f"{rng.uniform(1, 500):.2f}",
+        ))
+    return rows
+
+def make_results(rows, seed=0):
+    rng = random.Random(seed)
+    return [
+        (r.cpt_hcpc_code, r.modifier, r.medicare_location, rng.choice(STATUSES))
+        for r in rows
+    ]
+
+def legacy_match(tables, results):
+    """The per-result list comprehension main.py used before reconcile()"""
+    matched = []
+    for cpt_code, modifier, location, status in results:
+        matching_rows = [r for r in tables
+                      if r.cpt_hcpc_code == cpt_code
+                      and r.modifier == modifier
+                      and r.medicare_location == location]
+        if matching_rows:
+            matched.append((status, matching_rows[0]))
+    return matched
+
+def run(sizes, legacy_limit, sample):
+    print(f"{'rows':>8} {'reconcile (s)':>14} {'linear scan (s)':>16} {'speedup':>9}")
+    for n in sizes:
+        rows = make_rows(n)
+        results = make_results(rows)
+        gc.collect()
+
+        start = time.perf_counter()
+        reconcile(rows, results)
+        indexed = time.perf_counter() - start
+
+        if n <= legacy_limit:
+            start = time.perf_counter()
+            legacy_match(rows, results)
+            legacy = time.perf_counter() - start
+            label = f"{legacy:16.3f}"
+        else:
+            subset = results[:sample]
+            start = time.perf_counter()
+            legacy_match(rows, subset)
+            legacy = (time.perf_counter() - start) * n / len(subset)
+            label = f"{legacy:12.3f} est"
+
+        print(f"{n:>8} {indexed:>14.4f} {label} {legacy / indexed:>8.0f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--legacy-limit", type=int, default=10000)
+    parser.add_argument("--sample", type=int, default=500)
+    args = parser.parse_args()
+    run(args.sizes, args.legacy_limit, args.sample)
@@ -0,0 +1,110 @@
+"""Benchmark: RowValidator vs the per-cell normalize + is_valid_record path.
+
+Run from src/:  python -m bench.bench_validate [--rows 1000000]
+
+The corpus is raw table rows as pdfplumber returns them (strings, 'X'
+for empty amounts), with a sprinkling of repeated header rows, empty
+rows and title lines. The legacy path is what extraction did before
+RowValidator: normalize_value() on every cell, a FeeRow per row, then
+main.is_valid_record() scanning every value for four header strings.
+"""
+import argparse
+import gc
+import random
+import time
+
+from fee_scraper.database.fee_row import FeeRow, FEE_COLUMNS
+from fee_scraper.scraper.extract_pdfs import normalize_key, normalize_value
+from fee_scraper.scraper.validate import RowValidator
+
+PDF_HEADERS = [
+    'CPT/HCPC Code', 'Modifier', 'Medicare Location', 'Global Surgery Indicator',
+    'Multiple Surgery Indicator', 'Prevailing Charge Amount', 'Fee Schedule Amount',
+    'Site of Service Amount',
+]
+TITLE = "Pennsylvania Workers' Compensation Medical Fee Schedule - Part B"
+
+def make_corpus(n, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        roll = rng.random()
+        if roll < 0.01:
+            rows.append(list(PDF_HEADERS))
+        elif roll < 0.02:
+            rows.append([''] * 8)
+        elif roll < 0.03:
+            rows.append([TITLE] + [None] * 7)
+        else:
+            rows.append([
+                f"{i // 20:05d}",
+                rng.choice(['', '26', 'TC']) if i % 20 >= 10 else '',
+                f"{i % 20:03d}",
+                rng.choice(['000', '010', '090', 'XXX']),
+                rng.choice(['0', '2', '9']),
+                f"{rng.uniform(1, 500):.2f}",
+                rng.choice(['X', f"{rng.uniform(1, 500):.2f}"]),
+                rng.choice(['X', '-', f" {rng.uniform(1, 500):.2f} "]),
+            ])
+    return rows
+
+def legacy_is_valid_record(row):
+    """main.is_valid_record before RowValidator"""
+    if not row.cpt_hcpc_code:
+        return False
+    header_indicators = [
+        'Site of Service Amount',
+        'Multiple Surgery Indicator',
+        'Service Amount',
+        'Surgery Indicator'
+    ]
+    for value in row:
+        if isinstance(value, str) and any(indicator in value for indicator in header_indicators):
+            return False
+    return True
+
+def legacy_rows(headers, rows):
+    """The extractor's per-cell normalization before RowValidator"""
+    fields = [(cell, FEE_COLUMNS.index(header)) for cell, header in enumerate(headers)
+              if header in FEE_COLUMNS]
+    for row in rows:
+        values = [None] * len(FEE_COLUMNS)
+        for cell, field_index in fields:
+            if cell < len(row):
+                values[field_index] = normalize_value(row[cell])
+        fee_row = FeeRow.from_text(*values)
+        if legacy_is_valid_record(fee_row):
+            yield fee_row
+
+def timed(rows):
+    """Consume rows like the writer does, without keeping them; (count, seconds)"""
+    gc.collect()
+    start = time.perf_counter()
+    count = sum(1 for _ in rows)
+    return count, time.perf_counter() - start
+
+def run(n):
+    corpus = make_corpus(n)
+    headers = [normalize_key(h) for h in PDF_HEADERS]
+
+    legacy_count, legacy_s = timed(legacy_rows(headers, corpus))
+    validator = RowValidator(headers)
+    accepted_count, validator_s = timed(validator.rows(corpus))
+
+    print(f"{'path':<14} {'seconds':>8} {'rows/s':>12} {'accepted':>9}")
+    print(f"{'legacy':<14} {legacy_s:>8.2f} {n / legacy_s:>12,.0f} {legacy_count:>9}")
+    print(f"{'RowValidator':<14} {validator_s:>8.2f} {n / validator_s:>12,.0f} {accepted_count:>9}")
+    print(f"speedup {legacy_s / validator_s:.2f}x")
+    print("rejected: " + ", ".join(f"{reason} {count}" for reason, count in sorted(validator.rejected.items())))
+
+    # The legacy path let title lines through; otherwise the output must match
+    accepted = list(RowValidator(headers).rows(corpus))
+    expected = [row for row in legacy_rows(headers, corpus) if row.cpt_hcpc_code != TITLE]
+    print("parity: " + ("ok" if expected == accepted else "DIFF"))
+    return 0 if expected == accepted else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+    raise SystemExit(run(args.rows))
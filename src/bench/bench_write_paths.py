@@ -0,0 +1,109 @@
+"""Benchmark: json classify/insert/update vs single-statement upsert vs COPY staging.
+
+Needs a disposable local Postgres in DATABASE_URL (or the PG* variables).
+Everything runs in a scratch schema that is dropped afterwards.
+
+Run from src/:  python -m bench.bench_write_paths [--sizes 10000 100000 1000000]
+
+Each size is loaded twice per path: an initial load (all inserts) and a
+reload with --change-ratio of the rows modified (updates + duplicates).
+"""
+import argparse
+import gc
+import os
+import random
+import time
+
+from fee_scraper.database.db_connector import init_db, close_db, get_db_connection, stage_rows, apply_staged_rows
+from fee_scraper.database.fee_row import parse_amount
+from fee_scraper.database.migrations import add_row_hash, add_natural_key_unique_index
+from bench.bench_reconcile import make_rows
+from fee_scraper.pipeline.writer import process_pdf_records, upsert_pdf_records
+
+FEE_TABLE_DDL = """
+    CREATE TABLE pa_wc_scheduleb_fees (
+        id serial PRIMARY KEY,
+        "cpt/hcpc_code" text,
+        modifier text,
+        medicare_location text,
+        global_surgery_indicator text,
+        multiple_surgery_indicator text,
+        prevailing_charge_amount text,
+        fee_schedule_amount text,
+        site_of_service_amount text
+    );
+"""
+
+def chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def change_rows(rows, ratio, seed=1):
+    rng = random.Random(seed)
+    changed = []
+    for row in rows:
+        if rng.random() < ratio:
+            row = row._replace(prevailing_charge_amount=parse_amount(f"{rng.uniform(1, 500):.2f}"))
+        changed.append(row)
+    return changed
+
+def load_json(conn, cur, rows, chunk_rows):
+    seen_keys = set()
+    for batch in chunks(rows, chunk_rows):
+        process_pdf_records(cur, batch, seen_keys)
+    conn.commit()
+
+def load_upsert(conn, cur, rows, chunk_rows):
+    seen_keys = set()
+    for batch in chunks(rows, chunk_rows):
+        upsert_pdf_records(cur, batch, seen_keys)
+    conn.commit()
+
+def load_copy(conn, cur, rows, chunk_rows):
+    for batch in chunks(rows, chunk_rows):
+        stage_rows(cur, batch)
+    apply_staged_rows(cur)
+    conn.commit()
+
+def timed(fn, *args):
+    gc.collect()
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def run(sizes, chunk_rows, change_ratio):
+    init_db()
+    schema = f"bench_write_{os.getpid()}"
+    try:
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"CREATE SCHEMA {schema}")
+            cur.execute(f"SET search_path TO {schema}")
+            cur.execute(FEE_TABLE_DDL)
+            conn.commit()
+            add_row_hash(conn)
+            add_natural_key_unique_index(conn)
+
+            print(f"{'rows':>9} {'path':>6} {'initial (s)':>12} {'reload (s)':>11} {'rows/s':>10}")
+            for n in sizes:
+                rows = make_rows(n)
+                reload_rows = change_rows(rows, change_ratio)
+                for path, load in (("json", load_json), ("upsert", load_upsert), ("copy", load_copy)):
+                    cur.execute("TRUNCATE pa_wc_scheduleb_fees")
+                    conn.commit()
+                    initial = timed(load, conn, cur, rows, chunk_rows)
+                    reload = timed(load, conn, cur, reload_rows, chunk_rows)
+                    print(f"{n:>9} {path:>6} {initial:>12.2f} {reload:>11.2f} {n / initial:>10.0f}")
+
+            cur.execute(f"DROP SCHEMA {schema} CASCADE")
+            conn.commit()
+    finally:
+        close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--chunk-rows", type=int, default=5000)
+    parser.add_argument("--change-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+    run(args.sizes, args.chunk_rows, args.change_ratio)
@@ -0,0 +1,106 @@
+"""Local stand-in for the pa.gov site, for exercising the HTTP client offline.
+
+Run from src/:  python -m bench.local_site DIRECTORY [--port 8000] [--latency 0.05] [--fail-first 1]
+
+Serves DIRECTORY over HTTP with ETag/Last-Modified validators. --latency
+delays every response, and --fail-first answers the first N requests for
+each path with a 503 so retries and backoff can be observed. Point the
+scraper at it with PART_B_INDEX_URL=http://127.0.0.1:PORT/index.html.
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+from collections import Counter
+from email.utils import formatdate
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from functools import partial
+
+class StandInHandler(SimpleHTTPRequestHandler):
+    """Static file handler with injected latency, failures and validators"""
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, *args, site=None, **kwargs):
+        self.site = site
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        site = self.site
+        with site.lock:
+            site.requests[self.path] += 1
+            attempt = site.requests[self.path]
+            site.connections.add(self.client_address)
+        if site.latency:
+            time.sleep(site.latency)
+        if attempt <= site.fail_first:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(os.path.getmtime(path), usegmt=True))
+        self.end_headers()
+        self.wfile.write(body)
+
+class LocalSite:
+    """A ThreadingHTTPServer on a background thread serving directory"""
+
+    def __init__(self, directory: str, port: int = 0, latency: float = 0.0, fail_first: int = 0):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.requests = Counter()
+        self.connections = set()
+        self.lock = threading.Lock()
+        handler = partial(StandInHandler, directory=directory, site=self)
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    args = parser.parse_args()
+    with LocalSite(args.directory, args.port, args.latency, args.fail_first) as site:
+        print(f"Serving {args.directory} at {site.base_url}")
+        try:
+            site.thread.join()
+        except KeyboardInterrupt:
+            pass
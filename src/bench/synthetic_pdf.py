@@ -0,0 +1,164 @@
+"""Synthetic Part B fee schedule PDFs in the published column layout.
+
+Run from src/:  python -m bench.synthetic_pdf OUT.pdf [--pages 10] [--rows-per-page 40]
+
+Every page carries a ruled table: a title row across the full width, the
+eight-column header row (with the same line breaks as the pa.gov PDFs)
+and fee rows. The PDF is written directly, with no dependency beyond
+the standard library, using the built-in Helvetica font.
+"""
+import argparse
+import random
+from typing import List, Dict, Any, Optional
+
+PAGE_WIDTH = 792
+PAGE_HEIGHT = 612
+MARGIN = 36
+FONT_SIZE = 7
+TITLE = "Pennsylvania Workers' Compensation Medical Fee Schedule - Part B"
+
+# (header lines, column width, row key)
+COLUMNS = [
+    (["CPT/HCPC Code"], 70, "cpt/hcpc_code"),
+    (["Modifier"], 50, "modifier"),
+    (["Medicare Location"], 75, "medicare_location"),
+    (["Global Surgery Indicator"], 95, "global_surgery_indicator"),
+    (["Multiple Surgery", "Indicator"], 75, "multiple_surgery_indicator"),
+    (["Prevailing Charge Amount"], 100, "prevailing_charge_amount"),
+    (["Fee Schedule Amount"], 85, "fee_schedule_amount"),
+    (["Site of", "Service", "Amount"], 60, "site_of_service_amount"),
+]
+TITLE_HEIGHT = 18
+HEADER_HEIGHT = 30
+
+def fee_rows(count: int, start: int = 0, seed: int = 0) -> List[Dict[str, Any]]:
+    """count fee rows with unique keys, numbered from start"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(start, start + count):
+        rows.append({
+            "cpt/hcpc_code": f"{i // 20:05d}",
+            "modifier": rng.choice([None, '26', 'TC']) if i % 20 >= 10 else None,
+            "medicare_location": f"{i % 20:03d}",
+            "global_surgery_indicator": rng.choice(['000', '010', '090', 'XXX']),
+            "multiple_surgery_indicator": rng.choice(['0', '2', '9']),
+            "prevailing_charge_amount": f"{rng.uniform(1, 500):.2f}",
+            "fee_schedule_amount": f"{rng.uniform(1, 500):.2f}",
+            "site_of_service_amount": rng.choice([None, f"{rng.uniform(1, 500):.2f}"]),
+        })
+    return rows
+
+def max_rows_per_page(row_height: float = 12) -> int:
+    body = PAGE_HEIGHT - 2 * MARGIN - TITLE_HEIGHT - HEADER_HEIGHT
+    return int(body // row_height)
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def _text(x: float, top: float, text: str) -> str:
+    """Content stream operators for text whose baseline sits below top"""
+    y = PAGE_HEIGHT - top - FONT_SIZE
+    return f"BT /F1 {FONT_SIZE} Tf {x:.2f} {y:.2f} Td ({_escape(text)}) Tj ET"
+
+def _hline(x0: float, x1: float, top: float) -> str:
+    y = PAGE_HEIGHT - top
+    return f"{x0:.2f} {y:.2f} m {x1:.2f} {y:.2f} l S"
+
+def _vline(x: float, top: float, bottom: float) -> str:
+    return f"{x:.2f} {PAGE_HEIGHT - top:.2f} m {x:.2f} {PAGE_HEIGHT - bottom:.2f} l S"
+
+def page_content(rows: List[Dict[str, Any]], row_height: float = 12) -> bytes:
+    """Content stream drawing one ruled fee table page"""
+    edges = [MARGIN]
+    for _, width, _ in COLUMNS:
+        edges.append(edges[-1] + width)
+    left, right = edges[0], edges[-1]
+
+    ops = ["0.5 w"]
+    top = MARGIN
+    header_top = top + TITLE_HEIGHT
+    body_top = header_top + HEADER_HEIGHT
+    bottom = body_top + row_height * len(rows)
+
+    # Title row: outer borders only, like the merged cell in the source PDFs
+    ops.append(_hline(left, right, top))
+    ops.append(_text(left + 4, top + 5, TITLE))
+    ops.append(_vline(left, top, bottom))
+    ops.append(_vline(right, top, bottom))
+    ops.append(_hline(left, right, header_top))
+    for x in edges[1:-1]:
+        ops.append(_vline(x, header_top, bottom))
+
+    for (lines, _, _), x in zip(COLUMNS, edges):
+        for index, line in enumerate(lines):
+            ops.append(_text(x + 2, header_top + 2 + index * (FONT_SIZE + 2), line))
+    ops.append(_hline(left, right, body_top))
+
+    for row_index, row in enumerate(rows):
+        row_top = body_top + row_index * row_height
+        for (_, _, key), x in zip(COLUMNS, edges):
+            value = row.get(key)
+            if value is not None:
+                ops.append(_text(x + 2, row_top + (row_height - FONT_SIZE) / 2, str(value)))
+        ops.append(_hline(left, right, row_top + row_height))
+    return "\n".join(ops).encode('latin-1')
+
+def build_pdf(pages: List[bytes]) -> bytes:
+    """Assemble a PDF from page content streams"""
+    objects: List[Optional[bytes]] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")
+    pages_id = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    page_ids = []
+    for content in pages:
+        stream = add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, font, stream)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+def fee_schedule_pdf(pages: int, rows_per_page: int, start: int = 0, seed: int = 0) -> bytes:
+    """A pages-long fee schedule PDF with rows_per_page rows on each page"""
+    row_height = 12
+    if rows_per_page > max_rows_per_page(row_height):
+        row_height = (PAGE_HEIGHT - 2 * MARGIN - TITLE_HEIGHT - HEADER_HEIGHT) / rows_per_page
+        if row_height < FONT_SIZE + 2:
+            raise ValueError(f"At most {max_rows_per_page(FONT_SIZE + 2)} rows fit on a page")
+    rows = fee_rows(pages * rows_per_page, start, seed)
+    contents = [
+        page_content(rows[i:i + rows_per_page], row_height)
+        for i in range(0, len(rows), rows_per_page)
+    ]
+    return build_pdf(contents)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--rows-per-page", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with open(args.output, "wb") as f:
+        f.write(fee_schedule_pdf(args.pages, args.rows_per_page, seed=args.seed))
@@ -0,0 +1,157 @@
+"""fee-scraper: command line entry point installed by setup.py.
+
+Each command imports only the libraries it needs, so the light ones
+start fast: fetch-urls loads requests and BeautifulSoup, extract loads
+pdfplumber, load reads the columnar cache with psycopg2 only, and run
+is the full pipeline of fee_scraper.main. python -m bench.bench_cli
+measures their cold start.
+"""
+import argparse
+import os
+import sys
+
+def fetch_urls(args) -> int:
+    """Print the Part B PDF URLs on the index page, one per line"""
+    from fee_scraper.scraper.fetch_pdfs import fetch_part_b_pdf_urls, filter_urls
+    from fee_scraper.scraper import http_client
+
+    http_client.configure(read_timeout=args.http_timeout, retries=args.http_retries)
+    urls = filter_urls(fetch_part_b_pdf_urls(url=args.index_url), args.match, args.exclude, args.limit)
+    for url in urls:
+        print(url)
+    return 0 if urls else 1
+
+def pdf_sources(sources):
+    """URLs as given, and paths with directories expanded to the PDFs in them"""
+    for source in sources:
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.lower().endswith('.pdf'):
+                    yield os.path.join(source, name)
+        else:
+            yield source
+
+def extract(args) -> int:
+    """Write the fee rows of PDFs as CSV with the fee table's columns"""
+    import contextlib
+    import csv
+    from fee_scraper.database.fee_row import FEE_COLUMNS
+    from fee_scraper.scraper.extract_pdfs import iter_pdf_rows
+    from fee_scraper.scraper.fetch_pdfs import filter_urls
+
+    sources = filter_urls(pdf_sources(args.sources), args.match, args.exclude, args.limit)
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    failed = 0
+    try:
+        writer = csv.writer(out)
+        writer.writerow(FEE_COLUMNS)
+        for source in sources:
+            rows = 0
+            try:
+                with contextlib.ExitStack() as stack:
+                    pdf = source
+                    if not source.startswith(('http://', 'https://')):
+                        pdf = stack.enter_context(open(source, 'rb'))
+                    for batch in iter_pdf_rows(pdf, args.chunk_rows, args.extractor):
+                        writer.writerows(row.db_values() for row in batch)
+                        rows += len(batch)
+            except Exception as e:
+                print(f"Error processing PDF {source}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            print(f"{source}: {rows} rows", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+def run(argv) -> int:
+    """Fetch, extract and load every PDF: fee_scraper.main's options"""
+    from fee_scraper import main
+    main.main(argv)
+    return 0
+
+def load(argv) -> int:
+    """Load the columnar cache into the database: fee_scraper.main --from-cache"""
+    from fee_scraper import main
+    main.main(['--from-cache'] + argv)
+    return 0
+
+# The benchmarks are not installed; they live in src/bench of a checkout
+BENCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench')
+
+def bench_names():
+    return sorted(
+        name[len('bench_'):-len('.py')] for name in os.listdir(BENCH_DIR)
+        if name.startswith('bench_') and name.endswith('.py')
+    )
+
+def bench(argv) -> int:
+    """Run src/bench/bench_NAME.py with the remaining arguments"""
+    import runpy
+
+    if not os.path.isdir(BENCH_DIR):
+        print("fee-scraper bench needs a source checkout (pip install -e .): "
+              f"{BENCH_DIR} not found", file=sys.stderr)
+        return 2
+    src_dir = os.path.dirname(BENCH_DIR)
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    names = bench_names()
+    if not argv or argv[0] not in names:
+        if argv and argv[0] not in ('-h', '--help'):
+            print(f"Unknown benchmark: {argv[0]}", file=sys.stderr)
+        print("usage: fee-scraper bench NAME [ARGS ...]\n\nbenchmarks: " + ", ".join(names))
+        return 0 if not argv or argv[0] in ('-h', '--help') else 2
+    sys.argv = [f"fee-scraper bench {argv[0]}"] + argv[1:]
+    runpy.run_module(f"bench.bench_{argv[0]}", run_name='__main__', alter_sys=False)
+    return 0
+
+# Commands whose arguments are parsed by the code they run
+PASSTHROUGH = {'run': run, 'load': load, 'bench': bench}
+
+def build_parser() -> argparse.ArgumentParser:
+    # Both modules import their network and PDF libraries only when used
+    from fee_scraper.scraper.extract_pdfs import DEFAULT_CHUNK_ROWS, EXTRACTORS
+    from fee_scraper.scraper.fetch_pdfs import PART_B_INDEX_URL
+
+    parser = argparse.ArgumentParser(prog='fee-scraper', description="Scrape PA Schedule B fee PDFs")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND', required=True)
+
+    def add_url_filters(command):
+        command.add_argument("--match", metavar="REGEX", help="Only URLs or paths matching this regular expression")
+        command.add_argument("--exclude", metavar="REGEX", help="Skip URLs or paths matching this regular expression")
+        command.add_argument("--limit", type=int, default=None, help="At most this many PDFs")
+
+    fetch = commands.add_parser('fetch-urls', help=fetch_urls.__doc__, description=fetch_urls.__doc__)
+    fetch.add_argument(
+        "--index-url", default=PART_B_INDEX_URL,
+        help="Page listing the Part B PDFs (default: PART_B_INDEX_URL or the pa.gov page)"
+    )
+    fetch.add_argument("--http-timeout", type=float, default=None, help="HTTP read timeout in seconds")
+    fetch.add_argument("--http-retries", type=int, default=None, help="Retries on 5xx and connection errors")
+    add_url_filters(fetch)
+    fetch.set_defaults(handler=fetch_urls)
+
+    ext = commands.add_parser('extract', help=extract.__doc__, description=extract.__doc__)
+    ext.add_argument("sources", nargs='+', metavar="PDF", help="PDF URL, file, or directory of PDFs")
+    ext.add_argument("--output", "-o", help="CSV file to write (default: stdout)")
+    ext.add_argument("--extractor", choices=sorted(EXTRACTORS), default="tables", help="PDF extraction backend")
+    ext.add_argument("--chunk-rows", "--batch-size", type=int, default=DEFAULT_CHUNK_ROWS,
+                     help="Rows extracted per batch")
+    add_url_filters(ext)
+    ext.set_defaults(handler=extract)
+
+    for name, handler in PASSTHROUGH.items():
+        commands.add_parser(name, help=handler.__doc__, add_help=False)
+    return parser
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in PASSTHROUGH:
+        return PASSTHROUGH[argv[0]](argv[1:])
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,608 @@
+import os
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+from typing import List, Dict, Any, Optional, Iterable, Sequence
+from contextlib import contextmanager
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+import logging
+import json
+import threading
+import time
+
+from fee_scraper.database.fee_row import FeeRow, FEE_COLUMNS, AMOUNT_COLUMNS
+from fee_scraper.utils.metrics import METRICS
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger('fee_schedule_scraper')
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection that knows its age and the statements PREPAREd on it"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created_at = time.monotonic()
+        self.checked_in_at = self.created_at
+        # Names of PreparedStatements on this session; None disables preparing
+        self.prepared: Optional[set] = None
+
+class ConnectionPool(ThreadedConnectionPool):
+    """Thread-safe pool that hands out healthy connections and recycles old ones.
+
+    getconn() waits up to timeout seconds for a free connection rather
+    than failing at once. A connection older than max_age seconds is
+    closed instead of being reused, and one idle for more than
+    validate_after seconds is pinged with SELECT 1 before it is handed
+    out; a broken one is replaced. Returned connections stay open (up to
+    maxconn, not just minconn as in psycopg2's pools) so the statements
+    PREPAREd on them are reused. Keys are not supported.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args, max_age: float = 1800.0,
+                 validate_after: float = 5.0, timeout: float = 30.0, prepare: bool = True, **kwargs):
+        self.max_age = max_age
+        self.validate_after = validate_after
+        self.timeout = timeout
+        self.prepare = prepare
+        self._slots = threading.BoundedSemaphore(maxconn)
+        kwargs.setdefault('connection_factory', PooledConnection)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        if self.prepare and isinstance(conn, PooledConnection):
+            conn.prepared = set()
+        return conn
+
+    def _usable(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if not isinstance(conn, PooledConnection):
+            return True
+        now = time.monotonic()
+        if now - conn.created_at > self.max_age:
+            METRICS.inc('db_connections_recycled_total', reason='age')
+            return False
+        if now - conn.checked_in_at > self.validate_after:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error as e:
+                logger.warning(f"Replacing broken database connection: {str(e).strip()}")
+                METRICS.inc('db_connections_recycled_total', reason='broken')
+                return False
+        return True
+
+    def getconn(self, key=None):
+        """Check out a validated connection, waiting for a free one"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"No free database connection after {self.timeout}s")
+        try:
+            while True:
+                with self._lock:
+                    conn = self._getconn()
+                if self._usable(conn):
+                    return conn
+                with self._lock:
+                    self._putconn(conn, close=True)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        """Return a connection, rolled back; closed if broken or past max_age"""
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+            if isinstance(conn, PooledConnection):
+                conn.checked_in_at = time.monotonic()
+                if conn.checked_in_at - conn.created_at > self.max_age:
+                    METRICS.inc('db_connections_recycled_total', reason='age')
+                    close = True
+        try:
+            with self._lock:
+                self._putconn(conn, close=close)
+        finally:
+            self._slots.release()
+
+    def _putconn(self, conn, key=None, close=False):
+        if self.closed:
+            raise PoolError("connection pool is closed")
+        key = self._rused.get(id(conn))
+        if key is None:
+            raise PoolError("trying to put unkeyed connection")
+        if close or conn.closed:
+            conn.close()
+        else:
+            self._pool.append(conn)
+        del self._used[key]
+        del self._rused[id(conn)]
+
+class PreparedStatement:
+    """A statement PREPAREd once per pooled connection, then run with EXECUTE.
+
+    sql takes its parameters as %s placeholders, in order, and types
+    names their Postgres types. Repeated executions skip parsing and
+    planning. On a connection without a prepared-statement cache (not
+    from ConnectionPool, or DB_PREPARED_STATEMENTS=0) sql runs as is.
+    """
+
+    def __init__(self, name: str, sql: str, types: Sequence[str] = ('json',)):
+        parts = sql.split('%s')
+        if len(parts) - 1 != len(types):
+            raise ValueError(f"{name}: {len(parts) - 1} placeholders for {len(types)} types")
+        self.name = name
+        self.sql = sql
+        numbered = parts[0] + ''.join(f"${i}{part}" for i, part in enumerate(parts[1:], 1))
+        self.prepare_sql = f"PREPARE {name} ({', '.join(types)}) AS {numbered}"
+        self.execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * len(types))})" if types else f"EXECUTE {name}"
+
+    def execute(self, cur, params: Sequence[Any] = ()):
+        prepared = getattr(cur.connection, 'prepared', None)
+        if prepared is None:
+            cur.execute(self.sql, params)
+            return
+        if self.name not in prepared:
+            # Session-level: survives the transaction's commit or rollback
+            cur.execute(self.prepare_sql)
+            prepared.add(self.name)
+        cur.execute(self.execute_sql, params)
+
+# Global pool variable
+pool: Optional[ConnectionPool] = None
+
+def init_db(minconn: int = 1, maxconn: Optional[int] = None):
+    """Initialize the database connection pool.
+
+    maxconn defaults to DB_POOL_SIZE or 10. DB_POOL_MAX_AGE (1800) and
+    DB_POOL_TIMEOUT (30) set the seconds before a connection is recycled
+    and a checkout gives up; DB_PREPARED_STATEMENTS=0 turns off
+    server-side prepared statements.
+    """
+    global pool
+    if maxconn is None:
+        maxconn = int(os.getenv('DB_POOL_SIZE', 10))
+    settings = {
+        'max_age': float(os.getenv('DB_POOL_MAX_AGE', 1800)),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'prepare': os.getenv('DB_PREPARED_STATEMENTS', '1') not in ('0', 'false', 'no'),
+    }
+    try:
+        # Try to use DATABASE_URL first (external connection)
+        database_url = os.getenv('DATABASE_URL')
+        if database_url:
+            pool = ConnectionPool(
+                minconn=minconn,
+                maxconn=maxconn,
+                dsn=database_url,
+                **settings
+            )
+        else:
+            # Fallback to individual credentials
+            pool = ConnectionPool(
+                minconn=minconn,
+                maxconn=maxconn,
+                **settings,
+                host=os.getenv('PGHOST'),
+                database=os.getenv('PGDATABASE'),
+                user=os.getenv('PGUSER'),
+                password=os.getenv('PGPASSWORD'),
+                port=os.getenv('PGPORT', 5432)
+            )
+        logging.info("Database connection pool established.")
+        return pool
+    except Exception as e:
+        logging.error(f"Error connecting to the database: {e}")
+        raise
+
+@contextmanager
+def get_db_connection():
+    """Get a database connection from the pool"""
+    conn = None
+    try:
+        if pool is None:
+            raise Exception("Database pool not initialized")
+        conn = pool.getconn()
+        yield conn
+    finally:
+        # Also on BaseException (a second SIGINT), so the pool slot is freed
+        if conn is not None:
+            try:
+                pool.putconn(conn)
+            except Exception as e:
+                logger.error(f"Error returning connection to pool: {str(e)}")
+
+def close_db():
+    """Close all database connections"""
+    global pool
+    if pool is not None:
+        try:
+            pool.closeall()
+        except Exception as e:
+            logger.error(f"Error closing database pool: {str(e)}")
+        finally:
+            pool = None
+
+def batch_insert_records(records: List[Dict[str, Any]], conn=None) -> int:
+    """Batch insert records into database, on conn or a pooled connection, and commit."""
+    if not records:
+        return 0
+    if conn is None:
+        with get_db_connection() as conn:
+            return batch_insert_records(records, conn)
+    
+    query = """
+        INSERT INTO pa_wc_scheduleb_fees (
+            "cpt/hcpc_code",
+            modifier,
+            medicare_location,
+            global_surgery_indicator,
+            multiple_surgery_indicator,
+            prevailing_charge_amount,
+            fee_schedule_amount,
+            site_of_service_amount
+        ) VALUES (
+            %(cpt/hcpc_code)s,
+            %(modifier)s,
+            %(medicare_location)s,
+            %(global_surgery_indicator)s,
+            %(multiple_surgery_indicator)s,
+            %(prevailing_charge_amount)s,
+            %(fee_schedule_amount)s,
+            %(site_of_service_amount)s
+        )
+    """
+    
+    try:
+        with conn.cursor() as cur:
+            cur.executemany(query, records)
+            count = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return count
+
+def commit_transaction(conn):
+    """Commit the current transaction on conn"""
+    if conn is not None:
+        conn.commit()
+
+def rollback_transaction(conn):
+    """Rollback the current transaction on conn"""
+    if conn is not None:
+        conn.rollback()
+
+def get_db_cursor(connection):
+    """
+    Creates a cursor that returns results as dictionaries
+    """
+    return connection.cursor(cursor_factory=RealDictCursor)
+
+def insert_fee_schedule(data):
+    """
+    Insert or update a single fee schedule record in one statement.
+    """
+    with get_db_connection() as conn:
+        try:
+            cur = get_db_cursor(conn)
+            
+            upsert_query = f"""
+                INSERT INTO pa_wc_scheduleb_fees (
+                    "cpt/hcpc_code",
+                    modifier,
+                    medicare_location,
+                    global_surgery_indicator,
+                    multiple_surgery_indicator,
+                    prevailing_charge_amount,
+                    fee_schedule_amount,
+                    site_of_service_amount
+                ) VALUES (
+                    %(cpt/hcpc_code)s,
+                    %(modifier)s,
+                    %(medicare_location)s,
+                    %(global_surgery_indicator)s,
+                    %(multiple_surgery_indicator)s,
+                    %(prevailing_charge_amount)s,
+                    %(fee_schedule_amount)s,
+                    %(site_of_service_amount)s
+                )
+                ON CONFLICT {NATURAL_KEY_CONFLICT} DO UPDATE SET
+                    global_surgery_indicator = EXCLUDED.global_surgery_indicator,
+                    multiple_surgery_indicator = EXCLUDED.multiple_surgery_indicator,
+                    prevailing_charge_amount = EXCLUDED.prevailing_charge_amount,
+                    fee_schedule_amount = EXCLUDED.fee_schedule_amount,
+                    site_of_service_amount = EXCLUDED.site_of_service_amount
+                WHERE pa_wc_scheduleb_fees.row_hash IS DISTINCT FROM EXCLUDED.row_hash
+                RETURNING (xmax = 0) AS inserted
+            """
+            
+            cur.execute(upsert_query, data)
+            result = cur.fetchone()
+            conn.commit()
+            
+            if result is None:
+                logging.info(f"Skipping duplicate code: {data['cpt/hcpc_code']}")
+            elif result['inserted']:
+                logging.info(f"Successfully inserted code: {data['cpt/hcpc_code']}")
+            else:
+                logging.info(f"Successfully updated code: {data['cpt/hcpc_code']}")
+            
+        except Exception as e:
+            logging.error(f"Error inserting data: {e}")
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+def insert_many_fee_schedules(data_list, batch_size=1000):
+    """
+    Upsert multiple fee schedule records in batches of batch_size.
+    """
+    if not data_list:
+        return
+
+    with get_db_connection() as conn:
+        try:
+            cur = conn.cursor()
+            inserted = 0
+            updated = 0
+            
+            for start in range(0, len(data_list), batch_size):
+                # Later duplicates of a key within a batch are dropped
+                batch = {}
+                for record in data_list[start:start + batch_size]:
+                    key = (
+                        record.get('cpt/hcpc_code'),
+                        record.get('modifier') or '',
+                        record.get('medicare_location') or ''
+                    )
+                    batch.setdefault(key, record)
+                counts = upsert_fee_rows(cur, list(batch.values()))
+                inserted += counts['inserted']
+                updated += counts['updated']
+            
+            conn.commit()
+            if inserted or updated:
+                logging.info(f"Inserted {inserted} new records, updated {updated} records")
+            else:
+                logging.info("No new records to insert")
+                
+        except Exception as e:
+            logging.error(f"Error in batch insert: {e}")
+            conn.rollback()
+            raise
+
+STAGING_TABLE = 'pa_wc_scheduleb_fees_staging'
+
+def _quote_column(col: str) -> str:
+    return f'"{col}"' if '/' in col else col
+
+def _json_field(index: int, col: str) -> str:
+    if col in AMOUNT_COLUMNS:
+        # Cents arrive as JSON numbers; anything else is the original text
+        return (f"CASE json_typeof(r->{index}) WHEN 'number' "
+                f"THEN round((r->>{index})::numeric / 100, 2)::text "
+                f"ELSE r->>{index} END AS {col}")
+    return f"r->>{index} AS {_quote_column(col)}"
+
+# Text columns of a JSON array of FeeRows, passed as json.dumps(rows) (see
+# fee_rows_json); the tuples serialize as-is with no per-row conversion
+FEE_ROWS_SOURCE = (
+    "SELECT " + ", ".join(_json_field(i, col) for i, col in enumerate(FEE_COLUMNS))
+    + " FROM json_array_elements(%s::json) AS r"
+)
+
+def fee_rows_json(rows: List[FeeRow]) -> str:
+    return json.dumps(rows)
+
+def _copy_csv_field(value) -> str:
+    # NULL is an unquoted empty field; every real value is quoted
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+class CopyRowStream:
+    """Read-only file object that renders rows as COPY CSV on demand.
+
+    Lets copy_expert() stream a batch without building the whole payload
+    as one string first.
+    """
+
+    def __init__(self, rows: Iterable[FeeRow]):
+        self._rows = iter(rows)
+        self._pending = ''
+
+    def _render(self, row: FeeRow) -> str:
+        return ','.join(_copy_csv_field(value) for value in row.db_values()) + '\n'
+
+    def read(self, size: int = -1) -> str:
+        chunks = [self._pending]
+        length = len(self._pending)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = self._render(row)
+            chunks.append(line)
+            length += len(line)
+        data = ''.join(chunks)
+        if size < 0:
+            size = len(data)
+        data, self._pending = data[:size], data[size:]
+        return data
+
+    readline = read
+
+def create_staging_table(cur):
+    """Create the per-session staging table used by the COPY write path"""
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+            seq bigserial,
+            "cpt/hcpc_code" text,
+            modifier text,
+            medicare_location text,
+            global_surgery_indicator text,
+            multiple_surgery_indicator text,
+            prevailing_charge_amount text,
+            fee_schedule_amount text,
+            site_of_service_amount text
+        ) ON COMMIT DELETE ROWS;
+    """)
+
+def stage_rows(cur, rows: Iterable[FeeRow]):
+    """COPY a batch of rows into the staging table.
+
+    Rows accumulate until apply_staged_rows() runs or the transaction
+    ends, so one PDF can be staged across several batches.
+    """
+    create_staging_table(cur)
+    columns = ', '.join(_quote_column(col) for col in FEE_COLUMNS)
+    cur.copy_expert(
+        f"COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)",
+        CopyRowStream(rows)
+    )
+
+# Matches the unique expression index added by the natural-key migration;
+# COALESCE makes NULL modifiers and locations collide like any other value
+NATURAL_KEY_COLUMNS = """"cpt/hcpc_code", COALESCE(modifier, ''), COALESCE(medicare_location, '')"""
+NATURAL_KEY_CONFLICT = f"({NATURAL_KEY_COLUMNS})"
+NATURAL_KEY_INDEX = 'pa_wc_scheduleb_fees_natural_key'
+
+def has_natural_key_index(conn) -> bool:
+    """Whether the valid unique index that ON CONFLICT NATURAL_KEY_CONFLICT needs exists"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", (NATURAL_KEY_INDEX,))
+        row = cur.fetchone()
+    conn.rollback()
+    return bool(row and row[0])
+
+UPSERT_TEMPLATE = """
+    WITH input_records AS (
+        {source}
+    ),
+    upserted AS (
+        INSERT INTO pa_wc_scheduleb_fees (
+            "cpt/hcpc_code", modifier, medicare_location,
+            global_surgery_indicator, multiple_surgery_indicator,
+            prevailing_charge_amount, fee_schedule_amount,
+            site_of_service_amount
+        )
+        SELECT 
+            "cpt/hcpc_code", modifier, medicare_location,
+            global_surgery_indicator, multiple_surgery_indicator,
+            prevailing_charge_amount, fee_schedule_amount,
+            site_of_service_amount
+        FROM input_records
+        ON CONFLICT {conflict} DO UPDATE SET
+            global_surgery_indicator = EXCLUDED.global_surgery_indicator,
+            multiple_surgery_indicator = EXCLUDED.multiple_surgery_indicator,
+            prevailing_charge_amount = EXCLUDED.prevailing_charge_amount,
+            fee_schedule_amount = EXCLUDED.fee_schedule_amount,
+            site_of_service_amount = EXCLUDED.site_of_service_amount
+        -- EXCLUDED.row_hash is set by the BEFORE INSERT trigger
+        WHERE pa_wc_scheduleb_fees.row_hash IS DISTINCT FROM EXCLUDED.row_hash
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT 
+        count(*) FILTER (WHERE inserted),
+        count(*) FILTER (WHERE NOT inserted),
+        (SELECT count(*) FROM input_records)
+    FROM upserted;
+"""
+
+UPSERT_STATEMENT = PreparedStatement(
+    'fee_upsert', UPSERT_TEMPLATE.format(source=FEE_ROWS_SOURCE, conflict=NATURAL_KEY_CONFLICT)
+)
+
+def _upsert_counts(cur) -> Dict[str, int]:
+    inserted, updated, total = cur.fetchone()
+    return {
+        'inserted': inserted,
+        'updated': updated,
+        'unchanged': total - inserted - updated
+    }
+
+def upsert_fee_rows(cur, rows: List[FeeRow]) -> Dict[str, int]:
+    """Insert new rows and update changed ones in a single statement.
+
+    Rows must not repeat a natural key (ON CONFLICT cannot touch the same
+    row twice in one command). Returns counts of 'inserted', 'updated' and
+    'unchanged' rows.
+    """
+    if not rows:
+        return {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    
+    UPSERT_STATEMENT.execute(cur, (fee_rows_json(rows),))
+    return _upsert_counts(cur)
+
+def apply_staged_rows(cur) -> Dict[str, int]:
+    """Upsert the staged rows into the fee table in one statement.
+
+    Keys repeated in the staging table keep their first staged row. Returns
+    counts of 'staged', 'duplicate_keys', 'inserted', 'updated' and
+    'unchanged' rows.
+    """
+    create_staging_table(cur)
+    source = f"""
+        SELECT DISTINCT ON {NATURAL_KEY_CONFLICT} *
+        FROM {STAGING_TABLE}
+        ORDER BY {NATURAL_KEY_COLUMNS}, seq
+    """
+    cur.execute(UPSERT_TEMPLATE.format(source=source, conflict=NATURAL_KEY_CONFLICT))
+    counts = _upsert_counts(cur)
+
+    cur.execute(f"SELECT count(*) FROM {STAGING_TABLE}")
+    counts['staged'] = cur.fetchone()[0]
+    counts['duplicate_keys'] = (
+        counts['staged'] - counts['inserted'] - counts['updated'] - counts['unchanged']
+    )
+
+    cur.execute(f"TRUNCATE {STAGING_TABLE}")
+    return counts
+
+if __name__ == "__main__":
+    # Test the database connection
+    try:
+        # Initialize the connection pool
+        init_db()
+        
+        with get_db_connection() as conn:
+            # Get a cursor and try a simple query
+            cur = get_db_cursor(conn)
+            cur.execute("SELECT version();")
+            version = cur.fetchone()
+            print("PostgreSQL version:", version["version"])
+            
+            # Clean up
+            cur.close()
+        
+        print("Connection test successful and connection closed.")
+        
+    except Exception as e:
+        print(f"Test failed: {e}")
+
+    # Test data
+    test_data = {
+        'cpt/hcpc_code': '00842',
+        'modifier': None,
+        'medicare_location': '004',
+        'global_surgery_indicator': 'XXX',
+        'multiple_surgery_indicator': '9',
+        'prevailing_charge_amount': '69.62',
+        'fee_schedule_amount': None,
+        'site_of_service_amount': None
+    }
+    
+    insert_fee_schedule(test_data)
+
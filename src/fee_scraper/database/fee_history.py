@@ -0,0 +1,258 @@
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from fee_scraper.database.fee_row import FeeRow
+
+logger = logging.getLogger('fee_schedule_scraper')
+
+HISTORY_TABLE = 'pa_wc_scheduleb_fee_history'
+
+HISTORY_COLUMNS = """
+    "cpt/hcpc_code", modifier, medicare_location,
+    global_surgery_indicator, multiple_surgery_indicator,
+    prevailing_charge_amount, fee_schedule_amount, site_of_service_amount
+"""
+
+# schedule_year is the UTC year of valid_from and the partition key
+SCHEDULE_YEAR_SQL = "date_part('year', {ts} AT TIME ZONE 'UTC')::integer"
+
+KEY_SQL = """"cpt/hcpc_code", COALESCE(modifier, ''), COALESCE(medicare_location, '')"""
+
+# Versions are only ever inserted: each is valid until the key's next
+# version (or tombstone), ordered by valid_from and then version
+HISTORY_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+        "cpt/hcpc_code" text,
+        modifier text,
+        medicare_location text,
+        global_surgery_indicator text,
+        multiple_surgery_indicator text,
+        prevailing_charge_amount text,
+        fee_schedule_amount text,
+        site_of_service_amount text,
+        row_hash bytea,
+        schedule_year integer NOT NULL,
+        valid_from timestamptz NOT NULL,
+        version bigserial,
+        deleted boolean NOT NULL DEFAULT false
+    ) PARTITION BY RANGE (schedule_year);
+
+    CREATE TABLE IF NOT EXISTS {HISTORY_TABLE}_default PARTITION OF {HISTORY_TABLE} DEFAULT;
+
+    -- As-of lookups: the newest version of a key starting at or before a time
+    CREATE INDEX IF NOT EXISTS {HISTORY_TABLE}_key_valid_from ON {HISTORY_TABLE} (
+        {KEY_SQL}, valid_from, version
+    );
+
+    CREATE OR REPLACE VIEW pa_wc_scheduleb_fees_current AS
+        SELECT {HISTORY_COLUMNS}, valid_from
+        FROM (
+            SELECT DISTINCT ON ({KEY_SQL}) {HISTORY_COLUMNS}, valid_from, deleted
+            FROM {HISTORY_TABLE}
+            ORDER BY {KEY_SQL}, valid_from DESC, version DESC
+        ) h
+        WHERE NOT deleted;
+
+    CREATE OR REPLACE FUNCTION pa_wc_scheduleb_fees_as_of(at timestamptz)
+    RETURNS TABLE (
+        "cpt/hcpc_code" text, modifier text, medicare_location text,
+        global_surgery_indicator text, multiple_surgery_indicator text,
+        prevailing_charge_amount text, fee_schedule_amount text, site_of_service_amount text,
+        valid_from timestamptz
+    ) LANGUAGE sql STABLE AS $$
+        SELECT {HISTORY_COLUMNS}, valid_from
+        FROM (
+            SELECT DISTINCT ON ({KEY_SQL}) {HISTORY_COLUMNS}, valid_from, deleted
+            FROM {HISTORY_TABLE}
+            WHERE schedule_year <= {SCHEDULE_YEAR_SQL.format(ts='at')}
+            AND valid_from <= at
+            ORDER BY {KEY_SQL}, valid_from DESC, version DESC
+        ) h
+        WHERE NOT deleted
+    $$;
+"""
+
+_NEW_VERSION = f"""
+    INSERT INTO {HISTORY_TABLE} ({HISTORY_COLUMNS}, row_hash, schedule_year, valid_from)
+    SELECT {{columns}}, {{alias}}.row_hash, {SCHEDULE_YEAR_SQL.format(ts='now()')}, now()
+"""
+
+# A tombstone ends the key's last version; it has no fee fields
+_TOMBSTONE = f"""
+    INSERT INTO {HISTORY_TABLE} ("cpt/hcpc_code", modifier, medicare_location, schedule_year, valid_from, deleted)
+    SELECT o."cpt/hcpc_code", o.modifier, o.medicare_location, {SCHEDULE_YEAR_SQL.format(ts='now()')}, now(), true
+"""
+
+_KEY_CHANGED = """(
+    o."cpt/hcpc_code" IS DISTINCT FROM n."cpt/hcpc_code"
+    OR COALESCE(o.modifier, '') <> COALESCE(n.modifier, '')
+    OR COALESCE(o.medicare_location, '') <> COALESCE(n.medicare_location, '')
+)"""
+
+def _prefixed(alias: str) -> str:
+    return ', '.join(f'{alias}.{col.strip()}' for col in HISTORY_COLUMNS.split(','))
+
+# Statement-level triggers with transition tables: one set-based insert
+# per upsert statement, whichever write path issued it
+HISTORY_TRIGGERS_SQL = f"""
+    CREATE OR REPLACE FUNCTION pa_wc_scheduleb_fees_history_insert() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        {_NEW_VERSION.format(columns=_prefixed('n'), alias='n')} FROM new_rows n;
+        RETURN NULL;
+    END
+    $$;
+
+    CREATE OR REPLACE FUNCTION pa_wc_scheduleb_fees_history_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        {_TOMBSTONE}
+        FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE {_KEY_CHANGED};
+        {_NEW_VERSION.format(columns=_prefixed('n'), alias='n')}
+        FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE o.row_hash IS DISTINCT FROM n.row_hash OR {_KEY_CHANGED};
+        RETURN NULL;
+    END
+    $$;
+
+    CREATE OR REPLACE FUNCTION pa_wc_scheduleb_fees_history_delete() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        {_TOMBSTONE} FROM old_rows o;
+        RETURN NULL;
+    END
+    $$;
+
+    DROP TRIGGER IF EXISTS pa_wc_scheduleb_fees_history_insert ON pa_wc_scheduleb_fees;
+    CREATE TRIGGER pa_wc_scheduleb_fees_history_insert
+    AFTER INSERT ON pa_wc_scheduleb_fees
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION pa_wc_scheduleb_fees_history_insert();
+
+    DROP TRIGGER IF EXISTS pa_wc_scheduleb_fees_history_update ON pa_wc_scheduleb_fees;
+    CREATE TRIGGER pa_wc_scheduleb_fees_history_update
+    AFTER UPDATE ON pa_wc_scheduleb_fees
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION pa_wc_scheduleb_fees_history_update();
+
+    DROP TRIGGER IF EXISTS pa_wc_scheduleb_fees_history_delete ON pa_wc_scheduleb_fees;
+    CREATE TRIGGER pa_wc_scheduleb_fees_history_delete
+    AFTER DELETE ON pa_wc_scheduleb_fees
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION pa_wc_scheduleb_fees_history_delete();
+"""
+
+# Versions of the live rows as of now, for the first load of the history
+SEED_HISTORY_SQL = f"""
+    INSERT INTO {HISTORY_TABLE} ({HISTORY_COLUMNS}, row_hash, schedule_year, valid_from)
+    SELECT {HISTORY_COLUMNS}, row_hash, {SCHEDULE_YEAR_SQL.format(ts='now()')}, now()
+    FROM pa_wc_scheduleb_fees e
+    WHERE NOT EXISTS (
+        SELECT 1 FROM pa_wc_scheduleb_fees_current c
+        WHERE c."cpt/hcpc_code" = e."cpt/hcpc_code"
+        AND COALESCE(c.modifier, '') = COALESCE(e.modifier, '')
+        AND COALESCE(c.medicare_location, '') = COALESCE(e.medicare_location, '')
+    )
+"""
+
+def ensure_history_partitions(conn, years: Optional[Iterable[int]] = None) -> List[str]:
+    """Create the yearly history partitions for years.
+
+    By default this year's and next year's, but only once this year's is
+    missing: the usual run finds it with one query and runs no DDL. A
+    no-op when the history migration has not been applied. Returns the
+    partitions created. A year whose rows already went to the default
+    partition is left there and logged.
+    """
+    created = []
+    with conn.cursor() as cur:
+        if years is None:
+            year = datetime.now(timezone.utc).year
+            cur.execute("SELECT to_regclass(%s), to_regclass(%s)", (HISTORY_TABLE, f"{HISTORY_TABLE}_{year}"))
+            table, partition = cur.fetchone()
+            if table is None or partition is not None:
+                conn.rollback()
+                return created
+            years = (year, year + 1)
+        else:
+            cur.execute("SELECT to_regclass(%s)", (HISTORY_TABLE,))
+            if cur.fetchone()[0] is None:
+                conn.rollback()
+                return created
+        for year in years:
+            partition = f"{HISTORY_TABLE}_{year}"
+            cur.execute("SELECT to_regclass(%s)", (partition,))
+            if cur.fetchone()[0] is not None:
+                continue
+            try:
+                cur.execute(f"""
+                    CREATE TABLE {partition} PARTITION OF {HISTORY_TABLE}
+                    FOR VALUES FROM ({int(year)}) TO ({int(year) + 1})
+                """)
+                conn.commit()
+                created.append(partition)
+            except Exception as e:
+                # Another worker created it first, or the default partition holds the year
+                conn.rollback()
+                logger.warning(f"Could not create history partition {partition}: {e}")
+    conn.commit()
+    return created
+
+def fee_as_of(conn, at: datetime, code: str, modifier: Optional[str] = None,
+              location: Optional[str] = None) -> Optional[FeeRow]:
+    """The version of one key in effect at time at, or None"""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT {HISTORY_COLUMNS}, deleted
+            FROM {HISTORY_TABLE}
+            WHERE "cpt/hcpc_code" = %(code)s
+            AND COALESCE(modifier, '') = %(modifier)s
+            AND COALESCE(medicare_location, '') = %(location)s
+            AND schedule_year <= {SCHEDULE_YEAR_SQL.format(ts='%(at)s::timestamptz')}
+            AND valid_from <= %(at)s
+            ORDER BY valid_from DESC, version DESC
+            LIMIT 1
+        """, {'code': code, 'modifier': modifier or '', 'location': location or '', 'at': at})
+        values = cur.fetchone()
+    conn.rollback()
+    if values is None or values[8]:
+        return None
+    return FeeRow.from_text(*values[:8])
+
+def fees_as_of(conn, at: datetime, itersize: int = 50000) -> Iterator[FeeRow]:
+    """Every key's version in effect at time at, streamed with a server-side cursor"""
+    try:
+        with conn.cursor(name='fee_history_as_of') as cur:
+            cur.itersize = itersize
+            cur.execute(f"SELECT {HISTORY_COLUMNS} FROM pa_wc_scheduleb_fees_as_of(%s)", (at,))
+            for values in cur:
+                yield FeeRow.from_text(*values)
+    finally:
+        conn.rollback()
+
+def fee_versions(conn, code: str, modifier: Optional[str] = None,
+                 location: Optional[str] = None) -> List[Tuple[FeeRow, datetime, Optional[datetime]]]:
+    """Every version of one key as (row, valid_from, valid_to), oldest first.
+
+    valid_to is when the next version or tombstone took over, or None for
+    the current version.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT {HISTORY_COLUMNS}, valid_from, valid_to
+            FROM (
+                SELECT {HISTORY_COLUMNS}, valid_from, version, deleted,
+                       lead(valid_from) OVER (ORDER BY valid_from, version) AS valid_to
+                FROM {HISTORY_TABLE}
+                WHERE "cpt/hcpc_code" = %s
+                AND COALESCE(modifier, '') = %s
+                AND COALESCE(medicare_location, '') = %s
+            ) h
+            WHERE NOT deleted
+            ORDER BY valid_from, version
+        """, (code, modifier or '', location or ''))
+        versions = [(FeeRow.from_text(*values[:8]), values[8], values[9]) for values in cur]
+    conn.rollback()
+    return versions
@@ -0,0 +1,78 @@
+import re
+import sys
+from typing import NamedTuple, Optional, Union, Tuple, Dict, Any
+
+# Database column names, in FeeRow field order
+FEE_COLUMNS = [
+    'cpt/hcpc_code',
+    'modifier',
+    'medicare_location',
+    'global_surgery_indicator',
+    'multiple_surgery_indicator',
+    'prevailing_charge_amount',
+    'fee_schedule_amount',
+    'site_of_service_amount'
+]
+
+AMOUNT_COLUMNS = ('prevailing_charge_amount', 'fee_schedule_amount', 'site_of_service_amount')
+
+# Only amounts written exactly like this are held as cents, so that
+# format_amount() gives back the extracted text unchanged
+PLAIN_AMOUNT = re.compile(r'(?:0|[1-9][0-9]*)\.[0-9]{2}')
+
+Amount = Union[int, str, None]
+
+def parse_amount(text: Optional[str]) -> Amount:
+    """Integer cents for a plain two-decimal amount, else text unchanged"""
+    if text is not None and PLAIN_AMOUNT.fullmatch(text):
+        return int(text.replace('.', ''))
+    return text
+
+def format_amount(value: Amount) -> Optional[str]:
+    if value.__class__ is not int:
+        return value
+    whole, cents = divmod(value, 100)
+    return f"{whole}.{cents:02d}"
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+class FeeRow(NamedTuple):
+    """One fee schedule row, a tuple in FEE_COLUMNS order.
+
+    Amounts are integer cents (see parse_amount); values that are not
+    plain amounts, such as "BR", stay text. Codes, modifiers, locations
+    and indicators are interned, so repeated values share one string.
+    json.dumps(rows) is the JSON write format (see db_connector.FEE_ROWS_SOURCE)
+    and db_values() the text form stored in the fee table.
+    """
+    cpt_hcpc_code: Optional[str] = None
+    modifier: Optional[str] = None
+    medicare_location: Optional[str] = None
+    global_surgery_indicator: Optional[str] = None
+    multiple_surgery_indicator: Optional[str] = None
+    prevailing_charge_amount: Amount = None
+    fee_schedule_amount: Amount = None
+    site_of_service_amount: Amount = None
+
+    @classmethod
+    def from_text(cls, code=None, modifier=None, location=None, global_surgery=None,
+                  multiple_surgery=None, prevailing_charge=None, fee_schedule=None,
+                  site_of_service=None) -> 'FeeRow':
+        """Build a row from normalized cell text, parsing amounts once"""
+        return cls(
+            _intern(code), _intern(modifier), _intern(location),
+            _intern(global_surgery), _intern(multiple_surgery),
+            parse_amount(prevailing_charge), parse_amount(fee_schedule), parse_amount(site_of_service)
+        )
+
+    @classmethod
+    def from_dict(cls, row: Dict[str, Any]) -> 'FeeRow':
+        return cls.from_text(*(row.get(col) for col in FEE_COLUMNS))
+
+    def db_values(self) -> Tuple[Optional[str], ...]:
+        """Column values as stored in pa_wc_scheduleb_fees (amounts as text)"""
+        return self[:5] + tuple(map(format_amount, self[5:]))
+
+    def as_dict(self) -> Dict[str, Optional[str]]:
+        return dict(zip(FEE_COLUMNS, self.db_values()))
@@ -0,0 +1,247 @@
+import logging
+import time
+from typing import Callable, List, Tuple
+
+from fee_scraper.database.db_connector import init_db, close_db, get_db_connection, NATURAL_KEY_COLUMNS
+from fee_scraper.database.row_hash import ROW_HASH_FUNCTION_SQL, row_hash_sql
+from fee_scraper.database.fee_history import (
+    HISTORY_DDL, HISTORY_TRIGGERS_SQL, SEED_HISTORY_SQL, ensure_history_partitions
+)
+
+logger = logging.getLogger('fee_schedule_scraper')
+
+BACKFILL_BATCH_SIZE = 5000
+
+def _ensure_migrations_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name text PRIMARY KEY,
+                applied_at timestamptz NOT NULL DEFAULT now()
+            );
+        """)
+    conn.commit()
+
+def _applied_migrations(conn) -> set:
+    with conn.cursor() as cur:
+        cur.execute("SELECT name FROM schema_migrations")
+        return {row[0] for row in cur.fetchall()}
+
+def backfill_row_hash(conn, batch_size: int = BACKFILL_BATCH_SIZE, pause: float = 0.0):
+    """Fill row_hash for existing rows in id ranges, one short transaction each.
+
+    Only the rows in the current range are locked, and readers are never
+    blocked. Safe to re-run; rows that already have a hash are skipped.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT COALESCE(min(id), 0), COALESCE(max(id), 0) FROM pa_wc_scheduleb_fees")
+        low, high = cur.fetchone()
+    conn.commit()
+
+    total = 0
+    start = low
+    while start <= high:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                UPDATE pa_wc_scheduleb_fees e
+                SET row_hash = {row_hash_sql('e')}
+                WHERE e.id >= %s AND e.id < %s
+                AND e.row_hash IS NULL
+            """, (start, start + batch_size))
+            total += cur.rowcount
+        conn.commit()
+        start += batch_size
+        if pause:
+            time.sleep(pause)
+    logger.info(f"Backfilled row_hash for {total} rows")
+    return total
+
+def add_row_hash(conn):
+    """Add a trigger-maintained row_hash column and its covering index"""
+    with conn.cursor() as cur:
+        cur.execute(ROW_HASH_FUNCTION_SQL)
+        # Nullable with no default: a catalog-only change, no table rewrite
+        cur.execute("ALTER TABLE pa_wc_scheduleb_fees ADD COLUMN IF NOT EXISTS row_hash bytea")
+        cur.execute(f"""
+            CREATE OR REPLACE FUNCTION pa_wc_scheduleb_fees_set_row_hash() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                NEW.row_hash := {row_hash_sql('NEW')};
+                RETURN NEW;
+            END
+            $$;
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS pa_wc_scheduleb_fees_row_hash ON pa_wc_scheduleb_fees")
+        cur.execute("""
+            CREATE TRIGGER pa_wc_scheduleb_fees_row_hash
+            BEFORE INSERT OR UPDATE ON pa_wc_scheduleb_fees
+            FOR EACH ROW EXECUTE FUNCTION pa_wc_scheduleb_fees_set_row_hash();
+        """)
+    conn.commit()
+
+    backfill_row_hash(conn)
+
+    # CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS pa_wc_scheduleb_fees_key_hash_idx
+                ON pa_wc_scheduleb_fees ("cpt/hcpc_code", modifier, medicare_location, row_hash)
+            """)
+    finally:
+        conn.autocommit = False
+
+def add_natural_key_unique_index(conn):
+    """Enforce one row per (cpt/hcpc_code, modifier, medicare_location).
+
+    Rows that already share a key are collapsed to the newest one first,
+    with NULL and '' alike in all three columns as in pipeline.diff, so
+    rows without a code are collapsed too. NULL modifiers and locations
+    are folded with COALESCE in the index, which works on servers older
+    than 15 where NULLS NOT DISTINCT is unavailable.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            DELETE FROM pa_wc_scheduleb_fees e
+            USING pa_wc_scheduleb_fees d
+            WHERE COALESCE(d."cpt/hcpc_code", '') = COALESCE(e."cpt/hcpc_code", '')
+            AND COALESCE(d.modifier, '') = COALESCE(e.modifier, '')
+            AND COALESCE(d.medicare_location, '') = COALESCE(e.medicare_location, '')
+            AND d.id > e.id
+        """)
+        logger.info(f"Removed {cur.rowcount} rows with a duplicate natural key")
+    conn.commit()
+
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            # A failed CONCURRENTLY build leaves an invalid index behind
+            cur.execute("""
+                SELECT 1 FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = 'pa_wc_scheduleb_fees_natural_key' AND NOT i.indisvalid
+            """)
+            if cur.fetchone():
+                cur.execute("DROP INDEX CONCURRENTLY pa_wc_scheduleb_fees_natural_key")
+            cur.execute(f"""
+                CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS pa_wc_scheduleb_fees_natural_key
+                ON pa_wc_scheduleb_fees ({NATURAL_KEY_COLUMNS})
+            """)
+    finally:
+        conn.autocommit = False
+
+def add_run_state(conn):
+    """Tables tracking each run's per-PDF progress, for main.py --resume"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS scrape_runs (
+                id bigserial PRIMARY KEY,
+                started_at timestamptz NOT NULL DEFAULT now(),
+                finished_at timestamptz,
+                status text NOT NULL DEFAULT 'running',
+                pdf_count integer
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS scrape_run_pdfs (
+                run_id bigint NOT NULL REFERENCES scrape_runs (id) ON DELETE CASCADE,
+                pdf_num integer NOT NULL,
+                url text NOT NULL,
+                status text NOT NULL DEFAULT 'pending',
+                sha256 text,
+                rows integer,
+                error text,
+                committed_at timestamptz,
+                PRIMARY KEY (run_id, url)
+            );
+        """)
+    conn.commit()
+
+def add_work_queue(conn):
+    """Claim columns on scrape_run_pdfs, for main.py --work-queue"""
+    with conn.cursor() as cur:
+        # Constant defaults: catalog-only changes, no table rewrite
+        cur.execute("ALTER TABLE scrape_runs ADD COLUMN IF NOT EXISTS queued boolean NOT NULL DEFAULT false")
+        cur.execute("""
+            ALTER TABLE scrape_run_pdfs
+                ADD COLUMN IF NOT EXISTS worker text,
+                ADD COLUMN IF NOT EXISTS attempts integer NOT NULL DEFAULT 0,
+                ADD COLUMN IF NOT EXISTS claimed_at timestamptz,
+                ADD COLUMN IF NOT EXISTS heartbeat_at timestamptz
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS scrape_run_pdfs_queue
+            ON scrape_run_pdfs (run_id, status, pdf_num)
+        """)
+    conn.commit()
+
+def add_fee_history(conn):
+    """Versioned fee history partitioned by schedule year, kept by triggers on the fee table"""
+    with conn.cursor() as cur:
+        cur.execute(HISTORY_DDL)
+    conn.commit()
+    ensure_history_partitions(conn)
+    with conn.cursor() as cur:
+        # CREATE TRIGGER blocks writers until commit, so the seed sees every
+        # live row and no write slips in between it and the triggers
+        cur.execute(HISTORY_TRIGGERS_SQL)
+        cur.execute(SEED_HISTORY_SQL)
+        logger.info(f"Seeded fee history with {cur.rowcount} current versions")
+    conn.commit()
+
+# Applied in order; each name is recorded in schema_migrations once done
+MIGRATIONS: List[Tuple[str, Callable]] = [
+    ('0001_row_hash', add_row_hash),
+    ('0002_natural_key_unique', add_natural_key_unique_index),
+    ('0003_run_state', add_run_state),
+    ('0004_work_queue', add_work_queue),
+    ('0005_fee_history', add_fee_history),
+]
+
+# Held while migrating, so processes starting together apply each migration once
+MIGRATION_LOCK = "hashtext('schema_migrations')"
+
+def run_migrations(conn, poll_interval: float = 1.0):
+    """Apply every migration not yet recorded in schema_migrations.
+
+    The advisory lock is polled rather than waited on: a session blocked
+    in pg_advisory_lock() holds a snapshot, which CREATE INDEX
+    CONCURRENTLY in the session holding the lock would wait for forever.
+    """
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT pg_try_advisory_lock({MIGRATION_LOCK})")
+            locked = cur.fetchone()[0]
+        conn.commit()
+        if locked:
+            break
+        logger.info("Waiting for another process to finish migrating...")
+        time.sleep(poll_interval)
+    try:
+        _ensure_migrations_table(conn)
+        applied = _applied_migrations(conn)
+        conn.commit()
+        for name, migration in MIGRATIONS:
+            if name in applied:
+                continue
+            logger.info(f"Applying migration {name}...")
+            migration(conn)
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+            conn.commit()
+            logger.info(f"Applied migration {name}")
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT pg_advisory_unlock({MIGRATION_LOCK})")
+        conn.commit()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    try:
+        with get_db_connection() as conn:
+            run_migrations(conn)
+    finally:
+        close_db()
@@ -0,0 +1,42 @@
+import hashlib
+
+from fee_scraper.database.fee_row import FeeRow
+
+# Non-key columns covered by row_hash. NULL and '' hash the same, matching
+# the COALESCE(col, '') comparisons the hash replaces.
+CONTENT_COLUMNS = [
+    'global_surgery_indicator',
+    'multiple_surgery_indicator',
+    'prevailing_charge_amount',
+    'fee_schedule_amount',
+    'site_of_service_amount'
+]
+
+# Server-side twin of row_hash(); installed by the row_hash migration
+ROW_HASH_FUNCTION_SQL = """
+    CREATE OR REPLACE FUNCTION fee_row_hash(
+        global_surgery_indicator text,
+        multiple_surgery_indicator text,
+        prevailing_charge_amount text,
+        fee_schedule_amount text,
+        site_of_service_amount text
+    ) RETURNS bytea
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT decode(md5(
+            COALESCE($1, '') || chr(31) ||
+            COALESCE($2, '') || chr(31) ||
+            COALESCE($3, '') || chr(31) ||
+            COALESCE($4, '') || chr(31) ||
+            COALESCE($5, '')
+        ), 'hex')
+    $$;
+"""
+
+def row_hash(row: FeeRow) -> bytes:
+    """16-byte digest of a row's content columns, equal to fee_row_hash() in SQL"""
+    payload = '\x1f'.join(value or '' for value in row.db_values()[3:])
+    return hashlib.md5(payload.encode('utf-8')).digest()
+
+def row_hash_sql(alias: str) -> str:
+    """fee_row_hash(...) call over the content columns of a table alias"""
+    return 'fee_row_hash(' + ', '.join(f'{alias}.{col}' for col in CONTENT_COLUMNS) + ')'
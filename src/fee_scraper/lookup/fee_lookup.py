@@ -0,0 +1,259 @@
+import bisect
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Iterable, Callable, Any, Tuple
+
+from fee_scraper.database.fee_row import FeeRow
+from fee_scraper.pipeline.reconcile import Key, row_key
+from fee_scraper.scraper.columnar_cache import ColumnarCache, ColumnarFile
+
+FEE_SELECT = """
+    SELECT "cpt/hcpc_code", modifier, medicare_location,
+           global_surgery_indicator, multiple_surgery_indicator,
+           prevailing_charge_amount, fee_schedule_amount, site_of_service_amount
+    FROM pa_wc_scheduleb_fees
+"""
+
+def fee_key(code: str, modifier: Optional[str] = None, location: Optional[str] = None) -> Key:
+    """Natural key as stored: NULL and '' modifiers and locations are the same"""
+    return (code, modifier or None, location or None)
+
+def data_version(conn) -> Optional[Any]:
+    """Commit time of the last PDF the scraper wrote (scrape_run_pdfs, migration 0003)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT max(committed_at) FROM scrape_run_pdfs WHERE status = 'committed'")
+        version = cur.fetchone()[0]
+    conn.rollback()
+    return version
+
+class FeeIndex:
+    """Immutable in-memory index of fee rows by natural key and by code.
+
+    codes is the sorted list of distinct CPT/HCPC codes, so prefix and
+    range queries are a bisect plus a slice. Rows are FeeRows, amounts
+    in cents.
+    """
+
+    def __init__(self, rows: Iterable[FeeRow]):
+        self.rows: Dict[Key, FeeRow] = {}
+        self.by_code: Dict[str, List[FeeRow]] = {}
+        for row in rows:
+            # Later rows win, as later PDFs overwrite earlier ones
+            key = fee_key(*row_key(row))
+            previous = self.rows.get(key)
+            self.rows[key] = row
+            code_rows = self.by_code.setdefault(row.cpt_hcpc_code, [])
+            if previous is not None:
+                code_rows[code_rows.index(previous)] = row
+            else:
+                code_rows.append(row)
+        self.codes: List[str] = sorted(code for code in self.by_code if code is not None)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def load(cls, conn, itersize: int = 50000) -> 'FeeIndex':
+        """Stream pa_wc_scheduleb_fees with a server-side cursor"""
+        with conn.cursor(name='fee_lookup_load') as cur:
+            cur.itersize = itersize
+            cur.execute(FEE_SELECT)
+            index = cls(FeeRow.from_text(*row) for row in cur)
+        conn.rollback()
+        return index
+
+    @classmethod
+    def load_columnar(cls, cache: ColumnarCache, extractor_id: str) -> 'FeeIndex':
+        """Rows of every PDF in the columnar cache, without a database"""
+        def rows():
+            for entry in cache.entries(extractor_id):
+                with ColumnarFile(entry['path']) as columnar:
+                    for batch in columnar.iter_batches(50000):
+                        yield from batch
+        return cls(rows())
+
+    def get(self, code: str, modifier: Optional[str] = None,
+            location: Optional[str] = None) -> Optional[FeeRow]:
+        return self.rows.get(fee_key(code, modifier, location))
+
+    def lookup_many(self, keys: Iterable[Key]) -> List[Optional[FeeRow]]:
+        rows = self.rows
+        return [rows.get(fee_key(*key)) for key in keys]
+
+    def code_range(self, start: str, stop: Optional[str] = None) -> List[FeeRow]:
+        """Rows with start <= code < stop (stop None: no upper bound), by code"""
+        low = bisect.bisect_left(self.codes, start)
+        high = len(self.codes) if stop is None else bisect.bisect_left(self.codes, stop)
+        return [row for code in self.codes[low:high] for row in self.by_code[code]]
+
+    def prefix(self, prefix: str) -> List[FeeRow]:
+        """Rows whose code starts with prefix, by code"""
+        low = bisect.bisect_left(self.codes, prefix)
+        rows = []
+        for code in self.codes[low:]:
+            if not code.startswith(prefix):
+                break
+            rows.extend(self.by_code[code])
+        return rows
+
+class FeeLookup:
+    """Fee lookups for other services, refreshed when the scraper writes.
+
+    Wraps a FeeIndex built by loader(). At most every check_interval
+    seconds a call compares version() with the version the index was
+    built at and rebuilds the index when it changed; readers keep using
+    the old index until the new one is swapped in.
+    """
+
+    def __init__(self, loader: Callable[[], FeeIndex], version: Callable[[], Any],
+                 check_interval: float = 30.0):
+        self._loader = loader
+        self._version = version
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self.version = None
+        self.index: Optional[FeeIndex] = None
+        self.refresh(force=True)
+
+    @classmethod
+    def from_db(cls, conn, check_interval: float = 30.0) -> 'FeeLookup':
+        """Index the fee table; reload after each PDF the scraper commits"""
+        return cls(lambda: FeeIndex.load(conn), lambda: data_version(conn), check_interval)
+
+    @classmethod
+    def from_cache(cls, cache_dir: str, extractor_id: str, check_interval: float = 30.0) -> 'FeeLookup':
+        """Index the columnar cache; reload when its manifest changes"""
+        cache = ColumnarCache(cache_dir)
+        def version():
+            try:
+                return os.stat(cache.manifest_path).st_mtime_ns
+            except OSError:
+                return None
+        return cls(lambda: FeeIndex.load_columnar(cache, extractor_id), version, check_interval)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rebuild the index if the data changed; True if it was rebuilt"""
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval:
+            return False
+        with self._lock:
+            if not force and now - self._checked < self.check_interval:
+                return False
+            self._checked = now
+            version = self._version()
+            if not force and version == self.version:
+                return False
+            self.index = self._loader()
+            self.version = version
+            return True
+
+    def _current(self) -> FeeIndex:
+        self.refresh()
+        return self.index
+
+    def get(self, code: str, modifier: Optional[str] = None,
+            location: Optional[str] = None) -> Optional[FeeRow]:
+        return self._current().get(code, modifier, location)
+
+    def lookup_many(self, keys: Iterable[Key]) -> List[Optional[FeeRow]]:
+        return self._current().lookup_many(keys)
+
+    def code_range(self, start: str, stop: Optional[str] = None) -> List[FeeRow]:
+        return self._current().code_range(start, stop)
+
+    def prefix(self, prefix: str) -> List[FeeRow]:
+        return self._current().prefix(prefix)
+
+class DbFeeLookup:
+    """Fee lookups straight from the database, through an LRU cache.
+
+    For services that cannot hold the whole table. Keys (and misses) are
+    cached up to cache_size entries; lookup_many fetches all cache misses
+    in one query on the natural-key index. The cache is cleared when
+    data_version() changes, checked at most every check_interval seconds.
+    Prefix and range queries always go to the database, compared in the
+    "C" collation so they order codes like FeeIndex does.
+    """
+
+    def __init__(self, conn, cache_size: int = 100000, check_interval: float = 30.0):
+        self.conn = conn
+        self.cache_size = cache_size
+        self.check_interval = check_interval
+        self._cache: 'OrderedDict[Key, Optional[FeeRow]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self.version = data_version(conn)
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        version = data_version(self.conn)
+        if version != self.version:
+            self.version = version
+            self._cache.clear()
+
+    def _fetch(self, keys: List[Key]) -> Dict[Key, FeeRow]:
+        with self.conn.cursor() as cur:
+            cur.execute(FEE_SELECT + """
+                WHERE ("cpt/hcpc_code", COALESCE(modifier, ''), COALESCE(medicare_location, ''))
+                    IN (SELECT * FROM unnest(%s::text[], %s::text[], %s::text[]))
+            """, (
+                [key[0] for key in keys],
+                [key[1] or '' for key in keys],
+                [key[2] or '' for key in keys],
+            ))
+            found = {}
+            for values in cur:
+                row = FeeRow.from_text(*values)
+                found[fee_key(*row_key(row))] = row
+        self.conn.rollback()
+        return found
+
+    def lookup_many(self, keys: Iterable[Key]) -> List[Optional[FeeRow]]:
+        keys = [fee_key(*key) for key in keys]
+        with self._lock:
+            self._check_version()
+            cache = self._cache
+            missing = [key for key in dict.fromkeys(keys) if key not in cache]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+            if missing:
+                found = self._fetch(missing)
+                for key in missing:
+                    cache[key] = found.get(key)
+            results = []
+            for key in keys:
+                cache.move_to_end(key)
+                results.append(cache[key])
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return results
+
+    def get(self, code: str, modifier: Optional[str] = None,
+            location: Optional[str] = None) -> Optional[FeeRow]:
+        return self.lookup_many([(code, modifier, location)])[0]
+
+    def _select(self, where: str, params: Tuple) -> List[FeeRow]:
+        with self._lock:
+            with self.conn.cursor() as cur:
+                cur.execute(FEE_SELECT + where + ' ORDER BY "cpt/hcpc_code" COLLATE "C", modifier, medicare_location', params)
+                rows = [FeeRow.from_text(*values) for values in cur]
+            self.conn.rollback()
+        return rows
+
+    def code_range(self, start: str, stop: Optional[str] = None) -> List[FeeRow]:
+        if stop is None:
+            return self._select(' WHERE "cpt/hcpc_code" COLLATE "C" >= %s', (start,))
+        return self._select(' WHERE "cpt/hcpc_code" COLLATE "C" >= %s AND "cpt/hcpc_code" COLLATE "C" < %s',
+                            (start, stop))
+
+    def prefix(self, prefix: str) -> List[FeeRow]:
+        pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return self._select(' WHERE "cpt/hcpc_code" LIKE %s', (pattern,))
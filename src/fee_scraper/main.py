@@ -0,0 +1,630 @@
+from fee_scraper.scraper.fetch_pdfs import fetch_part_b_pdf_urls, filter_urls, PART_B_INDEX_URL
+from fee_scraper.scraper.extract_pdfs import (
+    extract_pdf_content, iter_pdf_rows, download_to_file, get_extractor, DEFAULT_CHUNK_ROWS, EXTRACTORS
+)
+from fee_scraper.scraper.page_cache import PageCache
+from fee_scraper.scraper.columnar_cache import ColumnarCache, ColumnarFile
+from fee_scraper.database.db_connector import init_db, close_db, get_db_connection
+from fee_scraper.database.fee_history import ensure_history_partitions
+from fee_scraper.database.migrations import run_migrations
+from fee_scraper.pipeline.snapshot import SnapshotIndex
+from fee_scraper.pipeline.writer import PdfWriter
+from fee_scraper.pipeline.run_state import RunState
+from fee_scraper.pipeline.work_queue import WorkQueue
+from fee_scraper.pipeline.diff import DiffReport, sorted_rows, db_rows, columnar_batches, DEFAULT_SORT_CHUNK_ROWS
+from fee_scraper.utils.logger import setup_logger, worker_logging, init_worker_logging, VERBOSITIES
+from fee_scraper.utils.metrics import METRICS
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from collections import deque
+import argparse
+import logging
+import queue
+import threading
+import os
+import signal
+import sys
+import time
+
+logger = logging.getLogger('fee_schedule_scraper')
+
+# Set by the first SIGINT/SIGTERM: finish the PDF in flight, then stop
+shutdown = threading.Event()
+shutdown_signum = None
+
+class ShutdownRequested(BaseException):
+    """Raised by a second SIGINT/SIGTERM to roll back the PDF in flight"""
+
+def signal_handler(signum, frame):
+    global shutdown_signum
+    if shutdown.is_set():
+        logger.info("\n\nSignal received again, rolling back the current PDF...")
+        raise ShutdownRequested(signum)
+    shutdown_signum = signum
+    shutdown.set()
+    logger.info("\n\nGracefully shutting down after the current PDF (signal again to abort it)...")
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Scrape PA Schedule B fee PDFs into the database")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of processes used to extract PDFs (default: 1, sequential)"
+    )
+    parser.add_argument(
+        "--chunk-rows", "--batch-size", type=int, default=DEFAULT_CHUNK_ROWS,
+        help="Rows diffed and upserted per batch when streaming a PDF"
+    )
+    parser.add_argument(
+        "--pool-size", type=int, default=int(os.getenv('DB_POOL_SIZE', 10)),
+        help="Most database connections held open (default: DB_POOL_SIZE or 10)"
+    )
+    parser.add_argument(
+        "--extractor", choices=sorted(EXTRACTORS), default="tables",
+        help="PDF extraction backend: pdfplumber table detection or word positions"
+    )
+    parser.add_argument(
+        "--write-path", choices=["upsert", "json", "copy"], default="upsert",
+        help="upsert: one INSERT ... ON CONFLICT per batch; json: classify, insert and update "
+             "via JSON arrays; copy: COPY into a staging table and upsert from it"
+    )
+    parser.add_argument(
+        "--skip-migrations", action="store_true",
+        help="Do not apply pending schema migrations at startup "
+             "(apply them with python -m fee_scraper.database.migrations)"
+    )
+    parser.add_argument(
+        "--snapshot-diff", action="store_true",
+        help="Load the fee table into memory once and diff every PDF locally"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Continue the last interrupted run, skipping PDFs it already committed"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="Extract every PDF (or --from-cache) and write a change report against the fee "
+             "table instead of loading it; nothing is written to the database or the caches"
+    )
+    parser.add_argument(
+        "--diff-report", default=None,
+        help="CSV change report written by --dry-run (default: diff_report.csv in --metrics-dir); "
+             "a JSON summary is written next to it"
+    )
+    parser.add_argument(
+        "--sort-chunk-rows", type=int, default=DEFAULT_SORT_CHUNK_ROWS,
+        help="Rows --dry-run sorts in memory before spilling a sorted run to disk"
+    )
+    parser.add_argument(
+        "--work-queue", action="store_true",
+        help="Claim PDFs one at a time from a run shared through the database, so several "
+             "scraper processes or replicas can split it; starts or joins the open queued run"
+    )
+    parser.add_argument(
+        "--claim-timeout", type=float, default=float(os.getenv('CLAIM_TIMEOUT', 60)),
+        help="With --work-queue, seconds without a heartbeat before another worker takes over "
+             "a claimed PDF (default: CLAIM_TIMEOUT or 60)"
+    )
+    parser.add_argument(
+        "--cache-dir", default=os.getenv('DOWNLOAD_CACHE_DIR', os.path.join('src', 'cache')),
+        help="Directory for the conditional-GET download cache"
+    )
+    parser.add_argument(
+        "--index-url", default=PART_B_INDEX_URL,
+        help="Page listing the Part B PDFs (default: PART_B_INDEX_URL or the pa.gov page)"
+    )
+    parser.add_argument(
+        "--match", default=None, metavar="REGEX",
+        help="Only process PDF URLs matching this regular expression"
+    )
+    parser.add_argument(
+        "--exclude", default=None, metavar="REGEX",
+        help="Skip PDF URLs matching this regular expression"
+    )
+    parser.add_argument(
+        "--limit", type=int, default=None,
+        help="Process at most this many PDFs, after --match and --exclude"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Always download and process every PDF"
+    )
+    parser.add_argument(
+        "--no-page-cache", action="store_true",
+        help="Re-extract every page of a changed PDF instead of only the pages whose content changed"
+    )
+    parser.add_argument(
+        "--from-cache", action="store_true",
+        help="Load the rows saved in the columnar cache under --cache-dir instead of "
+             "fetching and extracting PDFs (no HTTP, no pdfplumber)"
+    )
+    parser.add_argument(
+        "--log-verbosity", choices=VERBOSITIES, default=None,
+        help="progress: periodic progress lines and sampled per-row DEBUG lines; "
+             "records: log every row (default: LOG_VERBOSITY or progress)"
+    )
+    parser.add_argument(
+        "--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default=None,
+        help="Logger level (default: LOG_LEVEL or INFO)"
+    )
+    parser.add_argument(
+        "--metrics-dir", default=os.getenv('METRICS_DIR', os.path.join('src', 'logs')),
+        help="Directory for the fee_scraper.prom textfile-collector file and run_report.json"
+    )
+    parser.add_argument(
+        "--download-concurrency", type=int, default=2,
+        help="PDFs downloaded ahead of the one being parsed when running sequentially (0: no prefetch)"
+    )
+    parser.add_argument(
+        "--http-timeout", type=float, default=None,
+        help="HTTP read timeout in seconds (default: HTTP_READ_TIMEOUT or 60)"
+    )
+    parser.add_argument(
+        "--http-retries", type=int, default=None,
+        help="Retries with exponential backoff on 5xx and connection errors (default: HTTP_RETRIES or 3)"
+    )
+    args = parser.parse_args(argv)
+    if args.work_queue and (args.from_cache or args.workers > 1):
+        parser.error("--work-queue runs one PDF at a time per process; start more processes "
+                     "instead of --workers, and do not combine it with --from-cache")
+    if args.dry_run and (args.work_queue or args.workers > 1):
+        parser.error("--dry-run extracts in this process; do not combine it with --work-queue or --workers")
+    if args.pool_size < (2 if args.work_queue else 1):
+        parser.error("--pool-size must be at least 1, or 2 with --work-queue for its heartbeat connection")
+    return args
+
+def _init_extract_worker(http_settings=None, log_queue=None):
+    """Leave SIGINT to the parent process so it can shut the pool down"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if log_queue is not None:
+        init_worker_logging(logger, log_queue)
+    # A forked worker starts with a copy of the parent's metrics
+    METRICS.drain()
+    if http_settings:
+        from fee_scraper.scraper import http_client
+        http_client.configure(**http_settings)
+
+def load_page_state(url, download, extractor, page_cache, columnar_cache=None):
+    """url's PageState, streaming its rows to a new columnar cache file if any"""
+    extractor_id = get_extractor(extractor).cache_id
+    columnar = None
+    if columnar_cache is not None and download is not None:
+        columnar = columnar_cache.writer(url, download.sha256, extractor_id)
+    return page_cache.load(url, extractor_id, columnar)
+
+def extract_job(pdf_num, url, cache=None, extractor=None, page_cache=None, columnar_cache=None):
+    """Download and extract one PDF; also runs in pool worker processes.
+
+    Returns (pdf_num, url, download, tables, page_state, metrics, error).
+    download is None when the cache is disabled, and tables is None when
+    the cache reports the PDF unchanged since its last successful run.
+    With a page_cache, tables only holds rows of changed pages and
+    page_state (else None) carries the page cache entry and the closed
+    columnar file for the writer to save. metrics is this process's
+    METRICS.drain(), for the parent to merge. error is the text of a failed download or extraction, for the
+    parent to pass to PdfWriter.fail(); the other results are then None.
+    """
+    page_state = None
+    try:
+        if cache is None:
+            with METRICS.timer('download'):
+                pdf_file = download_to_file(url)
+            with pdf_file, METRICS.timer('extract'):
+                tables = extract_pdf_content(pdf_file, extractor)
+            return pdf_num, url, None, tables, None, METRICS.drain(), None
+        
+        with METRICS.timer('download'):
+            download = cache.fetch(url)
+        if download.unchanged:
+            return pdf_num, url, download, None, None, METRICS.drain(), None
+        if page_cache is not None:
+            page_state = load_page_state(url, download, extractor, page_cache, columnar_cache)
+        with METRICS.timer('extract'):
+            tables = extract_pdf_content(download.content, extractor, page_state)
+        if page_state is not None and page_state.columnar is not None:
+            page_state.columnar.close()
+    except Exception as e:
+        if page_state is not None and page_state.columnar is not None:
+            page_state.columnar.discard()
+        return pdf_num, url, None, None, None, METRICS.drain(), str(e)
+    if page_state is not None:
+        # Only the new entry goes back to the parent
+        page_state.previous = None
+    return pdf_num, url, download, tables, page_state, METRICS.drain(), None
+
+def _queue_result(future, results, job_urls):
+    """Put a finished extraction on the results queue, blocking while it is full"""
+    pdf_num, url = job_urls[future]
+    if future.cancelled():
+        return
+    try:
+        results.put(future.result())
+    except Exception as e:
+        results.put((pdf_num, url, None, None, None, None, str(e)))
+
+def extract_in_pool(pdf_urls, workers, results, cache=None, extractor=None, stop=None, page_cache=None,
+                    columnar_cache=None):
+    """Extract PDFs on a process pool and feed the row batches to results.
+
+    results is a bounded queue, so extraction stalls once the database
+    writer falls behind. A None sentinel marks the end of the stream.
+    Once the stop event is set no more PDFs are submitted and queued ones
+    are cancelled; PDFs already extracting run to completion.
+    """
+    from fee_scraper.scraper import http_client
+    log_queue, log_listener = worker_logging(logger)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_extract_worker,
+                                 initargs=(dict(http_client.SETTINGS), log_queue)) as executor:
+            job_urls = {}
+            pending = set()
+            for pdf_num, url in enumerate(pdf_urls, 1):
+                if stop is not None and stop.is_set():
+                    break
+                future = executor.submit(extract_job, pdf_num, url, cache, extractor, page_cache, columnar_cache)
+                job_urls[future] = (pdf_num, url)
+                pending.add(future)
+                
+                if len(pending) >= workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        _queue_result(future, results, job_urls)
+            
+            if stop is not None and stop.is_set():
+                for future in pending:
+                    future.cancel()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _queue_result(future, results, job_urls)
+    finally:
+        # The workers have exited; write what they logged before the end of the stream
+        log_listener.stop()
+        results.put(None)
+
+def download_job(url, cache=None):
+    """Download one PDF into a temporary file.
+
+    Returns (download, pdf_file). download is None when the cache is
+    disabled, and pdf_file is None when the cache reports the PDF
+    unchanged since its last successful run.
+    """
+    with METRICS.timer('download'):
+        if cache is None:
+            return None, download_to_file(url)
+        
+        download = cache.fetch(url, to_file=True)
+        return download, download.file
+
+def prefetch_downloads(pdf_urls, cache=None, concurrency=2):
+    """Yield (pdf_num, url, future) in order while later PDFs download.
+
+    Up to concurrency downloads run on threads ahead of the PDF being
+    parsed; each future resolves to download_job's result. With a
+    concurrency of 0 every download happens inline.
+    """
+    if concurrency < 1:
+        for pdf_num, url in enumerate(pdf_urls, 1):
+            future = Future()
+            try:
+                future.set_result(download_job(url, cache))
+            except Exception as e:
+                future.set_exception(e)
+            yield pdf_num, url, future
+        return
+    
+    jobs = iter(enumerate(pdf_urls, 1))
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for pdf_num, url in jobs:
+            pending.append((pdf_num, url, executor.submit(download_job, url, cache)))
+            if len(pending) > concurrency:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+    finally:
+        # Stopped early: drop queued downloads and close finished ones
+        for _, _, future in pending:
+            if not future.cancel() and future.exception() is None:
+                _close_download(*future.result())
+        executor.shutdown(wait=False)
+
+def write_download(writer, pdf_num, url, download, pdf_file, chunk_rows, extractor, page_cache=None,
+                   columnar_cache=None):
+    """Extract a downloaded PDF in batches of chunk_rows and write it; closes the download"""
+    try:
+        batches = None
+        page_state = None
+        if pdf_file is not None:
+            if page_cache is not None:
+                page_state = load_page_state(url, download, extractor, page_cache, columnar_cache)
+            batches = METRICS.timed_iter(
+                'extract',
+                iter_pdf_rows(pdf_file, chunk_rows, extractor, page_state)
+            )
+        writer.handle(pdf_num, url, download, batches, page_state)
+    finally:
+        _close_download(download, pdf_file)
+
+def _close_download(download, pdf_file):
+    if download is not None:
+        download.close()
+    elif pdf_file is not None:
+        pdf_file.close()
+
+def dry_run_sources(pdf_urls, args, failed_pdfs, cached_files=None):
+    """Row batches of each PDF for --dry-run, in load order, without the download cache"""
+    if cached_files is not None:
+        for url in pdf_urls:
+            yield _guarded(url, columnar_batches(cached_files[url], args.chunk_rows), failed_pdfs)
+        return
+    downloads = prefetch_downloads(pdf_urls, None, args.download_concurrency)
+    try:
+        for pdf_num, url, future in downloads:
+            if shutdown.is_set():
+                break
+            logger.info(f"\nExtracting PDF {pdf_num}/{len(pdf_urls)}: {url}")
+            try:
+                _, pdf_file = future.result()
+            except Exception as e:
+                logger.error(f"Error processing PDF {url}: {e}")
+                failed_pdfs.append({"url": url, "error": str(e)})
+                continue
+            try:
+                yield _guarded(url, METRICS.timed_iter('extract', iter_pdf_rows(
+                    pdf_file, args.chunk_rows, args.extractor)), failed_pdfs)
+            finally:
+                pdf_file.close()
+    finally:
+        downloads.close()
+
+def _guarded(url, batches, failed_pdfs):
+    """batches, recording an error in failed_pdfs instead of raising it"""
+    try:
+        yield from batches
+    except Exception as e:
+        logger.error(f"Error processing PDF {url}: {e}")
+        failed_pdfs.append({"url": url, "error": str(e)})
+
+def dry_run(conn, pdf_urls, args, cached_files=None):
+    """Diff the fee table against the extracted PDFs and write the change report.
+
+    Reads the table in a read-only transaction and writes nothing else to
+    the database. Returns the report summary.
+    """
+    failed_pdfs = []
+    new_rows = sorted_rows(dry_run_sources(pdf_urls, args, failed_pdfs, cached_files),
+                           args.sort_chunk_rows)
+    report = DiffReport(args.diff_report or os.path.join(args.metrics_dir, 'diff_report.csv'))
+    summary = report.write(
+        db_rows(conn), new_rows, pdfs=len(pdf_urls), failed_pdfs=failed_pdfs,
+        complete=not failed_pdfs and not shutdown.is_set()
+    )
+    report.log_summary(summary)
+    if not summary['complete']:
+        logger.warning("Not every PDF was read; rows of the missing ones show up as removed")
+    return summary
+
+def write_metrics(metrics_dir, run_seconds, total_pdfs, failed_pdfs, cache=None):
+    """Write the Prometheus textfile and JSON run report for this run"""
+    rows = METRICS.total('rows_extracted_total')
+    METRICS.set('run_seconds', run_seconds)
+    METRICS.set('rows_per_second', rows / run_seconds if run_seconds else 0)
+    METRICS.set('last_run_timestamp_seconds', time.time())
+    try:
+        METRICS.write_prometheus(os.path.join(metrics_dir, 'fee_scraper.prom'))
+        METRICS.write_report(
+            os.path.join(metrics_dir, 'run_report.json'),
+            run_seconds=round(run_seconds, 3),
+            pdfs=total_pdfs,
+            failed_pdfs=failed_pdfs,
+            cache=cache.summary() if cache is not None else None
+        )
+    except OSError as e:
+        logger.error(f"Could not write metrics to {metrics_dir}: {e}")
+
+def main(argv=None):
+    global logger
+    args = parse_args(argv)
+    run_start = time.perf_counter()
+    logger = setup_logger(args.log_verbosity, args.log_level)
+    
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    extractor_id = get_extractor(args.extractor).cache_id
+    cache = None
+    if not args.from_cache:
+        # Loading from the columnar cache needs neither requests nor pdfplumber
+        from fee_scraper.scraper import http_client
+        from fee_scraper.scraper.download_cache import DownloadCache
+        http_client.configure(read_timeout=args.http_timeout, retries=args.http_retries,
+                              pool_size=max(args.download_concurrency, args.workers) + 1)
+        if not args.no_cache and not args.dry_run:
+            cache = DownloadCache(args.cache_dir)
+
+    if args.from_cache:
+        cached_files = {
+            entry['url']: entry['path'] for entry in ColumnarCache(args.cache_dir).entries(extractor_id)
+        }
+        pdf_urls = list(cached_files)
+        logger.info(f"Found {len(pdf_urls)} PDFs in the columnar cache for {extractor_id}")
+    else:
+        logger.info("Fetching PDF URLs...")
+        with METRICS.timer('index_fetch'):
+            pdf_urls = fetch_part_b_pdf_urls(cache, args.index_url)
+        logger.info(f"Found {len(pdf_urls)} PDFs to process")
+    if args.match or args.exclude or args.limit is not None:
+        pdf_urls = filter_urls(pdf_urls, args.match, args.exclude, args.limit)
+        logger.info(f"{len(pdf_urls)} PDFs selected by --match/--exclude/--limit")
+
+    # Initialize database connection
+    logger.info("Connecting to database...")
+    init_db(maxconn=args.pool_size)
+    
+    if args.dry_run:
+        try:
+            with get_db_connection() as conn:
+                summary = dry_run(conn, pdf_urls, args, cached_files if args.from_cache else None)
+        finally:
+            close_db()
+        if shutdown.is_set():
+            sys.exit(128 + shutdown_signum)
+        return summary
+    
+    writer = None
+    
+    try:
+        with get_db_connection() as conn:
+            # Run state, the history partitions and the upsert need migrations 0001-0005
+            if not args.skip_migrations:
+                run_migrations(conn)
+            
+            snapshot = None
+            if args.snapshot_diff:
+                logger.info("Loading fee table snapshot...")
+                snapshot = SnapshotIndex().load(conn)
+                logger.info(f"Snapshot index: {len(snapshot)} keys, ~{snapshot.memory_bytes() / 1024 / 1024:.1f} MiB")
+            
+            # Versions written this run land in their own year's partition
+            for partition in ensure_history_partitions(conn):
+                logger.info(f"Created fee history partition {partition}")
+            
+            if args.work_queue:
+                run_state = WorkQueue(conn, stale_after=args.claim_timeout).start(pdf_urls)
+                logger.info(f"Worker {run_state.worker_id} joined queued run {run_state.run_id}")
+            else:
+                run_state = RunState(conn).start(pdf_urls, args.resume)
+            pending_urls = run_state.pending(pdf_urls)
+            if run_state.resumed and not args.work_queue:
+                logger.info(f"Resuming run {run_state.run_id}: {len(pdf_urls) - len(pending_urls)} "
+                            f"PDFs already done, {len(pending_urls)} to go")
+            
+            page_cache = columnar_cache = None
+            if cache is not None:
+                page_cache = PageCache(args.cache_dir, reuse=not args.no_page_cache)
+                columnar_cache = ColumnarCache(args.cache_dir)
+            
+            writer = PdfWriter(conn, len(pending_urls), cache, args.write_path, snapshot, run_state,
+                               page_cache, columnar_cache)
+            total_pdfs = len(pending_urls)
+            try:
+                if args.from_cache:
+                    for pdf_num, url in enumerate(pending_urls, 1):
+                        if shutdown.is_set():
+                            break
+                        logger.info(f"\nLoading PDF {pdf_num}/{total_pdfs} from the columnar cache: {url}")
+                        try:
+                            columnar = ColumnarFile(cached_files[url])
+                        except (OSError, ValueError) as e:
+                            writer.fail(url, str(e))
+                            continue
+                        with columnar:
+                            batches = METRICS.timed_iter('columnar_load', columnar.iter_batches(args.chunk_rows))
+                            writer.handle(pdf_num, url, None, batches)
+                elif args.work_queue:
+                    claims = run_state.claims(shutdown)
+                    try:
+                        for pdf_num, url in claims:
+                            logger.info(f"\nProcessing PDF {pdf_num}/{len(pdf_urls)}: {url}")
+                            try:
+                                download, pdf_file = download_job(url, cache)
+                            except Exception as e:
+                                writer.fail(url, str(e))
+                                continue
+                            write_download(writer, pdf_num, url, download, pdf_file,
+                                           args.chunk_rows, args.extractor, page_cache, columnar_cache)
+                    finally:
+                        claims.close()
+                    logger.info(f"Worker {run_state.worker_id} claimed {run_state.claimed} PDFs")
+                elif args.workers > 1:
+                    logger.info(f"Extracting PDFs with {args.workers} worker processes")
+                    results = queue.Queue(maxsize=args.workers * 2)
+                    producer = threading.Thread(
+                        target=extract_in_pool,
+                        args=(pending_urls, args.workers, results, cache, args.extractor, shutdown,
+                              page_cache, columnar_cache),
+                        daemon=True
+                    )
+                    producer.start()
+                    
+                    # Single writer: drain extracted PDFs in completion order
+                    while True:
+                        item = results.get()
+                        if item is None:
+                            break
+                        pdf_num, url, download, tables, page_state, worker_metrics, error = item
+                        if worker_metrics:
+                            METRICS.merge(worker_metrics)
+                        if shutdown.is_set():
+                            # Keep draining so the producer can wind down
+                            if page_state is not None and page_state.columnar is not None:
+                                page_state.columnar.discard()
+                            continue
+                        logger.info(f"\nProcessing PDF {pdf_num}/{total_pdfs}: {url}")
+                        
+                        if error is not None:
+                            writer.fail(url, error)
+                            continue
+                        
+                        # Written in --chunk-rows batches, like the serial path
+                        tables = tables or []
+                        batches = [tables[start:start + args.chunk_rows]
+                                   for start in range(0, len(tables), args.chunk_rows)]
+                        writer.handle(pdf_num, url, download, batches, page_state)
+                    
+                    producer.join()
+                else:
+                    downloads = prefetch_downloads(pending_urls, cache, args.download_concurrency)
+                    try:
+                        for pdf_num, url, future in downloads:
+                            if shutdown.is_set():
+                                break
+                            logger.info(f"\nProcessing PDF {pdf_num}/{total_pdfs}: {url}")
+                            try:
+                                download, pdf_file = future.result()
+                            except Exception as e:
+                                writer.fail(url, str(e))
+                                continue
+                            
+                            write_download(writer, pdf_num, url, download, pdf_file,
+                                           args.chunk_rows, args.extractor, page_cache, columnar_cache)
+                    finally:
+                        downloads.close()
+            except ShutdownRequested:
+                # The writer has already rolled back the PDF in flight
+                pass
+            
+            run_state.finish('interrupted' if shutdown.is_set() else 'completed')
+            if shutdown.is_set() and args.work_queue:
+                logger.info(f"Worker stopped; run {run_state.run_id} stays open for the other workers")
+            elif shutdown.is_set():
+                logger.info(f"Run {run_state.run_id} interrupted; continue it with --resume")
+                
+    finally:
+        close_db()
+
+    total_records = writer.total_records if writer else 0
+    failed_pdfs = writer.failed_pdfs if writer else []
+    write_metrics(args.metrics_dir, time.perf_counter() - run_start, len(pdf_urls), failed_pdfs, cache)
+
+    logger.info("\n=== Processing Complete ===")
+    logger.info(f"Total PDFs processed: {len(pdf_urls)}")
+    logger.info(f"Total records inserted: {total_records}")
+    logger.info(f"Failed PDFs: {len(failed_pdfs)}")
+    if cache is not None:
+        logger.info(cache.summary())
+    if writer is not None and writer.snapshot is not None:
+        logger.info(f"Snapshot index: {len(writer.snapshot)} keys, ~{writer.snapshot.memory_bytes() / 1024 / 1024:.1f} MiB")
+
+    if failed_pdfs:
+        logger.error("\nFailed PDFs:")
+        for fail in failed_pdfs:
+            logger.error("- URL: " + fail['url'])
+            logger.error("  Error: " + fail['error'])
+
+    if shutdown.is_set():
+        sys.exit(128 + shutdown_signum)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""Change report between two fee datasets, without touching the fee table.
+
+Run from src/:  python -m fee_scraper.pipeline.diff OLD NEW [--report diff_report.csv] [--chunk-rows 50000]
+
+OLD and NEW are each "db" (pa_wc_scheduleb_fees in DATABASE_URL), a CSV
+export with the FEE_COLUMNS header, a columnar cache file (.fcol), a
+PDF, or a directory of such files taken in name order.
+main.py --dry-run runs the same diff of the fee table against a fresh
+extraction.
+"""
+import argparse
+import csv
+import heapq
+import json
+import logging
+import marshal
+import os
+import struct
+import tempfile
+import time
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from fee_scraper.database.fee_row import FeeRow, FEE_COLUMNS, format_amount
+from fee_scraper.database.row_hash import CONTENT_COLUMNS
+
+logger = logging.getLogger('fee_schedule_scraper')
+
+# Rows held in memory before a sorted run is spilled to a temporary file
+DEFAULT_SORT_CHUNK_ROWS = 50000
+SPILL_BLOCK_ROWS = 2000
+
+# The fee table in sort_key order; "C" compares like Python strings
+DB_SORTED_SELECT = """
+    SELECT "cpt/hcpc_code", modifier, medicare_location,
+           global_surgery_indicator, multiple_surgery_indicator,
+           prevailing_charge_amount, fee_schedule_amount, site_of_service_amount
+    FROM pa_wc_scheduleb_fees
+    ORDER BY COALESCE("cpt/hcpc_code", '') COLLATE "C", COALESCE(modifier, '') COLLATE "C",
+             COALESCE(medicare_location, '') COLLATE "C"
+"""
+
+REPORT_COLUMNS = ['status', 'cpt/hcpc_code', 'modifier', 'medicare_location', 'field', 'old', 'new', 'delta']
+
+SortKey = str
+
+def sort_key(row: FeeRow) -> SortKey:
+    """Natural key as the unique index compares it: NULL and '' are the same.
+
+    The fields are joined with NUL, which text columns cannot contain, so
+    the string orders like the (code, modifier, location) tuple and sorts
+    about three times faster.
+    """
+    return '\0'.join((row[0] or '', row[1] or '', row[2] or ''))
+
+def _content(row: FeeRow) -> Tuple:
+    # row_hash treats NULL and '' alike; so does the diff
+    return tuple('' if value is None else value for value in row[3:])
+
+class RowChange(NamedTuple):
+    """An added, removed or changed row; fields maps changed columns to (old, new)"""
+    status: str
+    old: Optional[FeeRow]
+    new: Optional[FeeRow]
+    fields: Dict[str, Tuple[Any, Any]]
+
+Item = Tuple[SortKey, int, FeeRow]
+
+def _spill(items: List[Item], tmp_dir: Optional[str]):
+    # Length-prefixed marshal blocks of plain tuples: much faster to read back than pickled FeeRows
+    spill = tempfile.TemporaryFile(dir=tmp_dir)
+    for start in range(0, len(items), SPILL_BLOCK_ROWS):
+        block = marshal.dumps([(key, source, tuple(row)) for key, source, row in items[start:start + SPILL_BLOCK_ROWS]])
+        spill.write(struct.pack('<I', len(block)))
+        spill.write(block)
+    spill.seek(0)
+    return spill
+
+def _read_spill(spill) -> Iterator[Item]:
+    make = FeeRow._make
+    try:
+        while True:
+            header = spill.read(4)
+            if not header:
+                return
+            (length,) = struct.unpack('<I', header)
+            for key, source, row in marshal.loads(spill.read(length)):
+                yield key, source, make(row)
+    finally:
+        spill.close()
+
+def external_sort(items: Iterable[Item], key, chunk_rows: int = DEFAULT_SORT_CHUNK_ROWS,
+                  tmp_dir: Optional[str] = None) -> Iterator[Item]:
+    """Sort (sort_key, int, FeeRow) items by key holding at most chunk_rows in memory.
+
+    Each full chunk is sorted and spilled to a temporary file, and the
+    runs are streamed back through heapq.merge. Stable: items with equal
+    keys keep their input order. Input that fits in one chunk is sorted
+    in memory without touching disk.
+    """
+    spills = []
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_rows:
+            chunk.sort(key=key)
+            spills.append(_spill(chunk, tmp_dir))
+            chunk = []
+    chunk.sort(key=key)
+    if not spills:
+        return iter(chunk)
+    logger.info(f"External sort: {len(spills)} runs of {chunk_rows} rows spilled to disk")
+    if chunk:
+        spills.append(_spill(chunk, tmp_dir))
+    del chunk
+    return heapq.merge(*map(_read_spill, spills), key=key)
+
+# (sort_key, -source number, row): later sources first among equal keys
+_loaded_key = itemgetter(0, 1)
+
+def sorted_rows(sources: Iterable[Iterable[List[FeeRow]]], chunk_rows: int = DEFAULT_SORT_CHUNK_ROWS,
+                tmp_dir: Optional[str] = None) -> Iterator[FeeRow]:
+    """The rows a load of sources would leave in the table, in sort_key order.
+
+    sources are the row batches of each PDF in load order. As in the
+    writer, the first row for a key within a PDF wins, and a later PDF
+    overwrites the rows of earlier ones. Every source is read and sorted
+    before this returns.
+    """
+    tagged = ((sort_key(row), -source_num, row) for source_num, batches in enumerate(sources)
+              for batch in batches for row in batch)
+    return _first_per_key(external_sort(tagged, _loaded_key, chunk_rows, tmp_dir))
+
+def _first_per_key(items: Iterator[Tuple[SortKey, int, FeeRow]]) -> Iterator[FeeRow]:
+    previous = None
+    for key, _, row in items:
+        if key != previous:
+            previous = key
+            yield row
+
+def merge_diff(old: Iterable[FeeRow], new: Iterable[FeeRow],
+               counts: Optional[Counter] = None) -> Iterator[RowChange]:
+    """Merge-join two key-sorted row streams, yielding what changed.
+
+    Both inputs must be sorted by sort_key with one row per key
+    (sorted_rows, or DB_SORTED_SELECT). Runs in one pass over each.
+    counts, if given, is updated with added/removed/changed/unchanged.
+    """
+    counts = Counter() if counts is None else counts
+    old, new = iter(old), iter(new)
+    old_row, new_row = next(old, None), next(new, None)
+    old_key = None if old_row is None else sort_key(old_row)
+    new_key = None if new_row is None else sort_key(new_row)
+    while old_row is not None and new_row is not None:
+        if old_key < new_key:
+            counts['removed'] += 1
+            yield RowChange('removed', old_row, None, {})
+            old_row = next(old, None)
+            old_key = None if old_row is None else sort_key(old_row)
+            continue
+        if new_key < old_key:
+            counts['added'] += 1
+            yield RowChange('added', None, new_row, {})
+        elif old_row[3:] == new_row[3:] or _content(old_row) == _content(new_row):
+            counts['unchanged'] += 1
+        else:
+            fields = {
+                col: (old_row[index], new_row[index])
+                for col, old_value, new_value, index in zip(
+                    CONTENT_COLUMNS, _content(old_row), _content(new_row), range(3, len(FEE_COLUMNS)))
+                if old_value != new_value
+            }
+            counts['changed'] += 1
+            yield RowChange('changed', old_row, new_row, fields)
+        if new_key == old_key:
+            old_row = next(old, None)
+            old_key = None if old_row is None else sort_key(old_row)
+        new_row = next(new, None)
+        new_key = None if new_row is None else sort_key(new_row)
+    if old_row is not None:
+        for row in chain((old_row,), old):
+            counts['removed'] += 1
+            yield RowChange('removed', row, None, {})
+    if new_row is not None:
+        for row in chain((new_row,), new):
+            counts['added'] += 1
+            yield RowChange('added', None, row, {})
+
+def amount_delta(old: Any, new: Any) -> Optional[str]:
+    """new - old as signed dollars when both are amounts in cents"""
+    if old.__class__ is not int or new.__class__ is not int:
+        return None
+    delta = new - old
+    return ('-' if delta < 0 else '+') + format_amount(abs(delta))
+
+def report_lines(change: RowChange) -> Iterator[List[Any]]:
+    """CSV lines of a change: one per changed field, or per filled field of an added or removed row"""
+    row = change.new if change.old is None else change.old
+    key = [row[0], row[1], row[2]]
+    if change.status == 'changed':
+        for col, (old, new) in change.fields.items():
+            yield [change.status] + key + [col, format_amount(old), format_amount(new), amount_delta(old, new)]
+        return
+    for col, value in zip(CONTENT_COLUMNS, row[3:]):
+        if value is None:
+            continue
+        values = [format_amount(value), None] if change.status == 'removed' else [None, format_amount(value)]
+        yield [change.status] + key + [col] + values + [None]
+
+class DiffReport:
+    """Streams merge_diff's changes to a CSV and summarises them.
+
+    The CSV has REPORT_COLUMNS, one line per changed field. write()
+    returns the summary, which is also saved next to the CSV as JSON.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.summary_path = os.path.splitext(path)[0] + '.json'
+        self.counts: Counter = Counter()
+        self.field_changes: Counter = Counter()
+
+    def write(self, old: Iterable[FeeRow], new: Iterable[FeeRow], **info) -> Dict[str, Any]:
+        start = time.perf_counter()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(REPORT_COLUMNS)
+            for change in merge_diff(old, new, self.counts):
+                self.field_changes.update(change.fields.keys())
+                writer.writerows(report_lines(change))
+        summary = {
+            'added': self.counts['added'],
+            'removed': self.counts['removed'],
+            'changed': self.counts['changed'],
+            'unchanged': self.counts['unchanged'],
+            'changed_fields': dict(self.field_changes.most_common()),
+            'merge_seconds': round(time.perf_counter() - start, 3),
+            'report': self.path,
+            **info,
+        }
+        with open(self.summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, default=str)
+        return summary
+
+    def log_summary(self, summary: Dict[str, Any]):
+        logger.info(f"Diff: {summary['added']} added, {summary['removed']} removed, "
+                    f"{summary['changed']} changed, {summary['unchanged']} unchanged")
+        for col, count in summary['changed_fields'].items():
+            logger.info(f"  {col}: {count} changed")
+        logger.info(f"Change report written to {self.path} (summary: {self.summary_path})")
+
+def db_rows(conn, itersize: int = 50000) -> Iterator[FeeRow]:
+    """The fee table in sort_key order, read in a READ ONLY transaction"""
+    with conn.cursor() as cur:
+        cur.execute("SET TRANSACTION READ ONLY")
+    try:
+        with conn.cursor(name='fee_diff_export') as cur:
+            cur.itersize = itersize
+            cur.execute(DB_SORTED_SELECT)
+            for values in cur:
+                yield FeeRow.from_text(*values)
+    finally:
+        conn.rollback()
+
+def csv_batches(path: str, chunk_rows: int = 50000) -> Iterator[List[FeeRow]]:
+    """Rows of a CSV export with a FEE_COLUMNS header (e.g. \\copy ... TO ... CSV HEADER)"""
+    with open(path, newline='', encoding='utf-8') as f:
+        batch = []
+        for record in csv.DictReader(f):
+            batch.append(FeeRow.from_text(*((record.get(col) or None) for col in FEE_COLUMNS)))
+            if len(batch) >= chunk_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+def columnar_batches(path: str, chunk_rows: int = 50000) -> Iterator[List[FeeRow]]:
+    from fee_scraper.scraper.columnar_cache import ColumnarFile
+    with ColumnarFile(path) as columnar:
+        yield from columnar.iter_batches(chunk_rows)
+
+def pdf_batches(path: str, extractor: Optional[str] = None) -> Iterator[List[FeeRow]]:
+    from fee_scraper.scraper.extract_pdfs import iter_pdf_rows
+    with open(path, 'rb') as f:
+        yield from iter_pdf_rows(f, extractor=extractor)
+
+def path_sources(path: str, extractor: Optional[str] = None) -> List[Iterable[List[FeeRow]]]:
+    """One source of row batches per file behind a CSV, .fcol or .pdf path or directory"""
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.endswith(('.fcol', '.pdf', '.csv')))
+        return list(chain.from_iterable(path_sources(os.path.join(path, name), extractor) for name in names))
+    if path.endswith('.csv'):
+        return [csv_batches(path)]
+    if path.endswith('.fcol'):
+        return [columnar_batches(path)]
+    if path.endswith('.pdf'):
+        return [pdf_batches(path, extractor)]
+    raise ValueError(f"Not a CSV, columnar file, PDF or directory: {path}")
+
+def dataset_rows(spec: str, conn=None, chunk_rows: int = DEFAULT_SORT_CHUNK_ROWS,
+                 extractor: Optional[str] = None) -> Iterator[FeeRow]:
+    """Sorted rows of "db" or a path_sources path"""
+    if spec == 'db':
+        return db_rows(conn)
+    return sorted_rows(path_sources(spec, extractor), chunk_rows)
+
+def diff_datasets(old: str, new: str, report_path: str, chunk_rows: int = DEFAULT_SORT_CHUNK_ROWS,
+                  extractor: Optional[str] = None, conn=None) -> Dict[str, Any]:
+    # The new side is sorted first, so a db side's transaction only spans the merge
+    new_rows = dataset_rows(new, conn, chunk_rows, extractor)
+    old_rows = dataset_rows(old, conn, chunk_rows, extractor)
+    report = DiffReport(report_path)
+    summary = report.write(old_rows, new_rows, old_dataset=old, new_dataset=new)
+    report.log_summary(summary)
+    return summary
+
+def run(old: str, new: str, report_path: str, chunk_rows: int, extractor: Optional[str] = None):
+    if 'db' not in (old, new):
+        return diff_datasets(old, new, report_path, chunk_rows, extractor)
+    from fee_scraper.database.db_connector import init_db, close_db, get_db_connection
+    init_db()
+    try:
+        with get_db_connection() as conn:
+            return diff_datasets(old, new, report_path, chunk_rows, extractor, conn)
+    finally:
+        close_db()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("old", help='"db", a CSV export, a .fcol or .pdf file, or a directory of them')
+    parser.add_argument("new", help="Same forms as old")
+    parser.add_argument("--report", default="diff_report.csv", help="CSV change report; the summary goes next to it as .json")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_SORT_CHUNK_ROWS,
+                        help="Rows sorted in memory before spilling a run to disk")
+    parser.add_argument("--extractor", default=None, help="PDF extraction backend for .pdf inputs")
+    args = parser.parse_args()
+    run(args.old, args.new, args.report, args.chunk_rows, args.extractor)
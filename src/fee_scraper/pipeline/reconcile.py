@@ -0,0 +1,82 @@
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple, Optional, Set
+
+from fee_scraper.database.fee_row import FeeRow
+
+Key = Tuple[Optional[str], Optional[str], Optional[str]]
+
+# Later statuses win when the fee table holds the same key more than once
+STATUS_PRIORITY = {'new': 0, 'duplicate': 1, 'changed': 2}
+
+def row_key(row: FeeRow) -> Key:
+    """Natural key of a fee row: (cpt/hcpc_code, modifier, medicare_location)"""
+    return row[:3]
+
+@dataclass
+class Reconciliation:
+    """Rows of one PDF classified against the fee table.
+
+    records keeps (status, row) pairs in CLASSIFY_STATEMENT result order, one per
+    distinct key. duplicate_keys maps keys that appear more than once in
+    the PDF to their occurrence count; only the first occurrence is kept.
+    """
+    records: List[Tuple[str, FeeRow]] = field(default_factory=list)
+    new: List[FeeRow] = field(default_factory=list)
+    changed: List[FeeRow] = field(default_factory=list)
+    duplicates: List[FeeRow] = field(default_factory=list)
+    duplicate_keys: Dict[Key, int] = field(default_factory=dict)
+    unmatched: List[Key] = field(default_factory=list)
+
+def index_rows(tables: List[FeeRow],
+               seen_keys: Optional[Set[Key]] = None) -> Tuple[Dict[Key, FeeRow], Dict[Key, int]]:
+    """Index rows by natural key, keeping the first row for each key.
+
+    Returns the index and a map of repeated keys to their occurrence count.
+    When seen_keys is given (keys from earlier chunks of the same PDF),
+    rows with those keys are treated as repeats and seen_keys is updated.
+    """
+    index = {}
+    duplicate_keys = {}
+    for row in tables:
+        key = row_key(row)
+        if key in index or (seen_keys is not None and key in seen_keys):
+            duplicate_keys[key] = duplicate_keys.get(key, 1) + 1
+        else:
+            index[key] = row
+    if seen_keys is not None:
+        seen_keys.update(index)
+    return index, duplicate_keys
+
+def reconcile(tables: List[FeeRow], results,
+              seen_keys: Optional[Set[Key]] = None) -> Reconciliation:
+    """Match CLASSIFY_STATEMENT results back to their source rows in one pass.
+
+    results is an iterable of (cpt/hcpc_code, modifier, medicare_location,
+    status) tuples, where status is 'new', 'changed' or 'duplicate'.
+    seen_keys carries keys across the chunks of one PDF; see index_rows.
+    """
+    index, duplicate_keys = index_rows(tables, seen_keys)
+    reconciliation = Reconciliation(duplicate_keys=duplicate_keys)
+
+    statuses = {}
+    for cpt_code, modifier, location, status in results:
+        key = (cpt_code, modifier, location)
+        if key not in index:
+            if key not in duplicate_keys:
+                reconciliation.unmatched.append(key)
+            continue
+        previous = statuses.get(key)
+        if previous is None or STATUS_PRIORITY[status] > STATUS_PRIORITY[previous]:
+            statuses[key] = status
+
+    buckets = {
+        'new': reconciliation.new,
+        'changed': reconciliation.changed,
+        'duplicate': reconciliation.duplicates,
+    }
+    for key, status in statuses.items():
+        row = index[key]
+        reconciliation.records.append((status, row))
+        buckets[status].append(row)
+
+    return reconciliation
@@ -0,0 +1,111 @@
+import logging
+from typing import List, Optional, Set
+
+logger = logging.getLogger('fee_schedule_scraper')
+
+# PDF statuses that need no further work in a resumed run
+DONE_STATUSES = ('committed', 'unchanged')
+
+# Session advisory lock on (RUN_LOCK, run id), held by the process running it
+RUN_LOCK = "hashtext('scrape_runs')"
+
+class RunState:
+    """Per-run progress in scrape_runs / scrape_run_pdfs (migrations 0003, 0004).
+
+    Every PDF of a run has a row holding its status, content hash, row
+    count and commit time. A committed PDF is marked inside the same
+    transaction as its fee rows, so after a crash or restart the table
+    never claims work that was rolled back. The process running a run
+    holds a session advisory lock on it until finish(), which the server
+    drops if the process dies. With resume, start() picks up the newest
+    run that did not complete and that no live process holds, skipping
+    its done PDFs; queued runs belong to WorkQueue and are never resumed.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.run_id: Optional[int] = None
+        self.done: Set[str] = set()
+        self.resumed = False
+
+    def start(self, urls: List[str], resume: bool = False) -> 'RunState':
+        with self.conn.cursor() as cur:
+            if resume:
+                cur.execute("""
+                    SELECT id FROM scrape_runs
+                    WHERE NOT queued AND status <> 'completed'
+                    ORDER BY id DESC
+                """)
+                for (run_id,) in cur.fetchall():
+                    # Interrupted, or left running by a process that died
+                    if self._lock(cur, run_id):
+                        self.run_id = run_id
+                        self.resumed = True
+                        break
+                if self.resumed:
+                    cur.execute("""
+                        SELECT url FROM scrape_run_pdfs
+                        WHERE run_id = %s AND status = ANY(%s)
+                    """, (self.run_id, list(DONE_STATUSES)))
+                    self.done = {url for (url,) in cur.fetchall()}
+                    cur.execute(
+                        "UPDATE scrape_runs SET status = 'running', pdf_count = %s WHERE id = %s",
+                        (len(urls), self.run_id)
+                    )
+            if self.run_id is None:
+                cur.execute(
+                    "INSERT INTO scrape_runs (pdf_count) VALUES (%s) RETURNING id",
+                    (len(urls),)
+                )
+                self.run_id = cur.fetchone()[0]
+                self._lock(cur, self.run_id)
+            cur.executemany("""
+                INSERT INTO scrape_run_pdfs (run_id, pdf_num, url)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (run_id, url) DO NOTHING
+            """, [(self.run_id, pdf_num, url) for pdf_num, url in enumerate(urls, 1)])
+        self.conn.commit()
+        return self
+
+    def _lock(self, cur, run_id: int) -> bool:
+        cur.execute(f"SELECT pg_try_advisory_lock({RUN_LOCK}, %s)", (run_id,))
+        return cur.fetchone()[0]
+
+    def pending(self, urls: List[str]) -> List[str]:
+        """urls without the ones this run already finished"""
+        return [url for url in urls if url not in self.done]
+
+    def mark(self, cur, url: str, status: str, sha256: Optional[str] = None,
+             rows: Optional[int] = None, error: Optional[str] = None) -> bool:
+        """Record a PDF's outcome on cur; the caller owns the transaction.
+
+        Returns False if the PDF is no longer this run state's to record,
+        in which case the caller must roll its writes back.
+        """
+        cur.execute("""
+            UPDATE scrape_run_pdfs
+            SET status = %s, sha256 = %s, rows = %s, error = %s, committed_at = now()
+            WHERE run_id = %s AND url = %s
+        """, (status, sha256, rows, error, self.run_id, url))
+        if status in DONE_STATUSES:
+            self.done.add(url)
+        return cur.rowcount > 0
+
+    def record_failure(self, url: str, error: str):
+        """Mark url failed in its own transaction, after the PDF was rolled back"""
+        try:
+            with self.conn.cursor() as cur:
+                self.mark(cur, url, 'failed', error=error)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Could not record failure of {url} in run state: {e}")
+
+    def finish(self, status: str = 'completed'):
+        """Close the run as completed, or interrupted so --resume can continue it"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE scrape_runs SET status = %s, finished_at = now() WHERE id = %s
+            """, (status, self.run_id))
+            cur.execute(f"SELECT pg_advisory_unlock({RUN_LOCK}, %s)", (self.run_id,))
+        self.conn.commit()
@@ -0,0 +1,102 @@
+import sys
+from typing import List, Dict, Optional, Set
+
+from fee_scraper.database.fee_row import FeeRow
+from fee_scraper.database.row_hash import row_hash, row_hash_sql
+from fee_scraper.pipeline.reconcile import Reconciliation, Key, row_key
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+class SnapshotIndex:
+    """In-memory index of pa_wc_scheduleb_fees for client-side diffing.
+
+    Maps (cpt/hcpc_code, modifier, medicare_location) to the row's
+    row_hash, read straight from the table. Rows written for a PDF are staged and only folded into the index by
+    commit(), after the database transaction succeeds, so later PDFs see
+    earlier writes and a rolled-back PDF leaves the index untouched.
+    """
+
+    def __init__(self):
+        self.digests: Dict[Key, bytes] = {}
+        self._pending: List[FeeRow] = []
+
+    def __len__(self):
+        return len(self.digests)
+
+    def load(self, conn, itersize: int = 50000):
+        """Stream the fee table into the index with a server-side cursor"""
+        with conn.cursor(name='fee_snapshot') as cur:
+            cur.itersize = itersize
+            cur.execute(f"""
+                SELECT e."cpt/hcpc_code", e.modifier, e.medicare_location,
+                       COALESCE(e.row_hash, {row_hash_sql('e')})
+                FROM pa_wc_scheduleb_fees e
+            """)
+            for code, modifier, location, digest in cur:
+                key = (_intern(code), _intern(modifier), _intern(location))
+                self.digests[key] = bytes(digest)
+        conn.rollback()
+        return self
+
+    def classify(self, tables: List[FeeRow],
+                 seen_keys: Optional[Set[Key]] = None) -> Reconciliation:
+        """Classify a batch into new, changed and duplicate rows locally.
+
+        Keys repeated within the batch, or already in seen_keys from an
+        earlier batch of the same PDF, keep their first row only.
+        """
+        reconciliation = Reconciliation()
+        if seen_keys is None:
+            seen_keys = set()
+        buckets = {
+            'new': reconciliation.new,
+            'changed': reconciliation.changed,
+            'duplicate': reconciliation.duplicates,
+        }
+        for row in tables:
+            key = row_key(row)
+            if key in seen_keys:
+                duplicate_keys = reconciliation.duplicate_keys
+                duplicate_keys[key] = duplicate_keys.get(key, 1) + 1
+                continue
+            seen_keys.add(key)
+
+            existing = self.digests.get(key)
+            if existing is None:
+                status = 'new'
+            elif existing != row_hash(row):
+                status = 'changed'
+            else:
+                status = 'duplicate'
+            reconciliation.records.append((status, row))
+            buckets[status].append(row)
+        return reconciliation
+
+    def stage(self, rows: List[FeeRow]):
+        """Queue inserted or updated rows until the transaction commits"""
+        self._pending.extend(rows)
+
+    def commit(self):
+        for row in self._pending:
+            key = row_key(row)
+            self.digests[(_intern(key[0]), _intern(key[1]), _intern(key[2]))] = row_hash(row)
+        self._pending = []
+
+    def rollback(self):
+        self._pending = []
+
+    def memory_bytes(self) -> int:
+        """Approximate footprint of the index: dict, key tuples and digests.
+
+        Interned strings are shared across keys and counted once.
+        """
+        total = sys.getsizeof(self.digests)
+        strings = {}
+        for key, digest in self.digests.items():
+            total += sys.getsizeof(key) + sys.getsizeof(digest)
+            for value in key:
+                if value is not None:
+                    strings[id(value)] = value
+        total += sum(sys.getsizeof(value) for value in strings.values())
+        return total
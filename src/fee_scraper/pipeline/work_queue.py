@@ -0,0 +1,285 @@
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fee_scraper.database.db_connector import get_db_connection
+from fee_scraper.pipeline.run_state import RunState, DONE_STATUSES
+
+logger = logging.getLogger('fee_schedule_scraper')
+
+class WorkQueue(RunState):
+    """A run shared by several scraper processes (migrations 0003, 0004).
+
+    The queue is the run's scrape_run_pdfs rows. start() joins the newest
+    queued run still running, or creates one, and adds the URLs this
+    worker found. claims() hands out one pending PDF at a time with
+    FOR UPDATE SKIP LOCKED, so workers never wait on each other's claims,
+    while a heartbeat thread on its own connection keeps this worker's
+    claim fresh. A claim whose heartbeat is older than stale_after is
+    taken over by another worker; a PDF that failed or lost its claim
+    max_attempts times stays failed. A PDF's outcome is only recorded
+    while this worker still holds the claim it took (same worker and
+    attempt), so a worker whose claim was taken over cannot commit the
+    PDF as well. The worker that finds nothing left to claim or in
+    progress completes the run.
+    """
+
+    def __init__(self, conn, worker_id: Optional[str] = None, stale_after: float = 60.0,
+                 heartbeat_interval: Optional[float] = None, max_attempts: int = 3,
+                 poll_interval: float = 1.0):
+        super().__init__(conn)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.stale_after = stale_after
+        self.heartbeat_interval = heartbeat_interval or stale_after / 4
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.claimed = 0
+        # url -> attempts of each claim this worker holds
+        self._claims: Dict[str, int] = {}
+        self._beat_stop = threading.Event()
+        self._beat: Optional[threading.Thread] = None
+
+    def start(self, urls: List[str], resume: bool = False) -> 'WorkQueue':
+        """Join (or create) the shared run; resume is implied"""
+        with self.conn.cursor() as cur:
+            # Serializes workers starting together so they create one run
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('scrape_runs_queued'))")
+            cur.execute("""
+                SELECT id FROM scrape_runs
+                WHERE queued AND status = 'running'
+                ORDER BY id DESC LIMIT 1
+            """)
+            row = cur.fetchone()
+            if row:
+                self.run_id = row[0]
+                self.resumed = True
+            else:
+                cur.execute(
+                    "INSERT INTO scrape_runs (pdf_count, queued) VALUES (%s, true) RETURNING id",
+                    (len(urls),)
+                )
+                self.run_id = cur.fetchone()[0]
+            cur.executemany("""
+                INSERT INTO scrape_run_pdfs (run_id, pdf_num, url)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (run_id, url) DO NOTHING
+            """, [(self.run_id, pdf_num, url) for pdf_num, url in enumerate(urls, 1)])
+            cur.execute("""
+                UPDATE scrape_runs
+                SET pdf_count = (SELECT count(*) FROM scrape_run_pdfs WHERE run_id = %s)
+                WHERE id = %s
+            """, (self.run_id, self.run_id))
+        self.conn.commit()
+        return self
+
+    def claim(self) -> Optional[Tuple[int, str]]:
+        """Claim the next pending or stale PDF; (pdf_num, url), or None if there is none"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                WITH expired AS (
+                    SELECT url FROM scrape_run_pdfs
+                    WHERE run_id = %(run_id)s AND status = 'claimed' AND attempts >= %(max_attempts)s
+                    AND heartbeat_at < now() - %(stale_after)s * interval '1 second'
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE scrape_run_pdfs q
+                SET status = 'failed', error = 'Claim expired after ' || q.attempts || ' attempts',
+                    committed_at = now()
+                FROM expired
+                WHERE q.run_id = %(run_id)s AND q.url = expired.url
+                RETURNING q.url, q.worker
+            """, self._params())
+            for url, worker in cur.fetchall():
+                logger.error(f"Giving up on {url}: claim by {worker} expired after {self.max_attempts} attempts")
+            cur.execute("""
+                WITH next AS (
+                    SELECT url, status, worker FROM scrape_run_pdfs
+                    WHERE run_id = %(run_id)s
+                    AND (status = 'pending' OR (
+                        status = 'claimed'
+                        AND heartbeat_at < now() - %(stale_after)s * interval '1 second'
+                    ))
+                    ORDER BY pdf_num
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE scrape_run_pdfs q
+                SET status = 'claimed', worker = %(worker)s, attempts = q.attempts + 1,
+                    claimed_at = now(), heartbeat_at = now()
+                FROM next
+                WHERE q.run_id = %(run_id)s AND q.url = next.url
+                RETURNING q.pdf_num, q.url, q.attempts, next.status, next.worker
+            """, self._params())
+            row = cur.fetchone()
+        self.conn.commit()
+        if row is None:
+            return None
+        pdf_num, url, attempts, previous_status, previous_worker = row
+        self._claims[url] = attempts
+        if previous_status == 'claimed':
+            logger.warning(f"Took over stale claim on {url} from {previous_worker}")
+        self.claimed += 1
+        return pdf_num, url
+
+    def in_progress(self) -> int:
+        """PDFs other workers still hold live claims on"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT count(*) FROM scrape_run_pdfs
+                WHERE run_id = %s AND status = 'claimed' AND worker <> %s
+            """, (self.run_id, self.worker_id))
+            count = cur.fetchone()[0]
+        self.conn.commit()
+        return count
+
+    def claims(self, stop: Optional[threading.Event] = None) -> Iterator[Tuple[int, str]]:
+        """Yield claimed (pdf_num, url) until the run is drained or stop is set.
+
+        The caller writes each PDF, which marks it done or failed. While
+        other workers hold claims this worker waits, so it can take over
+        any of them that go stale. Closing the iterator early releases
+        a claim that was not written.
+        """
+        self._start_heartbeat()
+        try:
+            while stop is None or not stop.is_set():
+                claim = self.claim()
+                if claim is not None:
+                    yield claim
+                    continue
+                if not self.in_progress():
+                    break
+                if stop is not None:
+                    stop.wait(self.poll_interval)
+                else:
+                    time.sleep(self.poll_interval)
+        finally:
+            self._stop_heartbeat()
+            self.release()
+
+    def release(self):
+        """Put PDFs this worker claimed but did not finish back in the queue"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE scrape_run_pdfs
+                    SET status = 'pending', attempts = attempts - 1, worker = NULL
+                    WHERE run_id = %s AND status = 'claimed' AND worker = %s
+                """, (self.run_id, self.worker_id))
+            self.conn.commit()
+            self._claims.clear()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Could not release claims of {self.worker_id}: {e}")
+
+    def mark(self, cur, url: str, status: str, sha256: Optional[str] = None,
+             rows: Optional[int] = None, error: Optional[str] = None) -> bool:
+        """Record a PDF's outcome on cur if this worker still holds its claim"""
+        cur.execute("""
+            UPDATE scrape_run_pdfs
+            SET status = %s, sha256 = %s, rows = %s, error = %s, committed_at = now()
+            WHERE run_id = %s AND url = %s
+            AND status = 'claimed' AND worker = %s AND attempts = %s
+        """, (status, sha256, rows, error, self.run_id, url, self.worker_id, self._claims.get(url)))
+        if cur.rowcount == 0:
+            logger.warning(f"Claim on {url} was taken over by another worker; not recording it as {status}")
+            return False
+        self._claims.pop(url, None)
+        if status in DONE_STATUSES:
+            self.done.add(url)
+        return True
+
+    def record_failure(self, url: str, error: str):
+        """Queue url for another attempt, or mark it failed after max_attempts"""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE scrape_run_pdfs
+                    SET status = CASE WHEN attempts < %s THEN 'pending' ELSE 'failed' END,
+                        error = %s, committed_at = now()
+                    WHERE run_id = %s AND url = %s
+                    AND status = 'claimed' AND worker = %s AND attempts = %s
+                """, (self.max_attempts, error, self.run_id, url, self.worker_id, self._claims.pop(url, None)))
+                recorded = cur.rowcount
+            self.conn.commit()
+            if not recorded:
+                logger.warning(f"Claim on {url} was taken over by another worker; not recording its failure")
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Could not record failure of {url} in run state: {e}")
+
+    def finish(self, status: str = 'completed'):
+        """Complete the run once no PDF is left pending or claimed.
+
+        An interrupted worker leaves the run open: other workers, or any
+        worker started later, carry on with it.
+        """
+        if status != 'completed':
+            return
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE scrape_runs SET status = 'completed', finished_at = now()
+                WHERE id = %s AND status = 'running' AND NOT EXISTS (
+                    SELECT 1 FROM scrape_run_pdfs
+                    WHERE run_id = %s AND status IN ('pending', 'claimed')
+                )
+            """, (self.run_id, self.run_id))
+            completed = cur.rowcount
+        self.conn.commit()
+        if completed:
+            logger.info(f"Queued run {self.run_id} completed")
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """PDF counts by worker and status for the run"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT COALESCE(worker, ''), status, count(*) FROM scrape_run_pdfs
+                WHERE run_id = %s GROUP BY 1, 2 ORDER BY 1, 2
+            """, (self.run_id,))
+            rows = cur.fetchall()
+        self.conn.commit()
+        summary: Dict[str, Dict[str, int]] = {}
+        for worker, status, count in rows:
+            summary.setdefault(worker, {})[status] = count
+        return summary
+
+    def _params(self) -> dict:
+        return {
+            'run_id': self.run_id,
+            'worker': self.worker_id,
+            'stale_after': self.stale_after,
+            'max_attempts': self.max_attempts,
+        }
+
+    def _start_heartbeat(self):
+        self._beat_stop.clear()
+        self._beat = threading.Thread(target=self._heartbeat, name='queue-heartbeat', daemon=True)
+        self._beat.start()
+
+    def _stop_heartbeat(self):
+        self._beat_stop.set()
+        if self._beat is not None:
+            self._beat.join()
+            self._beat = None
+
+    def _heartbeat(self):
+        """Refresh this worker's claims until stopped, on a separate pooled connection
+
+        The writer's connection is inside the PDF's transaction, where an
+        update would stay invisible until the PDF commits.
+        """
+        with get_db_connection() as conn:
+            while not self._beat_stop.wait(self.heartbeat_interval):
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute("""
+                            UPDATE scrape_run_pdfs SET heartbeat_at = now()
+                            WHERE run_id = %s AND status = 'claimed' AND worker = %s
+                        """, (self.run_id, self.worker_id))
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"Heartbeat for {self.worker_id} failed: {e}")
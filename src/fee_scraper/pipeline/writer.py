@@ -0,0 +1,359 @@
+import logging
+import time
+from typing import List, Dict, Optional
+
+from fee_scraper.database.db_connector import (
+    stage_rows, apply_staged_rows, upsert_fee_rows, fee_rows_json, has_natural_key_index,
+    FEE_ROWS_SOURCE, NATURAL_KEY_INDEX, PreparedStatement
+)
+from fee_scraper.pipeline.reconcile import reconcile, index_rows
+from fee_scraper.utils.logger import Progress, record_sample_rate
+from fee_scraper.utils.metrics import METRICS
+
+logger = logging.getLogger('fee_schedule_scraper')
+
+# Each PDF batch runs these with a new JSON array; prepared once per connection
+CLASSIFY_STATEMENT = PreparedStatement('fee_classify', f"""
+    WITH input_records AS (
+        {FEE_ROWS_SOURCE}
+    )
+    SELECT 
+        i."cpt/hcpc_code",
+        i.modifier,
+        i.medicare_location,
+        CASE 
+            WHEN e."cpt/hcpc_code" IS NULL THEN 'new'
+            WHEN e.row_hash IS DISTINCT FROM fee_row_hash(
+                i.global_surgery_indicator,
+                i.multiple_surgery_indicator,
+                i.prevailing_charge_amount,
+                i.fee_schedule_amount,
+                i.site_of_service_amount
+            ) THEN 'changed'
+            ELSE 'duplicate'
+        END as status
+    FROM input_records i
+    LEFT JOIN pa_wc_scheduleb_fees e ON 
+        e."cpt/hcpc_code" = i."cpt/hcpc_code"
+        AND (e.modifier IS NOT DISTINCT FROM i.modifier)
+        AND (e.medicare_location IS NOT DISTINCT FROM i.medicare_location);
+""")
+
+INSERT_STATEMENT = PreparedStatement('fee_insert', f"""
+    INSERT INTO pa_wc_scheduleb_fees (
+        "cpt/hcpc_code", modifier, medicare_location,
+        global_surgery_indicator, multiple_surgery_indicator,
+        prevailing_charge_amount, fee_schedule_amount,
+        site_of_service_amount
+    ) 
+    {FEE_ROWS_SOURCE};
+""")
+
+UPDATE_STATEMENT = PreparedStatement('fee_update', f"""
+    UPDATE pa_wc_scheduleb_fees e
+    SET 
+        global_surgery_indicator = x.global_surgery_indicator,
+        multiple_surgery_indicator = x.multiple_surgery_indicator,
+        prevailing_charge_amount = x.prevailing_charge_amount,
+        fee_schedule_amount = x.fee_schedule_amount,
+        site_of_service_amount = x.site_of_service_amount
+    FROM ({FEE_ROWS_SOURCE}) AS x
+    WHERE e."cpt/hcpc_code" = x."cpt/hcpc_code"
+    AND (e.modifier IS NOT DISTINCT FROM x.modifier)
+    AND e.medicare_location = x.medicare_location;
+""")
+
+def classify_records(cur, tables, seen_keys=None):
+    """Classify a batch against the fee table with one server-side LEFT JOIN"""
+    # Check all records at once
+    CLASSIFY_STATEMENT.execute(cur, (fee_rows_json(tables),))
+    results = cur.fetchall()
+    
+    # Match results back to their source rows by natural key
+    return reconcile(tables, results, seen_keys)
+
+def log_duplicate_keys(duplicate_keys):
+    if duplicate_keys:
+        logger.warning(f"{len(duplicate_keys)} keys appear more than once in PDF; keeping the first row for each")
+        for (cpt_code, modifier, location), count in duplicate_keys.items():
+            logger.warning(f"Duplicate key in PDF ({count} rows): CPT {cpt_code}, modifier {modifier}, location {location}")
+
+def log_classified_records(records, pdf_records):
+    """Log each classified row, or a 1-in-N sample at DEBUG outside 'records' verbosity"""
+    sample_rate = record_sample_rate()
+    if sample_rate == 1:
+        log, step = logger.info, 1
+    elif logger.isEnabledFor(logging.DEBUG):
+        log, step = logger.debug, sample_rate
+    else:
+        return
+    
+    for index in range(0, len(records), step):
+        record_num = index + 1
+        status, row = records[index]
+        log(f"Processing ({record_num}/{pdf_records}): {row}")
+        
+        if status == 'duplicate':
+            log(f"Skipping ({record_num}/{pdf_records}): Row already exists in database")
+        elif status == 'new':
+            log(f"INSERTED ({record_num}/{pdf_records}): New record added to database")
+        else:
+            log(f"UPDATE ({record_num}/{pdf_records}): Record will be updated")
+
+def upsert_pdf_records(cur, tables, seen_keys=None, snapshot=None):
+    """Write a batch with a single INSERT ... ON CONFLICT DO UPDATE statement.
+
+    Returns a (inserted, updated) tuple. The caller owns the transaction.
+    With a SnapshotIndex only rows it classifies as new or changed are sent.
+    """
+    if snapshot is not None:
+        with METRICS.timer('diff'):
+            reconciliation = snapshot.classify(tables, seen_keys)
+        duplicate_keys = reconciliation.duplicate_keys
+        rows = reconciliation.new + reconciliation.changed
+        snapshot.stage(rows)
+    else:
+        with METRICS.timer('validate'):
+            index, duplicate_keys = index_rows(tables, seen_keys)
+        rows = list(index.values())
+    log_duplicate_keys(duplicate_keys)
+    
+    with METRICS.timer('upsert'):
+        counts = upsert_fee_rows(cur, rows)
+    logger.info(
+        f"Upserted batch: {counts['inserted']} inserted, {counts['updated']} updated, "
+        f"{counts['unchanged']} unchanged"
+    )
+    return counts['inserted'], counts['updated']
+
+def process_pdf_records(cur, tables, seen_keys=None, snapshot=None):
+    """Classify a batch of a PDF's rows against the fee table and apply inserts and updates.
+
+    Returns a (inserted, updated) tuple. The caller owns the transaction.
+    seen_keys tracks keys across the batches of one PDF. With a
+    SnapshotIndex the batch is classified locally instead of by query.
+    """
+    pdf_records = len(tables)
+
+    with METRICS.timer('diff'):
+        if snapshot is not None:
+            reconciliation = snapshot.classify(tables, seen_keys)
+        else:
+            reconciliation = classify_records(cur, tables, seen_keys)
+    new_records = reconciliation.new
+    update_records = reconciliation.changed
+    
+    for cpt_code, modifier, location in reconciliation.unmatched:
+        logger.error(f"Could not find matching row for CPT {cpt_code}, modifier {modifier}, location {location}")
+    
+    log_duplicate_keys(reconciliation.duplicate_keys)
+    
+    log_classified_records(reconciliation.records, pdf_records)
+    
+    pdf_inserted = 0
+    pdf_updated = 0
+
+    if snapshot is not None:
+        snapshot.stage(new_records)
+        snapshot.stage(update_records)
+
+    # Batch insert new records
+    if new_records:
+        with METRICS.timer('insert'):
+            INSERT_STATEMENT.execute(cur, (fee_rows_json(new_records),))
+        pdf_inserted = len(new_records)
+        logger.info(f"\nBatch inserted {pdf_inserted} new records")
+    
+    # Batch update changed records
+    if update_records:
+        with METRICS.timer('update'):
+            UPDATE_STATEMENT.execute(cur, (fee_rows_json(update_records),))
+        pdf_updated = len(update_records)
+        logger.info(f"Batch updated {pdf_updated} changed records")
+
+    return pdf_inserted, pdf_updated
+
+class PdfWriter:
+    """Single database writer applying one PDF per transaction.
+
+    Owns the cursor on the pooled connection and the run's failure list.
+    Each PDF is diffed and upserted, then committed, or rolled back and
+    recorded in failed_pdfs. write_path selects the single-statement
+    upsert, the classify/insert/update JSON path, or the COPY
+    staging path; the first and last need the natural-key unique index
+    of migration 0002, and fall back to the JSON path without it.
+    snapshot enables client-side diffing. run_state, a
+    RunState, records each PDF's outcome in the same transaction,
+    page_cache keeps the per-page rows of committed PDFs, and
+    columnar_cache their full row set for main.py --from-cache.
+    """
+
+    def __init__(self, conn, total_pdfs: int, cache=None, write_path: str = "upsert", snapshot=None,
+                 run_state=None, page_cache=None, columnar_cache=None):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.total_pdfs = total_pdfs
+        self.cache = cache
+        if write_path in ("upsert", "copy") and not has_natural_key_index(conn):
+            logger.warning(f"Unique index {NATURAL_KEY_INDEX} not found (migration 0002 not applied): "
+                           f"using the json write path instead of {write_path}")
+            write_path = "json"
+        self.write_path = write_path
+        self.snapshot = snapshot
+        self.run_state = run_state
+        self.page_cache = page_cache
+        self.columnar_cache = columnar_cache
+        self.failed_pdfs: List[Dict[str, str]] = []
+        self.total_records = 0
+
+    def fail(self, url: str, error: str):
+        logger.error("Error processing PDF " + url + ": " + error)
+        METRICS.inc('pdfs_total', status='failed')
+        self.failed_pdfs.append({"url": url, "error": error})
+        if self.run_state is not None:
+            self.run_state.record_failure(url, error)
+
+    def handle(self, pdf_num: int, url: str, download, batches, page_state=None) -> Optional[int]:
+        """Write one extracted PDF, skipping it when the download is unchanged.
+
+        batches only holds rows of changed pages when page_state is given.
+        Its columnar writer is committed once the PDF is, else discarded.
+        Returns the number of records inserted, or None if the PDF failed.
+        """
+        columnar = page_state.columnar if page_state is not None else None
+        try:
+            if download is not None:
+                self.cache.record(download)
+                if download.unchanged:
+                    logger.info(f"Unchanged since last run, skipping: {url}")
+                    METRICS.inc('pdfs_total', status='unchanged')
+                    if self.run_state is not None:
+                        if not self.run_state.mark(self.cur, url, 'unchanged', download.sha256):
+                            self.rollback()
+                            return None
+                        self.conn.commit()
+                    self.cache.commit(download)
+                    return 0
+
+            sha256 = download.sha256 if download is not None else None
+            inserted = self.write(pdf_num, url, batches, sha256, page_state)
+            if inserted is None:
+                return None
+
+            if self.page_cache is not None and page_state is not None:
+                self.page_cache.save(url, page_state)
+            if columnar is not None and page_state.header is not None:
+                with METRICS.timer('columnar_save'):
+                    self.columnar_cache.commit(url, columnar)
+                columnar = None
+            if download is not None:
+                self.cache.commit(download)
+            return inserted
+        finally:
+            if columnar is not None:
+                columnar.discard()
+
+    def write(self, pdf_num: int, url: str, batches, sha256: Optional[str] = None,
+              page_state=None) -> Optional[int]:
+        """Diff and upsert one PDF's row batches as a single transaction.
+
+        batches is an iterable of row lists, consumed lazily so a streamed PDF
+        is never held in memory at once. With write_path "copy" the batches are
+        COPYed into a staging table and written set-based once the PDF is fully
+        staged. Returns the number of records inserted, or None if the PDF
+        failed and was rolled back. sha256 is the downloaded file's hash,
+        kept in the run state. A PDF is an error when neither its batches
+        nor the pages reused from page_state hold any rows.
+        """
+        conn, cur, snapshot = self.conn, self.cur, self.snapshot
+        try:
+            pdf_start_time = time.time()
+            pdf_records = 0
+            pdf_inserted = 0
+            pdf_updated = 0
+            seen_keys = set()
+            progress = Progress(logger, f"PDF {pdf_num}/{self.total_pdfs}")
+
+            for batch in batches:
+                pdf_records += len(batch)
+                METRICS.inc('rows_extracted_total', len(batch))
+                logger.info(f"\nFound {len(batch)} records in batch ({pdf_records} so far)")
+                if self.write_path == "copy":
+                    if snapshot is not None:
+                        with METRICS.timer('diff'):
+                            reconciliation = snapshot.classify(batch, seen_keys)
+                        batch = reconciliation.new + reconciliation.changed
+                        snapshot.stage(batch)
+                    with METRICS.timer('copy'):
+                        stage_rows(cur, batch)
+                    continue
+                if self.write_path == "upsert":
+                    inserted, updated = upsert_pdf_records(cur, batch, seen_keys, snapshot)
+                else:
+                    inserted, updated = process_pdf_records(cur, batch, seen_keys, snapshot)
+                pdf_inserted += inserted
+                pdf_updated += updated
+                progress.update(pdf_records, inserted=pdf_inserted, updated=pdf_updated)
+            
+            if self.write_path == "copy" and pdf_records:
+                with METRICS.timer('apply'):
+                    counts = apply_staged_rows(cur)
+                pdf_inserted = counts['inserted']
+                pdf_updated = counts['updated']
+                if counts['duplicate_keys']:
+                    logger.warning(f"{counts['duplicate_keys']} rows repeat a key already in this PDF; keeping the first row for each")
+                logger.info(f"Batch inserted {pdf_inserted} new records, updated {pdf_updated} changed records")
+            
+            logger.info(f"Raw tables extracted: {pdf_records} rows")
+            
+            reused_rows = page_state.reused_rows if page_state is not None else 0
+            if page_state is not None and page_state.reused:
+                logger.info(f"Pages: {page_state.parsed} re-extracted, {page_state.reused} unchanged since last run")
+            if not pdf_records and not reused_rows:
+                logger.error(f"No data found in PDF: {url}")
+                self.failed_pdfs.append({"url": url, "error": "No data found"})
+                METRICS.inc('pdfs_total', status='empty')
+                self.rollback()
+                if self.run_state is not None:
+                    self.run_state.record_failure(url, "No data found")
+                return None
+            
+            if self.run_state is not None and not self.run_state.mark(cur, url, 'committed', sha256, pdf_records):
+                # Another worker took the PDF over; its commit is the one that counts
+                self.rollback()
+                METRICS.inc('pdfs_total', status='lost_claim')
+                return None
+            with METRICS.timer('commit'):
+                conn.commit()
+            if snapshot is not None:
+                snapshot.commit()
+            self.total_records += pdf_inserted
+            METRICS.inc('pdfs_total', status='written')
+            METRICS.inc('rows_inserted_total', pdf_inserted)
+            METRICS.inc('rows_updated_total', pdf_updated)
+            
+            # PDF Summary
+            total_time = time.time() - pdf_start_time
+            logger.info(f"\n=== PDF {pdf_num}/{self.total_pdfs} Summary ===")
+            logger.info(f"File: {url}")
+            logger.info(f"Time: {total_time:.2f} seconds")
+            logger.info(f"Total Records: {pdf_records}")
+            logger.info(f"New Records: {pdf_inserted}")
+            logger.info(f"Updated Records: {pdf_updated}")
+            logger.info(f"Duplicates: {pdf_records - pdf_inserted - pdf_updated}")
+            logger.info("=" * 30 + "\n")
+            return pdf_inserted
+            
+        except Exception as e:
+            self.rollback()
+            self.fail(url, str(e))
+            return None
+        except BaseException:
+            # Interrupted mid-PDF: leave nothing half-written
+            self.rollback()
+            raise
+
+    def rollback(self):
+        self.conn.rollback()
+        if self.snapshot is not None:
+            self.snapshot.rollback()
@@ -0,0 +1,349 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterator, Iterable, Optional
+
+from fee_scraper.database.fee_row import FeeRow, FEE_COLUMNS, AMOUNT_COLUMNS, format_amount, parse_amount
+
+MAGIC = b'FEECOL02'
+# Rows per row group; a writer holds at most this many in memory
+GROUP_ROWS = 5000
+# Low-cardinality columns stored as uint16 codes into a per-file dictionary
+DICT_COLUMNS = ('modifier', 'medicare_location', 'global_surgery_indicator', 'multiple_surgery_indicator')
+MAX_DICT_SIZE = 0xFFFF - 1
+# NULL in a cents column; parsed amounts are never negative
+NULL_CENTS = -1
+
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+def _ints(buffer, typecode: str):
+    """Little-endian integers over buffer, zero-copy on little-endian hosts"""
+    if sys.byteorder == 'little':
+        return memoryview(buffer).cast(typecode)
+    values = array(typecode, bytes(buffer))
+    values.byteswap()
+    return values
+
+def _le_bytes(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _encode_column(name: str, values: List[Any]):
+    """Return (column header, [byte sections]) for one column"""
+    if name in AMOUNT_COLUMNS:
+        if not any(isinstance(value, str) for value in values):
+            cents = array('q', (NULL_CENTS if value is None else value for value in values))
+            return {'encoding': 'cents'}, [_le_bytes(cents)]
+        values = [format_amount(value) for value in values]
+
+    if name in DICT_COLUMNS:
+        dictionary = {}
+        codes = array('H')
+        for value in values:
+            if value is None:
+                codes.append(0)
+                continue
+            code = dictionary.get(value)
+            if code is None:
+                code = dictionary[value] = len(dictionary) + 1
+            codes.append(code)
+        if len(dictionary) <= MAX_DICT_SIZE:
+            return {'encoding': 'dict', 'values': list(dictionary)}, [_le_bytes(codes)]
+
+    nulls = bytearray((len(values) + 7) // 8)
+    offsets = array('I', [0])
+    data = bytearray()
+    for index, value in enumerate(values):
+        if value is None:
+            nulls[index >> 3] |= 1 << (index & 7)
+        else:
+            data += value.encode('utf-8')
+        offsets.append(len(data))
+    return {'encoding': 'utf8'}, [bytes(nulls), _le_bytes(offsets), bytes(data)]
+
+SECTIONS = {'dict': ('codes',), 'cents': ('cents',), 'utf8': ('nulls', 'offsets', 'data')}
+
+class ColumnarWriter:
+    """Write FeeRows to a columnar file a row group at a time.
+
+    Layout: MAGIC, 8-byte aligned row groups, the JSON footer, a uint32
+    footer length and MAGIC again. Rows are buffered until group_rows
+    have arrived and then written as one group, so memory is bounded by
+    the group size rather than the file's. The footer records each
+    group's row count and, per column, its encoding and section offsets
+    relative to the group:
+      dict: uint16 codes (0 is NULL, n is values[n - 1])
+      cents: int64 amounts in cents (NULL_CENTS is NULL)
+      utf8: NULL bitmap, uint32 offsets (rows + 1), UTF-8 data
+    An amount column holding any non-numeric text in a group is stored
+    as utf8 there. The file is written to a temporary name next to path;
+    commit() finishes it and moves it into place, discard() deletes it.
+    Once closed, a writer can be pickled to another process to commit.
+    """
+
+    def __init__(self, path: str, meta: Dict[str, Any], group_rows: int = GROUP_ROWS):
+        self.path = path
+        self.meta = meta
+        self.group_rows = group_rows
+        self.rows = 0
+        self._groups: List[Dict[str, Any]] = []
+        self._buffer: List[FeeRow] = []
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        # mkstemp creates the file 0600; give it a normal file's mode
+        os.fchmod(fd, 0o666 & ~_UMASK)
+        self._file = os.fdopen(fd, 'wb')
+        self._file.write(MAGIC)
+        self._position = _align(len(MAGIC))
+
+    def append(self, rows: Iterable[FeeRow]):
+        self._buffer.extend(rows)
+        while len(self._buffer) >= self.group_rows:
+            self._write_group(self._buffer[:self.group_rows])
+            del self._buffer[:self.group_rows]
+
+    def _write_group(self, rows: List[FeeRow]):
+        base = self._position
+        position = 0
+        columns = {}
+        for index, name in enumerate(FEE_COLUMNS):
+            column_header, parts = _encode_column(name, [row[index] for row in rows])
+            for key, part in zip(SECTIONS[column_header['encoding']], parts):
+                column_header[key] = [position, len(part)]
+                self._file.seek(base + position)
+                self._file.write(part)
+                position = _align(position + len(part))
+            columns[name] = column_header
+        self._groups.append({'offset': base, 'rows': len(rows), 'columns': columns})
+        self._position = base + position
+        self.rows += len(rows)
+
+    def close(self):
+        """Write the buffered rows and the footer; the file is then complete"""
+        if self._file is None:
+            return
+        if self._buffer:
+            self._write_group(self._buffer)
+            self._buffer = []
+        footer = dict(self.meta, format=2, rows=self.rows, order=FEE_COLUMNS, groups=self._groups)
+        footer_bytes = json.dumps(footer).encode('utf-8')
+        self._file.seek(self._position)
+        self._file.write(footer_bytes + struct.pack('<I', len(footer_bytes)) + MAGIC)
+        self._file.truncate()
+        self._file.close()
+        self._file = None
+
+    def commit(self):
+        self.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+def write_columnar(path: str, rows: Iterable[FeeRow], meta: Dict[str, Any]):
+    """Write FeeRows as one column per field to path, atomically (see ColumnarWriter)"""
+    writer = ColumnarWriter(path, meta)
+    try:
+        writer.append(rows)
+        writer.commit()
+    except BaseException:
+        writer.discard()
+        raise
+
+class ColumnarFile:
+    """Memory-mapped reader for a ColumnarWriter file"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._map = None
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            trailer = len(MAGIC) + 4
+            if len(self._map) < len(MAGIC) + trailer or self._map[:len(MAGIC)] != MAGIC \
+                    or self._map[-len(MAGIC):] != MAGIC:
+                raise ValueError(f"Not a columnar fee file: {path}")
+            (length,) = struct.unpack_from('<I', self._map, len(self._map) - trailer)
+            end = len(self._map) - trailer
+            self.header = json.loads(self._map[end - length:end])
+        except BaseException:
+            self.close()
+            raise
+        self.rows = self.header['rows']
+        self.columns = self.header['order']
+        self._groups = self.header['groups']
+        self._starts = []
+        start = 0
+        for group in self._groups:
+            self._starts.append(start)
+            start += group['rows']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _section(self, group, span):
+        offset, length = span
+        base = group['offset'] + offset
+        return memoryview(self._map)[base:base + length]
+
+    def column(self, name: str, start: int = 0, stop: Optional[int] = None) -> List[Any]:
+        """FeeRow values of one column for rows [start, stop)"""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        values = []
+        first = max(bisect.bisect_right(self._starts, start) - 1, 0)
+        for index in range(first, len(self._groups)):
+            group_start = self._starts[index]
+            if group_start >= stop:
+                break
+            group = self._groups[index]
+            values += self._group_column(group, name, max(start - group_start, 0),
+                                         min(stop - group_start, group['rows']))
+        return values
+
+    def _group_column(self, group, name: str, start: int, stop: int) -> List[Any]:
+        spec = group['columns'][name]
+        if spec['encoding'] == 'dict':
+            lookup = [None] + [sys.intern(value) for value in spec['values']]
+            codes = _ints(self._section(group, spec['codes']), 'H')
+            return [lookup[code] for code in codes[start:stop]]
+        if spec['encoding'] == 'cents':
+            cents = _ints(self._section(group, spec['cents']), 'q')
+            return [None if value == NULL_CENTS else value for value in cents[start:stop]]
+
+        nulls = self._section(group, spec['nulls'])
+        offsets = _ints(self._section(group, spec['offsets']), 'I')
+        first, last = offsets[start], offsets[stop]
+        blob = bytes(self._section(group, spec['data'])[first:last])
+        if blob.isascii():
+            text = blob.decode('ascii')
+            decode = lambda a, b: text[a - first:b - first]
+        else:
+            decode = lambda a, b: blob[a - first:b - first].decode('utf-8')
+        values = []
+        for index in range(start, stop):
+            if nulls[index >> 3] & (1 << (index & 7)):
+                values.append(None)
+            else:
+                values.append(decode(offsets[index], offsets[index + 1]))
+        if name in AMOUNT_COLUMNS:
+            return [parse_amount(value) for value in values]
+        return values
+
+    def iter_batches(self, chunk_rows: int) -> Iterator[List[FeeRow]]:
+        """FeeRows in their original order, chunk_rows at a time"""
+        for start in range(0, self.rows, chunk_rows):
+            stop = min(start + chunk_rows, self.rows)
+            columns = [self.column(name, start, stop) for name in FEE_COLUMNS]
+            yield list(map(FeeRow._make, zip(*columns)))
+
+class ColumnarCache:
+    """Parsed fee rows of each source PDF, one columnar file per version.
+
+    Files live in <cache_dir>/columnar and are named by the PDF's SHA-256
+    and the extractor id, so a re-published PDF or a new extractor
+    version gets a new file. manifest.json maps each URL (in first-seen
+    order) and extractor id to its current file, which is what main.py
+    --from-cache replays without touching HTTP or pdfplumber.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.directory = os.path.join(cache_dir, 'columnar')
+        self.manifest_path = os.path.join(self.directory, 'manifest.json')
+        os.makedirs(self.directory, exist_ok=True)
+
+    def load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def path_for(self, sha256: str, extractor_id: str) -> str:
+        return os.path.join(self.directory, f"{sha256}-{extractor_id}.fcol")
+
+    def writer(self, url: str, sha256: str, extractor_id: str) -> ColumnarWriter:
+        """A writer for url's rows, appended as they are extracted; see commit()"""
+        return ColumnarWriter(self.path_for(sha256, extractor_id),
+                              {'url': url, 'sha256': sha256, 'extractor': extractor_id})
+
+    def save(self, url: str, sha256: str, extractor_id: str, rows: Iterable[FeeRow]):
+        writer = self.writer(url, sha256, extractor_id)
+        try:
+            writer.append(rows)
+        except BaseException:
+            writer.discard()
+            raise
+        self.commit(url, writer)
+
+    def commit(self, url: str, writer: ColumnarWriter):
+        """Finish writer's file and make it url's current entry in the manifest"""
+        writer.commit()
+        sha256, extractor_id = writer.meta['sha256'], writer.meta['extractor']
+        path = writer.path
+
+        manifest = self.load_manifest()
+        entries = manifest.setdefault(url, {})
+        previous = entries.get(extractor_id)
+        entries[extractor_id] = {
+            'file': os.path.basename(path),
+            'sha256': sha256,
+            'written_at': datetime.now(timezone.utc).isoformat(),
+        }
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+        if previous and previous['file'] != entries[extractor_id]['file']:
+            try:
+                os.remove(os.path.join(self.directory, previous['file']))
+            except OSError:
+                pass
+
+    def entries(self, extractor_id: str) -> List[Dict[str, Any]]:
+        """(url, path) of every PDF cached for extractor_id, in first-seen order"""
+        found = []
+        for url, versions in self.load_manifest().items():
+            entry = versions.get(extractor_id)
+            if entry:
+                found.append({'url': url, 'path': os.path.join(self.directory, entry['file']),
+                              'sha256': entry['sha256']})
+        return found
+
+if __name__ == "__main__":
+    import time
+    cache = ColumnarCache(sys.argv[1] if len(sys.argv) > 1 else os.path.join('src', 'cache'))
+    for url, versions in cache.load_manifest().items():
+        for extractor_id, entry in versions.items():
+            path = os.path.join(cache.directory, entry['file'])
+            start = time.perf_counter()
+            with ColumnarFile(path) as columnar:
+                rows = sum(len(batch) for batch in columnar.iter_batches(50000))
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(path)
+            print(f"{url} [{extractor_id}]: {rows} rows, {size} bytes, read in {elapsed:.3f}s")
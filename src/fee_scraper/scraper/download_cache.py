@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, BinaryIO
+
+from fee_scraper.scraper import http_client
+from fee_scraper.utils.metrics import METRICS
+
+
+@dataclass
+class Download:
+    """Result of a conditional GET through the download cache"""
+    url: str
+    content: Optional[bytes]
+    unchanged: bool
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    sha256: Optional[str] = None
+    size: int = 0
+    bytes_saved: int = 0
+    file: Optional[BinaryIO] = None
+
+    def close(self):
+        """Release the temporary file of a to_file download"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class DownloadCache:
+    """On-disk cache of HTTP validators keyed by URL.
+
+    Each entry stores the ETag, Last-Modified and SHA-256 of the last body
+    that was fully processed. fetch() sends If-None-Match/If-Modified-Since
+    and reports the download as unchanged on a 304 or a matching hash.
+    Entries are only written by commit(), so a PDF whose database write
+    failed is processed again on the next run.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        # Whether the index page was unchanged; it is not one of the PDFs counted above
+        self.index_unchanged: Optional[bool] = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, url: str, suffix: str) -> str:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def load_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the cached validators for url, if any"""
+        try:
+            with open(self._entry_path(url, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _load_body(self, url: str) -> Optional[bytes]:
+        try:
+            with open(self._entry_path(url, '.body'), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def fetch(self, url: str, keep_body: bool = False, to_file: bool = False, **kwargs) -> Download:
+        """Conditionally download url.
+
+        With keep_body the response body is stored on commit and returned
+        from disk on a 304, for callers that always need the content (the
+        index page). Otherwise an unchanged download carries no content.
+        With to_file the body is streamed into a temporary file (Download.file)
+        instead of memory; the caller must close() the download.
+        """
+        entry = self.load_entry(url)
+        cached_body = self._load_body(url) if entry and keep_body else None
+        headers = {}
+        if entry and (cached_body is not None or not keep_body):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = http_client.get(url, headers=headers, stream=to_file, **kwargs)
+        if response.status_code == 304 and entry:
+            return Download(
+                url=url,
+                content=cached_body,
+                unchanged=True,
+                etag=entry.get('etag'),
+                last_modified=entry.get('last_modified'),
+                sha256=entry.get('sha256'),
+                size=entry.get('size', 0),
+                bytes_saved=entry.get('size', 0)
+            )
+        response.raise_for_status()
+
+        content = None
+        body_file = None
+        if to_file:
+            body_file = tempfile.TemporaryFile()
+            hasher = hashlib.sha256()
+            size = 0
+            try:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    hasher.update(chunk)
+                    body_file.write(chunk)
+                    size += len(chunk)
+                    METRICS.inc('http_bytes_downloaded_total', len(chunk))
+            except Exception:
+                body_file.close()
+                raise
+            body_file.seek(0)
+            digest = hasher.hexdigest()
+        else:
+            content = response.content
+            digest = hashlib.sha256(content).hexdigest()
+            size = len(content)
+            METRICS.inc('http_bytes_downloaded_total', size)
+
+        return Download(
+            url=url,
+            content=content,
+            unchanged=bool(entry) and entry.get('sha256') == digest,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            sha256=digest,
+            size=size,
+            file=body_file
+        )
+
+    def record(self, download: Download):
+        """Count a PDF download towards this run's hit/miss statistics"""
+        if download.unchanged:
+            self.hits += 1
+            self.bytes_saved += download.bytes_saved
+        else:
+            self.misses += 1
+
+    def commit(self, download: Download, keep_body: bool = False):
+        """Remember a fully processed download so later runs can skip it"""
+        entry = {
+            'url': download.url,
+            'etag': download.etag,
+            'last_modified': download.last_modified,
+            'sha256': download.sha256,
+            'size': download.size
+        }
+        if keep_body and download.content is not None:
+            self._write_atomic(self._entry_path(download.url, '.body'), download.content)
+        self._write_atomic(
+            self._entry_path(download.url, '.json'),
+            json.dumps(entry).encode('utf-8')
+        )
+
+    def _write_atomic(self, path: str, data: bytes):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def record_index(self, download: Download):
+        """Note whether the index page changed, apart from the PDF statistics"""
+        self.index_unchanged = download.unchanged
+
+    def summary(self) -> str:
+        summary = f"PDF cache hits: {self.hits}, misses: {self.misses}, bytes saved: {self.bytes_saved}"
+        if self.index_unchanged is not None:
+            summary += f"; index page {'unchanged' if self.index_unchanged else 'changed'}"
+        return summary
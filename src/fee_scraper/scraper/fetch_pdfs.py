@@ -0,0 +1,70 @@
+import os
+import re
+from typing import Iterable, List, Optional
+from urllib.parse import urljoin
+
+from fee_scraper.utils.metrics import METRICS
+
+# Overridable so the scraper can run against a local stand-in site
+PART_B_INDEX_URL = os.getenv(
+    'PART_B_INDEX_URL',
+    "https://www.pa.gov/agencies/dli/programs-services/workers-compensation/wc-health-care-services-review/wc-fee-schedule/part-b-fee-schedules.html"
+)
+
+def filter_urls(urls: Iterable[str], match: Optional[str] = None, exclude: Optional[str] = None,
+                limit: Optional[int] = None) -> List[str]:
+    """URLs matching the match regex and not the exclude regex, at most limit of them"""
+    match_re = re.compile(match) if match else None
+    exclude_re = re.compile(exclude) if exclude else None
+    selected = []
+    for url in urls:
+        if limit is not None and len(selected) >= limit:
+            break
+        if match_re is not None and not match_re.search(url):
+            continue
+        if exclude_re is not None and exclude_re.search(url):
+            continue
+        selected.append(url)
+    return selected
+
+def fetch_part_b_pdf_urls(cache=None, url=PART_B_INDEX_URL):
+    # Imported here so importing this module stays cheap for the CLI
+    from bs4 import BeautifulSoup
+    import requests
+    from fee_scraper.scraper import http_client
+
+    part_b_urls = []
+    
+    try:
+        if cache is not None:
+            # Conditional GET; a 304 is served from the cached copy of the page
+            download = cache.fetch(url, keep_body=True)
+            cache.record_index(download)
+            cache.commit(download, keep_body=True)
+            html = download.content.decode('utf-8', errors='replace')
+        else:
+            response = http_client.get(url)
+            response.raise_for_status()  # Raise an exception for bad status codes
+            html = response.text
+            METRICS.inc('http_bytes_downloaded_total', len(response.content))
+        
+        soup = BeautifulSoup(html, "html.parser")
+        pdfbutton = soup.find_all('a', id=lambda x: x and x.startswith('button-'))
+        
+        for button in pdfbutton:
+            if 'part-b' in button.get('href', '').lower():
+                pdf_url = urljoin(url, button.get('href'))
+                part_b_urls.append(pdf_url)
+        
+        return part_b_urls
+    
+    except requests.RequestException as e:
+        print(f"Error fetching URLs: {e}")
+        return []
+
+if __name__ == "__main__":
+    pdf_urls = fetch_part_b_pdf_urls()
+    print(f"Found {len(pdf_urls)} Part B PDF URLs:")
+    for url in pdf_urls:
+        print(f"PDF URL: {url}")
+
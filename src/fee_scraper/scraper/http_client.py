@@ -0,0 +1,89 @@
+import os
+import threading
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from fee_scraper.utils.metrics import METRICS
+
+# Defaults, overridable through the environment or configure()
+SETTINGS: Dict[str, Any] = {
+    'connect_timeout': float(os.getenv('HTTP_CONNECT_TIMEOUT', 10)),
+    'read_timeout': float(os.getenv('HTTP_READ_TIMEOUT', 60)),
+    'retries': int(os.getenv('HTTP_RETRIES', 3)),
+    'backoff_factor': float(os.getenv('HTTP_BACKOFF', 0.5)),
+    'pool_size': int(os.getenv('HTTP_POOL_SIZE', 8)),
+}
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_lock = threading.Lock()
+
+class TimeoutSession(requests.Session):
+    """Session that applies the configured timeout to every request"""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', (SETTINGS['connect_timeout'], SETTINGS['read_timeout']))
+        return super().request(method, url, **kwargs)
+
+def build_session() -> requests.Session:
+    """Create a keep-alive session with retries on 5xx and connection errors.
+
+    Retries back off exponentially: backoff_factor * 2 ** (attempt - 1).
+    """
+    retry = Retry(
+        total=SETTINGS['retries'],
+        connect=SETTINGS['retries'],
+        read=SETTINGS['retries'],
+        status=SETTINGS['retries'],
+        backoff_factor=SETTINGS['backoff_factor'],
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=SETTINGS['pool_size'],
+        pool_maxsize=SETTINGS['pool_size'],
+        max_retries=retry,
+    )
+    session = TimeoutSession()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_session() -> requests.Session:
+    """Return this process's shared session, creating it on first use.
+
+    A forked worker gets a fresh session rather than reusing sockets
+    inherited from its parent.
+    """
+    global _session, _session_pid
+    with _lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = build_session()
+            _session_pid = os.getpid()
+        return _session
+
+def configure(**settings):
+    """Update SETTINGS; the next get_session() call builds a new session"""
+    global _session
+    unknown = set(settings) - set(SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown HTTP settings: {', '.join(sorted(unknown))}")
+    with _lock:
+        SETTINGS.update({k: v for k, v in settings.items() if v is not None})
+        if _session is not None:
+            _session.close()
+        _session = None
+
+def get(url: str, **kwargs) -> requests.Response:
+    """GET through the shared session, counting any retries it needed"""
+    response = get_session().get(url, **kwargs)
+    retries = getattr(response.raw, 'retries', None)
+    if retries is not None and retries.history:
+        METRICS.inc('http_retries_total', len(retries.history))
+    return response
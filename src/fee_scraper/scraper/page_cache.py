@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+from fee_scraper.database.fee_row import FeeRow
+from fee_scraper.scraper.columnar_cache import ColumnarWriter
+
+def page_fingerprint(page) -> str:
+    """SHA-256 of a page's MediaBox and decoded content streams.
+
+    Reading the streams only decompresses them; none of pdfplumber's layout
+    analysis runs, so this is far cheaper than extracting the page. Changes
+    confined to shared resources (fonts, images) are not detected.
+    """
+    from pdfminer.pdftypes import resolve1
+    hasher = hashlib.sha256(repr(tuple(page.mediabox)).encode('ascii'))
+    for stream in page.page_obj.contents:
+        stream = resolve1(stream)
+        if stream is not None:
+            hasher.update(stream.get_data())
+    return hasher.hexdigest()
+
+@dataclass
+class PageState:
+    """Page fingerprints and rows of one PDF, before and after extraction.
+
+    previous is the entry saved by the last successful run (or None).
+    The extractor fills header and adds each page as it goes; reused
+    counts pages whose rows were taken from previous instead of being
+    extracted, and reused_rows the rows on them. Pages are only kept in
+    pages when keep_rows is set (the page cache will save them), and are
+    appended to the columnar writer, if any, as they arrive.
+    """
+    extractor_id: Optional[str] = None
+    previous: Optional[Dict[str, Any]] = None
+    header: Optional[Dict[str, Any]] = None
+    pages: List[Dict[str, Any]] = field(default_factory=list)
+    reused: int = 0
+    reused_rows: int = 0
+    parsed: int = 0
+    keep_rows: bool = True
+    columnar: Optional[ColumnarWriter] = None
+
+    def add_page(self, page: Dict[str, Any]):
+        """Record a page's fingerprint and rows, in page order"""
+        if self.columnar is not None:
+            self.columnar.append(page['rows'])
+        if self.keep_rows:
+            self.pages.append(page)
+
+    def previous_page(self, index: int, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """The cached page at index if its fingerprint still matches"""
+        if not self.previous:
+            return None
+        pages = self.previous['pages']
+        if index < len(pages) and pages[index]['fingerprint'] == fingerprint:
+            return pages[index]
+        return None
+
+class PageCache:
+    """On-disk per-(URL, page) cache of extracted rows.
+
+    One JSON file per URL, next to the DownloadCache entries, holding the
+    extractor id, the first page's header and layout, and every page's
+    fingerprint and rows. Entries from another extractor or version are
+    ignored. Like DownloadCache, save() is only called after the PDF's
+    database transaction commits. With reuse False (--no-page-cache) every
+    page is re-extracted and nothing is saved or kept in memory; the
+    PageState only streams the rows to its columnar writer.
+    """
+
+    def __init__(self, cache_dir: str, reuse: bool = True):
+        self.cache_dir = cache_dir
+        self.reuse = reuse
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + '.pages.json')
+
+    def load(self, url: str, extractor_id: str, columnar: Optional[ColumnarWriter] = None) -> PageState:
+        """url's PageState, appending its rows to columnar if given"""
+        state = PageState(extractor_id, keep_rows=self.reuse, columnar=columnar)
+        if not self.reuse:
+            return state
+        try:
+            with open(self._entry_path(url), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return state
+        if entry.get('extractor') != extractor_id:
+            return state
+        for page in entry['pages']:
+            # FeeRows are stored as JSON arrays; cents stay numbers
+            page['rows'] = [FeeRow._make(row) for row in page['rows']]
+        state.previous = entry
+        return state
+
+    def save(self, url: str, state: PageState):
+        if not self.reuse or state.header is None:
+            return
+        entry = {
+            'url': url,
+            'extractor': state.extractor_id,
+            'header': state.header,
+            'pages': state.pages,
+        }
+        path = self._entry_path(url)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,140 @@
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from functools import lru_cache
+from typing import List, Optional, Iterable, Iterator, Sequence, Tuple
+
+from fee_scraper.database.fee_row import FeeRow, FEE_COLUMNS, AMOUNT_COLUMNS, PLAIN_AMOUNT
+from fee_scraper.utils.metrics import METRICS
+
+logger = logging.getLogger('fee_schedule_scraper')
+
+# Cell text that means "no value"
+NULL_VALUES = frozenset(['X', '', 'N/A', '-'])
+
+# Text that only appears in a repeated column header row
+HEADER_INDICATORS = (
+    'Site of Service Amount',
+    'Multiple Surgery Indicator',
+    'Service Amount',
+    'Surgery Indicator',
+    'CPT/HCPC',
+)
+
+# Shorter cell values are not searched for header text
+MIN_INDICATOR_LENGTH = min(map(len, HEADER_INDICATORS))
+
+# CPT (99213, 0001T) and HCPCS level II (E0665) codes
+DEFAULT_CODE_PATTERN = r'[0-9A-Z]{5}'
+# FEE_CODE_PATTERN replaces it, e.g. should a new code format appear
+CODE_PATTERN = os.getenv('FEE_CODE_PATTERN') or DEFAULT_CODE_PATTERN
+
+REJECT_REASONS = ('empty', 'header', 'title', 'missing_code', 'bad_code')
+# Rows that hold fee data but are dropped; each is logged as a warning
+WARN_REASONS = frozenset(['missing_code', 'bad_code'])
+
+def _indicator_pattern(indicator: str) -> str:
+    # Header cells often wrap, e.g. "Site of\nService\nAmount"
+    return r'\s+'.join(re.escape(word) for word in indicator.split())
+
+def _compile(fields: List[Tuple[int, int]], amount_fields: frozenset, namespace: dict):
+    """Generate validate(row) for one header layout.
+
+    Returns a FeeRow, or the reject reason as a string. The per-cell
+    work is unrolled for the layout's columns, which is about twice as
+    fast as looping over them for every row.
+    """
+    cells = dict((field_index, cell) for cell, field_index in fields)
+    lines = ["def validate(row):", "    n = len(row)", "    filled = 0", "    header = False"]
+    for field_index in range(len(FEE_COLUMNS)):
+        name = f"v{field_index}"
+        if field_index not in cells:
+            lines.append(f"    {name} = None")
+            continue
+        cell = cells[field_index]
+        if field_index in amount_fields:
+            convert = f"{name} = int({name}.replace('.', '')) if amount_match({name}) else {name}"
+        else:
+            convert = f"{name} = intern({name})"
+        lines += [
+            f"    {name} = row[{cell}] if n > {cell} else None",
+            f"    if {name} is not None:",
+            f"        if {name}.__class__ is not str: {name} = str({name})",
+            f"        {name} = {name}.strip()",
+            f"        if {name} in NULL_VALUES: {name} = None",
+            "        else:",
+            "            filled += 1",
+            f"            if len({name}) >= MIN_INDICATOR_LENGTH and header_search({name}): header = True",
+            f"            {convert}",
+        ]
+    lines += [
+        "    if not filled: return 'empty'",
+        "    if header: return 'header'",
+        "    if v0 is None: return 'missing_code'",
+        # Text in the code column alone is a title or footnote line
+        "    if not code_match(v0): return 'title' if filled == 1 else 'bad_code'",
+        "    return make((" + ", ".join(f"v{i}" for i in range(len(FEE_COLUMNS))) + ",))",
+    ]
+    exec("\n".join(lines), namespace)
+    return namespace['validate']
+
+class RowValidator:
+    """Validation and normalization of table rows for one header layout.
+
+    Built once per distinct header row (see get_validator), which
+    compiles the regexes and a validate() function specialised to the
+    layout's columns. rows() makes a single pass over each row: cells
+    are stripped, NULL_VALUES become None, empty, header and title rows
+    and rows without a well-formed code are rejected, and the rest
+    become FeeRows with amounts parsed to cents. Rejected rows are
+    counted by reason in rejected and in the rows_rejected_total metric,
+    and those in WARN_REASONS are logged with their cells.
+    """
+
+    def __init__(self, headers: Sequence[Optional[str]], code_pattern: str = CODE_PATTERN):
+        # (cell index, FeeRow field index) of each column the fee table stores
+        self.fields: List[Tuple[int, int]] = [
+            (cell, FEE_COLUMNS.index(header)) for cell, header in enumerate(headers)
+            if header in FEE_COLUMNS
+        ]
+        amount_fields = frozenset(FEE_COLUMNS.index(col) for col in AMOUNT_COLUMNS)
+        header_text = re.compile('|'.join(map(_indicator_pattern, HEADER_INDICATORS)))
+        self.validate = _compile(self.fields, amount_fields, {
+            'NULL_VALUES': NULL_VALUES,
+            'MIN_INDICATOR_LENGTH': MIN_INDICATOR_LENGTH,
+            'header_search': header_text.search,
+            'code_match': re.compile(code_pattern).fullmatch,
+            'amount_match': PLAIN_AMOUNT.fullmatch,
+            'intern': sys.intern,
+            'make': FeeRow._make,
+        })
+        self.rejected: Counter = Counter()
+
+    def rows(self, rows: Iterable[Sequence]) -> Iterator[FeeRow]:
+        if not self.fields:
+            return
+        validate = self.validate
+        rejected = Counter()
+        try:
+            for row in rows:
+                result = validate(row)
+                if result.__class__ is str:
+                    rejected[result] += 1
+                    if result in WARN_REASONS:
+                        logger.warning(f"Rejected row ({result}): {list(row)}")
+                else:
+                    yield result
+        finally:
+            for reason, count in rejected.items():
+                METRICS.inc('rows_rejected_total', count, reason=reason)
+            self.rejected.update(rejected)
+
+@lru_cache(maxsize=32)
+def _validator(headers: Tuple[Optional[str], ...]) -> RowValidator:
+    return RowValidator(headers)
+
+def get_validator(headers: Sequence[Optional[str]]) -> RowValidator:
+    """The run's RowValidator for a header layout, compiled on first use"""
+    return _validator(tuple(headers))
@@ -0,0 +1,159 @@
+import atexit
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import time
+from datetime import datetime
+import os
+
+# 'records' logs every classified row; 'progress' logs periodic progress
+# lines and a 1-in-LOG_SAMPLE_RATE sample of rows at DEBUG
+VERBOSITIES = ('progress', 'records')
+DEFAULT_VERBOSITY = os.getenv('LOG_VERBOSITY', 'progress')
+PROGRESS_INTERVAL = float(os.getenv('LOG_PROGRESS_SECONDS', 5))
+SAMPLE_RATE = int(os.getenv('LOG_SAMPLE_RATE', 1000))
+
+verbosity = DEFAULT_VERBOSITY
+_listener = None
+
+def build_handlers(log_dir=None, stream=None, level=logging.INFO):
+    """Console handler, plus run and error log files when log_dir is set"""
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+    console_handler = logging.StreamHandler(stream)
+    console_handler.setLevel(level)
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
+
+    if log_dir is not None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        log_file = os.path.join(log_dir, f'scraper_{timestamp}.log')
+        file_handler = logging.FileHandler(log_file, encoding='utf-8', mode='w')
+        file_handler.setLevel(level)
+
+        error_file = os.path.join(log_dir, f'scraper_{timestamp}_errors.log')
+        error_handler = logging.FileHandler(error_file, encoding='utf-8', mode='w')
+        error_handler.setLevel(logging.ERROR)
+
+        file_handler.setFormatter(formatter)
+        error_handler.setFormatter(formatter)
+        handlers += [file_handler, error_handler]
+    return handlers
+
+def attach_handlers(logger, handlers, use_queue=True):
+    """Route logger through a QueueHandler so handler I/O runs on a background thread.
+
+    The calling thread only enqueues the record; formatting and writes
+    happen in the QueueListener. Returns the started listener, or None
+    when use_queue is False and the handlers are attached directly.
+    """
+    global _listener
+    stop_logging()
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+
+    if not use_queue:
+        for handler in handlers:
+            logger.addHandler(handler)
+        return None
+
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging():
+    """Flush queued records and stop the background listener"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+atexit.register(stop_logging)
+
+def worker_logging(logger):
+    """A multiprocessing queue for worker processes' records, and the listener writing them.
+
+    The records reach logger's handlers here (its QueueListener's when
+    queued). Pass the queue to init_worker_logging() in each worker, and
+    stop the listener once the workers have exited.
+    """
+    handlers = _listener.handlers if _listener is not None else tuple(logger.handlers)
+    log_queue = multiprocessing.Queue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return log_queue, listener
+
+def init_worker_logging(logger, log_queue):
+    """Send a worker process's records for logger to the parent through log_queue.
+
+    A forked worker inherits the parent's QueueHandler but not the
+    listener thread draining it, so its records would never be written.
+    """
+    global _listener
+    _listener = None
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+def setup_logger(verbosity_mode=None, level=None):
+    """Configure logging to write to file and stdout in production"""
+    global verbosity
+    verbosity = verbosity_mode or DEFAULT_VERBOSITY
+    if verbosity not in VERBOSITIES:
+        raise ValueError(f"Unknown log verbosity: {verbosity}")
+    level = logging.getLevelName(level or os.getenv('LOG_LEVEL', 'INFO'))
+
+    # Create logs directory if it doesn't exist and we're not in production
+    log_dir = None
+    if not os.getenv('RAILWAY_ENVIRONMENT'):
+        log_dir = os.path.join('src', 'logs')
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+    # Set up the logger
+    logger = logging.getLogger('fee_schedule_scraper')
+    logger.setLevel(level)
+
+    # Prevent propagation to root logger
+    logger.propagate = False
+
+    # Always log to the console; add file handlers only if not in production
+    attach_handlers(logger, build_handlers(log_dir, level=level))
+
+    return logger
+
+def record_sample_rate() -> int:
+    """1 to log every row, else log one row in SAMPLE_RATE"""
+    return 1 if verbosity == 'records' else SAMPLE_RATE
+
+class Progress:
+    """Rate-limited progress lines for a long loop.
+
+    update() logs at most once every interval seconds, so the number of
+    lines depends on elapsed time rather than on the number of rows.
+    """
+
+    def __init__(self, logger, label: str, total=None, interval: float = PROGRESS_INTERVAL):
+        self.logger = logger
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.start = time.monotonic()
+        self.last = self.start
+
+    def update(self, done: int, force: bool = False, **counts):
+        now = time.monotonic()
+        if not force and now - self.last < self.interval:
+            return
+        self.last = now
+        elapsed = now - self.start
+        rate = done / elapsed if elapsed else 0.0
+        of_total = f"/{self.total}" if self.total else ""
+        details = ''.join(f", {name} {value}" for name, value in counts.items())
+        self.logger.info(f"{self.label}: {done}{of_total} rows{details} ({rate:.0f} rows/s)")
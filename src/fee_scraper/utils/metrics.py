@@ -0,0 +1,224 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, Iterator, Tuple
+
+# Seconds; stages range from sub-millisecond commits to multi-minute PDFs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+HELP = {
+    'stage_seconds': 'Wall time spent in each pipeline stage',
+    'pages_total': 'PDF pages extracted, by learned-layout or fallback detection',
+    'rows_extracted_total': 'Fee rows read from PDFs',
+    'rows_rejected_total': 'Table rows rejected by validation, by reason',
+    'rows_inserted_total': 'Fee rows inserted',
+    'rows_updated_total': 'Fee rows updated',
+    'pdfs_total': 'PDFs handled, by outcome',
+    'http_bytes_downloaded_total': 'Response body bytes downloaded',
+    'http_retries_total': 'HTTP requests retried after a 5xx or connection error',
+    'run_seconds': 'Wall time of the last run',
+    'rows_per_second': 'Rows extracted per second of run wall time',
+    'last_run_timestamp_seconds': 'Unix time the last run finished',
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _format_labels(labels: LabelKey, extra: str = '') -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+class Metrics:
+    """Thread-safe counters, gauges and histograms for one scraper run.
+
+    Everything is kept in plain dicts so a pool worker can drain() its
+    metrics, return them with its result, and the parent can merge() them.
+    At the end of the run write_prometheus() renders the node_exporter
+    textfile-collector format and write_report() a JSON summary.
+    """
+
+    def __init__(self, prefix: str = 'fee_scraper', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.gauges: Dict[Tuple[str, LabelKey], float] = {}
+        # name, labels -> [bucket counts..., count, sum, max]
+        self.histograms: Dict[Tuple[str, LabelKey], list] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def total(self, name: str) -> float:
+        """Sum of a counter across all its label values"""
+        with self._lock:
+            return sum(value for (key, _), value in self.counters.items() if key == name)
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * len(self.buckets) + [0, 0.0, 0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-3] += 1
+            histogram[-2] += value
+            histogram[-1] = max(histogram[-1], value)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Observe the wall time of the with-block under stage_seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=stage)
+
+    def timed_iter(self, stage: str, iterable: Iterable) -> Iterator:
+        """Yield from iterable, timing only the time spent producing items.
+
+        The total is observed once, when the iterator is exhausted or closed,
+        so a lazily extracted PDF counts as one observation.
+        """
+        elapsed = 0.0
+        iterator = iter(iterable)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - start
+                    return
+                elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            self.observe('stage_seconds', elapsed, stage=stage)
+
+    def drain(self) -> Dict[str, Any]:
+        """Return and reset everything recorded so far, in a picklable form"""
+        with self._lock:
+            snapshot = {
+                'counters': self.counters,
+                'gauges': self.gauges,
+                'histograms': self.histograms,
+            }
+            self.counters, self.gauges, self.histograms = {}, {}, {}
+        return snapshot
+
+    def merge(self, snapshot: Dict[str, Any]):
+        """Fold a drain() snapshot from another process into this one"""
+        with self._lock:
+            for key, value in snapshot['counters'].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            self.gauges.update(snapshot['gauges'])
+            for key, other in snapshot['histograms'].items():
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    self.histograms[key] = list(other)
+                    continue
+                for index in range(len(histogram) - 1):
+                    histogram[index] += other[index]
+                histogram[-1] = max(histogram[-1], other[-1])
+
+    def stage_totals(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count, total, mean and max seconds"""
+        stages = {}
+        with self._lock:
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name != 'stage_seconds':
+                    continue
+                count, total, longest = histogram[-3:]
+                stages[dict(labels)['stage']] = {
+                    'count': count,
+                    'seconds': round(total, 6),
+                    'mean_seconds': round(total / count, 6) if count else 0.0,
+                    'max_seconds': round(longest, 6),
+                }
+        return stages
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            families = {}
+            for kind, series in (('counter', self.counters), ('gauge', self.gauges),
+                                 ('histogram', self.histograms)):
+                for (name, labels), value in series.items():
+                    families.setdefault((name, kind), []).append((labels, value))
+
+        for (name, kind), series in sorted(families.items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {metric} {HELP.get(name, name.replace('_', ' '))}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for labels, value in sorted(series):
+                if kind != 'histogram':
+                    lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                for bound, count in zip(self.buckets, value):
+                    le = 'le="%g"' % bound
+                    lines.append(f"{metric}_bucket{_format_labels(labels, le)} {count}")
+                le = 'le="+Inf"'
+                lines.append(f"{metric}_bucket{_format_labels(labels, le)} {value[-3]}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {_format_value(value[-2])}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {value[-3]}")
+        return "\n".join(lines) + "\n"
+
+    def report(self, **extra) -> Dict[str, Any]:
+        """JSON-serialisable summary of the run"""
+        def flatten(series):
+            return {
+                name + _format_labels(labels): value
+                for (name, labels), value in sorted(series.items())
+            }
+        with self._lock:
+            counters = flatten(self.counters)
+            gauges = flatten(self.gauges)
+        report = {
+            'started': datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            'finished': datetime.now(timezone.utc).isoformat(),
+            'stages': self.stage_totals(),
+            'counters': counters,
+            'gauges': gauges,
+        }
+        report.update(extra)
+        return report
+
+    def write_prometheus(self, path: str):
+        # The textfile collector may read at any time, so replace atomically
+        _write_atomic(path, self.render_prometheus())
+
+    def write_report(self, path: str, **extra):
+        _write_atomic(path, json.dumps(self.report(**extra), indent=2) + "\n")
+
+def _write_atomic(path: str, text: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+# Process-wide registry, like the named logger
+METRICS = Metrics()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The code under test and the synthetic PDF generator both live in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
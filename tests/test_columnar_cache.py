@@ -0,0 +1,78 @@
+"""ColumnarWriter/ColumnarFile round trips and the ColumnarCache manifest."""
+import os
+
+import pytest
+
+from fee_scraper.database.fee_row import FeeRow, FEE_COLUMNS
+from fee_scraper.scraper.columnar_cache import ColumnarCache, ColumnarFile, ColumnarWriter, write_columnar
+
+ROWS = [
+    FeeRow.from_text('99213', None, '003', 'XXX', '2', '12.34', '56.78', None),
+    FeeRow.from_text('99213', '', '003', '', '2', '0.00', '1.00', ''),
+    FeeRow.from_text('99214', '26', None, None, None, 'BR', '1,234.00', '007.50'),
+    FeeRow.from_text('', 'TC', '', 'YYY', '0', None, None, 'N/A'),
+    FeeRow.from_text('E0665', None, None, None, None, '100.00', '0.50', None),
+]
+
+def read_all(path, chunk_rows=2):
+    with ColumnarFile(path) as columnar:
+        return [row for batch in columnar.iter_batches(chunk_rows) for row in batch]
+
+def test_round_trip_keeps_nulls_empty_strings_and_text_amounts(tmp_path):
+    path = str(tmp_path / 'rows.fcol')
+    write_columnar(path, ROWS, {'url': 'u'})
+    rows = read_all(path)
+    assert rows == ROWS
+    assert rows[0].modifier is None and rows[1].modifier == ''
+    assert rows[1].site_of_service_amount == '' and rows[0].site_of_service_amount is None
+    assert rows[2].prevailing_charge_amount == 'BR' and rows[4].prevailing_charge_amount == 10000
+
+def test_round_trip_across_row_groups(tmp_path):
+    path = str(tmp_path / 'rows.fcol')
+    writer = ColumnarWriter(path, {'url': 'u'}, group_rows=2)
+    for row in ROWS:
+        writer.append([row])
+    writer.commit()
+    with ColumnarFile(path) as columnar:
+        assert [group['rows'] for group in columnar.header['groups']] == [2, 2, 1]
+        # Only the group holding "BR" stores the amount column as text
+        encodings = [group['columns']['prevailing_charge_amount']['encoding'] for group in columnar.header['groups']]
+        assert encodings == ['cents', 'utf8', 'cents']
+        assert columnar.column('cpt/hcpc_code', 1, 4) == ['99213', '99214', '']
+    assert read_all(path, chunk_rows=3) == ROWS
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / 'empty.fcol')
+    write_columnar(path, [], {'url': 'u'})
+    with ColumnarFile(path) as columnar:
+        assert columnar.rows == 0
+        assert columnar.columns == FEE_COLUMNS
+        assert columnar.column('modifier') == []
+        assert list(columnar.iter_batches(10)) == []
+
+def test_not_a_columnar_file(tmp_path):
+    path = tmp_path / 'rows.fcol'
+    path.write_bytes(b'not columnar')
+    with pytest.raises(ValueError):
+        ColumnarFile(str(path))
+
+def test_discard_leaves_nothing_behind(tmp_path):
+    writer = ColumnarWriter(str(tmp_path / 'rows.fcol'), {'url': 'u'})
+    writer.append(ROWS)
+    writer.discard()
+    assert os.listdir(tmp_path) == []
+
+def test_cache_manifest_replaces_old_versions(tmp_path):
+    cache = ColumnarCache(str(tmp_path))
+    cache.save('https://example.com/b.pdf', 'b1', 'table-v1', ROWS[:2])
+    cache.save('https://example.com/a.pdf', 'a1', 'table-v1', ROWS[2:])
+    cache.save('https://example.com/b.pdf', 'b2', 'table-v1', ROWS[:1])
+    cache.save('https://example.com/b.pdf', 'b2', 'words-v1', ROWS[:1])
+
+    entries = cache.entries('table-v1')
+    # First-seen order, and each URL's latest version
+    assert [(entry['url'], entry['sha256']) for entry in entries] == [
+        ('https://example.com/b.pdf', 'b2'), ('https://example.com/a.pdf', 'a1')]
+    assert read_all(entries[0]['path']) == ROWS[:1]
+    assert not os.path.exists(cache.path_for('b1', 'table-v1'))
+    assert [entry['sha256'] for entry in cache.entries('words-v1')] == ['b2']
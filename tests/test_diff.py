@@ -0,0 +1,71 @@
+"""sorted_rows and merge_diff, the dry-run change report, and reconcile."""
+from collections import Counter
+
+from fee_scraper.database.fee_row import FeeRow
+from fee_scraper.pipeline.diff import merge_diff, sort_key, sorted_rows, report_lines
+from fee_scraper.pipeline.reconcile import reconcile
+
+def row(code, modifier=None, location=None, fee='10.00', indicator='XXX'):
+    return FeeRow.from_text(code, modifier, location, indicator, '2', '1.00', fee, None)
+
+def test_sort_key_treats_null_and_empty_alike():
+    assert sort_key(row('99213')) == sort_key(row('99213', '', ''))
+    assert sort_key(row('99213')) < sort_key(row('99213', '26')) < sort_key(row('99214'))
+
+def test_sorted_rows_later_sources_win():
+    first = [[row('99214', fee='1.00'), row('99213', fee='1.00')]]
+    second = [[row('99213', '', fee='2.00')], [row('99213', fee='3.00')]]
+    rows = list(sorted_rows([first, second]))
+    assert [(r.cpt_hcpc_code, r.modifier, r.fee_schedule_amount) for r in rows] == [
+        ('99213', '', 200), ('99214', None, 100)]
+
+def test_sorted_rows_spills_to_disk_in_order(tmp_path):
+    source = [[row(f"{code:05d}") for code in range(50, 0, -1)]]
+    rows = list(sorted_rows([source], chunk_rows=7, tmp_dir=str(tmp_path)))
+    assert [r.cpt_hcpc_code for r in rows] == [f"{code:05d}" for code in range(1, 51)]
+
+def test_merge_diff():
+    old = [row('99211'), row('99212'), row('99213', fee='10.00'), row('99215', '26')]
+    new = [row('99212'), row('99213', fee='12.50'), row('99214'), row('99215', '26')]
+    counts = Counter()
+    changes = list(merge_diff(old, new, counts))
+    assert [(change.status, (change.old or change.new).cpt_hcpc_code) for change in changes] == [
+        ('removed', '99211'), ('changed', '99213'), ('added', '99214')]
+    assert changes[1].fields == {'fee_schedule_amount': (1000, 1250)}
+    assert counts == Counter(added=1, removed=1, changed=1, unchanged=2)
+    assert list(report_lines(changes[1])) == [
+        ['changed', '99213', None, None, 'fee_schedule_amount', '10.00', '12.50', '+2.50']]
+
+def test_merge_diff_null_and_empty_are_unchanged():
+    old = [row('99213', None, None, indicator=None)]
+    new = [row('99213', '', '', indicator='')]
+    counts = Counter()
+    assert list(merge_diff(old, new, counts)) == []
+    assert counts == Counter(unchanged=1)
+
+def test_merge_diff_one_side_empty():
+    rows = [row('99213'), row('99214')]
+    assert [change.status for change in merge_diff([], rows)] == ['added', 'added']
+    assert [change.status for change in merge_diff(rows, [])] == ['removed', 'removed']
+
+def test_reconcile_buckets_and_duplicates():
+    tables = [row('99213'), row('99214'), row('99213', fee='99.00'), row('99215')]
+    results = [
+        ('99213', None, None, 'duplicate'),
+        ('99214', None, None, 'new'),
+        ('99213', None, None, 'changed'),
+        ('99999', None, None, 'new'),
+    ]
+    reconciliation = reconcile(tables, results)
+    # The first row for a key is kept and the highest-priority status wins
+    assert reconciliation.records == [('changed', tables[0]), ('new', tables[1])]
+    assert reconciliation.duplicate_keys == {('99213', None, None): 2}
+    assert reconciliation.unmatched == [('99999', None, None)]
+
+def test_reconcile_carries_keys_across_chunks():
+    seen = set()
+    reconcile([row('99213')], [('99213', None, None, 'new')], seen)
+    reconciliation = reconcile([row('99213'), row('99214')], [('99214', None, None, 'new')], seen)
+    assert reconciliation.new == [row('99214')]
+    assert reconciliation.duplicate_keys == {('99213', None, None): 2}
+    assert seen == {('99213', None, None), ('99214', None, None)}
@@ -0,0 +1,39 @@
+"""Every extraction backend returns the rows of full table detection."""
+import pytest
+
+from bench.synthetic_pdf import fee_rows, fee_schedule_pdf
+from fee_scraper.database.fee_row import FEE_COLUMNS
+from fee_scraper.scraper.extract_pdfs import PdfExtractor, TableExtractor, WordExtractor, iter_pdf_rows
+
+PAGES = 4
+ROWS_PER_PAGE = 30
+SEED = 3
+
+@pytest.fixture(scope='module')
+def schedule_pdf():
+    return fee_schedule_pdf(PAGES, ROWS_PER_PAGE, seed=SEED)
+
+def extract(content, extractor):
+    return [row for batch in iter_pdf_rows(content, extractor=extractor) for row in batch]
+
+def test_table_detection_reads_every_row(schedule_pdf):
+    expected = [tuple(row[col] for col in FEE_COLUMNS) for row in fee_rows(PAGES * ROWS_PER_PAGE, seed=SEED)]
+    assert [row.db_values() for row in extract(schedule_pdf, TableExtractor())] == expected
+
+@pytest.mark.parametrize('make_extractor', [
+    lambda: TableExtractor(use_layout=True),
+    WordExtractor,
+], ids=['layout', 'words'])
+def test_backend_matches_table_detection(schedule_pdf, make_extractor):
+    extractor = make_extractor()
+    assert extract(schedule_pdf, extractor) == extract(schedule_pdf, TableExtractor())
+    # Every page after the first took the learned-layout path
+    assert extractor.stats == {'learned': PAGES - 1, 'fallback': 1, 'cached': 0}
+
+def test_extractor_must_implement_interface():
+    class HalfExtractor(PdfExtractor):
+        def iter_rows(self, pdf, page_state=None):
+            return iter(())
+
+    with pytest.raises(TypeError):
+        HalfExtractor()
@@ -0,0 +1,82 @@
+"""FeeIndex and DbFeeLookup fold NULL and '' modifiers and locations into one key."""
+from fee_scraper.database.fee_row import FeeRow
+from fee_scraper.lookup.fee_lookup import DbFeeLookup, FeeIndex, fee_key
+
+def row(code, modifier=None, location=None, fee='10.00'):
+    return FeeRow.from_text(code, modifier, location, 'XXX', '2', '1.00', fee, None)
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=None):
+        self.conn.queries.append(params)
+        self.rows = [(None,)] if 'max(committed_at)' in sql else self.conn.table
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+class FakeConnection:
+    """Just enough of a psycopg2 connection for DbFeeLookup; the table is db_values() tuples"""
+
+    def __init__(self, rows):
+        self.table = [r.db_values() for r in rows]
+        self.queries = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+def test_fee_key_folds_empty_to_null():
+    assert fee_key('99213', '', '') == fee_key('99213') == ('99213', None, None)
+    assert fee_key('99213', '26', '') == ('99213', '26', None)
+
+def test_fee_index_folds_keys_and_later_rows_win():
+    index = FeeIndex([row('99213', '', '', fee='1.00'), row('99214'), row('99213', None, None, fee='2.00')])
+    assert len(index) == 2
+    assert index.get('99213').fee_schedule_amount == 200
+    assert index.get('99213', '', '') is index.get('99213', None, None)
+    assert index.by_code['99213'] == [index.get('99213')]
+    assert index.lookup_many([('99213', '', None), ('99214', None, ''), ('99215', None, None)]) == [
+        index.get('99213'), index.get('99214'), None]
+
+def test_fee_index_code_queries():
+    index = FeeIndex([row('99214'), row('99213', '26'), row('99213'), row('E0665')])
+    assert [r.cpt_hcpc_code for r in index.prefix('9921')] == ['99213', '99213', '99214']
+    assert [r.cpt_hcpc_code for r in index.code_range('99214')] == ['99214', 'E0665']
+    assert index.code_range('99214', 'E0665') == [row('99214')]
+
+def test_db_lookup_folds_keys_and_caches_misses():
+    conn = FakeConnection([row('99213', '', ''), row('99214', '26')])
+    lookup = DbFeeLookup(conn, cache_size=10)
+    results = lookup.lookup_many([('99213', None, None), ('99213', '', ''), ('99214', '26', ''), ('99215', None, None)])
+    assert results == [row('99213', '', ''), row('99213', '', ''), row('99214', '26'), None]
+    # One query for the three distinct keys, with NULLs sent as ''
+    assert conn.queries[-1] == (['99213', '99214', '99215'], ['', '26', ''], ['', '', ''])
+    assert (lookup.hits, lookup.misses) == (1, 3)
+
+    queries = len(conn.queries)
+    assert lookup.get('99215', '', '') is None
+    assert lookup.get('99213') == row('99213', '', '')
+    assert len(conn.queries) == queries
+    assert (lookup.hits, lookup.misses) == (3, 3)
+
+def test_db_lookup_evicts_least_recently_used():
+    conn = FakeConnection([row('99213'), row('99214'), row('99215')])
+    lookup = DbFeeLookup(conn, cache_size=2)
+    lookup.lookup_many([('99213', None, None), ('99214', None, None)])
+    lookup.get('99213')
+    lookup.get('99215')
+    assert list(lookup._cache) == [('99213', None, None), ('99215', None, None)]
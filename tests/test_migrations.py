@@ -0,0 +1,90 @@
+"""MIGRATIONS order and what run_migrations applies."""
+import re
+
+import pytest
+
+from fee_scraper.database import migrations
+from fee_scraper.database.migrations import MIGRATIONS, run_migrations
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(' '.join(sql.split()))
+        if 'pg_try_advisory_lock' in sql:
+            self.result = [(self.conn.lock_free.pop(0),)]
+        elif sql.startswith('SELECT name FROM schema_migrations'):
+            self.result = [(name,) for name in self.conn.applied]
+        elif sql.startswith('INSERT INTO schema_migrations'):
+            self.conn.applied.append(params[0])
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+class FakeConnection:
+    """Records statements; lock_free lists what each pg_try_advisory_lock returns"""
+
+    def __init__(self, applied=(), lock_free=(True,)):
+        self.applied = list(applied)
+        self.lock_free = list(lock_free)
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+@pytest.fixture
+def applied_order(monkeypatch):
+    order = []
+    monkeypatch.setattr(migrations, 'MIGRATIONS',
+                        [(name, lambda conn, name=name: order.append(name)) for name, _ in MIGRATIONS])
+    return order
+
+def test_migrations_are_numbered_in_order():
+    names = [name for name, _ in MIGRATIONS]
+    assert all(re.fullmatch(r'\d{4}_[a-z_]+', name) for name in names)
+    assert [int(name[:4]) for name in names] == list(range(1, len(names) + 1))
+
+def test_applies_pending_migrations_in_order(applied_order):
+    conn = FakeConnection(applied=['0001_row_hash', '0003_run_state'])
+    run_migrations(conn)
+    assert applied_order == ['0002_natural_key_unique', '0004_work_queue', '0005_fee_history']
+    assert conn.applied[2:] == applied_order
+    assert conn.statements[-1].startswith('SELECT pg_advisory_unlock')
+
+def test_nothing_to_apply(applied_order):
+    conn = FakeConnection(applied=[name for name, _ in MIGRATIONS])
+    run_migrations(conn)
+    assert applied_order == []
+
+def test_waits_for_the_migration_lock(applied_order):
+    conn = FakeConnection(lock_free=[False, False, True])
+    run_migrations(conn, poll_interval=0)
+    assert sum('pg_try_advisory_lock' in sql for sql in conn.statements) == 3
+    assert applied_order == [name for name, _ in MIGRATIONS]
+
+def test_failed_migration_releases_the_lock(monkeypatch):
+    def fail(conn):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(migrations, 'MIGRATIONS', [('0001_row_hash', fail)])
+    conn = FakeConnection()
+    with pytest.raises(RuntimeError):
+        run_migrations(conn)
+    assert conn.applied == []
+    assert conn.statements[-1].startswith('SELECT pg_advisory_unlock')
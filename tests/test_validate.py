@@ -0,0 +1,63 @@
+"""Which table rows RowValidator keeps, and how it reports the rest."""
+import logging
+
+import pytest
+
+from fee_scraper.database.fee_row import FEE_COLUMNS
+from fee_scraper.scraper.validate import RowValidator, DEFAULT_CODE_PATTERN
+from fee_scraper.utils.metrics import METRICS
+
+def data_row(code, modifier='26'):
+    return [code, modifier, '003', 'XXX', '2', '12.34', '56.78', 'N/A']
+
+@pytest.fixture
+def validator():
+    return RowValidator(FEE_COLUMNS)
+
+@pytest.mark.parametrize('code', ['99213', '0001T', '0591U', 'E0665', 'G0008', 'J3490'])
+def test_accepted_codes(validator, code):
+    rows = list(validator.rows([data_row(code)]))
+    assert [row.cpt_hcpc_code for row in rows] == [code]
+    assert not validator.rejected
+
+@pytest.mark.parametrize('code', ['9921', '992131', 'e0665', '99213-26', '99 213', '*9921'])
+def test_rejected_codes(validator, code):
+    assert list(validator.rows([data_row(code)])) == []
+    assert validator.rejected == {'bad_code': 1}
+
+def test_code_is_stripped_before_matching(validator):
+    assert [row.cpt_hcpc_code for row in validator.rows([data_row(' 99213\n')])] == ['99213']
+
+def test_reject_reasons(validator):
+    rows = [
+        [None, '', 'N/A', '-', 'X', None, None, None],
+        ['CPT/HCPC Code', 'Modifier', 'Location', 'Global Surgery Indicator',
+         'Multiple Surgery Indicator', 'Prevailing Charge', 'Fee Schedule', 'Site of Service Amount'],
+        ['Radiology'],
+        data_row('N/A'),
+        data_row('BAD'),
+        data_row('99213'),
+    ]
+    assert len(list(validator.rows(rows))) == 1
+    assert validator.rejected == {'empty': 1, 'header': 1, 'title': 1, 'missing_code': 1, 'bad_code': 1}
+
+def test_rejected_data_rows_are_logged_and_counted(validator, caplog):
+    METRICS.drain()
+    with caplog.at_level(logging.WARNING, logger='fee_schedule_scraper'):
+        list(validator.rows([data_row('E066'), data_row(None), ['Radiology'], data_row('E0665')]))
+    warnings = [record.getMessage() for record in caplog.records]
+    assert len(warnings) == 2
+    assert warnings[0].startswith("Rejected row (bad_code): ['E066'")
+    assert warnings[1].startswith("Rejected row (missing_code): [None")
+    assert METRICS.total('rows_rejected_total') == 3
+
+def test_null_values_and_amounts(validator):
+    (row,) = validator.rows([['99213', 'X', '-', '', 'N/A', '1,234.00', '0.50', 'abc']])
+    assert row.modifier is None and row.medicare_location is None
+    assert row.global_surgery_indicator is None and row.multiple_surgery_indicator is None
+    assert row.fee_schedule_amount == 50
+    assert row.site_of_service_amount == 'abc'
+
+def test_code_pattern_is_configurable():
+    validator = RowValidator(FEE_COLUMNS, code_pattern=DEFAULT_CODE_PATTERN + r'(-[0-9A-Z]{2})?')
+    assert [row.cpt_hcpc_code for row in validator.rows([data_row('99213-26')])] == ['99213-26']